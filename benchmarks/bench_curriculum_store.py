@@ -0,0 +1,53 @@
+"""Per-rerun timings of curriculum lookups: legacy dict literal vs. load-once store
+
+Run from the repository root:  python -m benchmarks.bench_curriculum_store
+"""
+import time
+import tracemalloc
+
+from src.components.mock_test_creator import (
+    get_comprehensive_curriculum_topics,
+    get_topics_by_board_grade_subject
+)
+from src.components.curriculum_store import get_curriculum_store, get_curriculum_topics
+
+RERUNS = 200
+LOOKUP = ("CBSE", 10, "Science")
+
+
+def time_per_rerun(fn, reruns=RERUNS):
+    """Return (mean ms, peak KiB allocated) for one simulated rerun"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    for _ in range(reruns):
+        fn()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed * 1000 / reruns, peak / 1024
+
+
+def legacy_rerun():
+    """What one create_test rerun paid before the store existed"""
+    get_comprehensive_curriculum_topics()
+    get_topics_by_board_grade_subject(*LOOKUP)
+
+
+def store_rerun():
+    """What one create_test rerun pays with the store"""
+    get_curriculum_topics(*LOOKUP)
+
+
+def main():
+    start = time.perf_counter()
+    store = get_curriculum_store()
+    build_ms = (time.perf_counter() - start) * 1000
+    print(f"store build (once per process, source={store.source}): {build_ms:.2f} ms")
+
+    for label, fn in (("legacy", legacy_rerun), ("store", store_rerun)):
+        mean_ms, peak_kib = time_per_rerun(fn)
+        print(f"{label:>7}: {mean_ms:.4f} ms/rerun, peak {peak_kib:.1f} KiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""Reproducible create -> display -> PDF timings from recorded Claude responses
+
+Record once (against the local stand-in, or the real API with --target
+anthropic and CLAUDE_API_KEY set), then replay as often as needed:
+
+    python -m benchmarks.bench_end_to_end --record
+    python -m benchmarks.bench_end_to_end --runs 5 --latency-scale 1
+
+Every run happens in a fresh process with an empty cache directory, so the
+generation cache, question bank, near-duplicate history and token budget start
+from the same state and the same requests are made each time. The steps per
+scenario are: create (generate_test), display (normalise_test, done once per
+test and shared by every renderer) and PDF (both documents from the records,
+bypassing the render cache).
+
+Run from the repository root:  python -m benchmarks.bench_end_to_end
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+FIXTURE_DIR = os.path.join("benchmarks", "fixtures", "llm")
+SCENARIOS = (
+    ("CBSE", 10, "Science", "Light - Reflection and Refraction", "Class Test (15 marks)"),
+    ("CBSE", 10, "Mathematics", "Quadratic Equations", "Unit Test"),
+    ("ICSE", 8, "Physics", "Force and Pressure", "Half Yearly Examination"),
+    ("CBSE", 12, "Chemistry", "Electrochemistry", "Board Examination Paper (80 marks)"),
+)
+STEPS = ("create", "display", "pdf")
+
+
+def run_scenarios():
+    """Time each step of each scenario in this process; returns {scenario: {step: ms}}"""
+    from src.components.generation_service import generate_test
+    from src.components.pdf_export import render_pdf
+    from src.components.test_schema import normalise_test
+
+    timings = {}
+    for scenario in SCENARIOS:
+        step_ms = {}
+        start = time.perf_counter()
+        test_data = generate_test(*scenario, force_fresh=True)
+        step_ms["create"] = (time.perf_counter() - start) * 1000
+        if not test_data:
+            raise RuntimeError(f"no test generated for {scenario}")
+
+        start = time.perf_counter()
+        test = normalise_test(test_data)
+        step_ms["display"] = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        render_pdf(test, "questions")
+        render_pdf(test, "answers")
+        step_ms["pdf"] = (time.perf_counter() - start) * 1000
+        timings[f"{scenario[2]} / {scenario[4]}"] = step_ms
+    return timings
+
+
+def spawn(env):
+    """One run in a fresh interpreter and cache directory; returns its timings"""
+    env = dict(os.environ, MOCK_TEST_CACHE_DIR=tempfile.mkdtemp(prefix="bench_e2e_"), **env)
+    result = subprocess.run([sys.executable, "-m", "benchmarks.bench_end_to_end", "--child"],
+                            env=env, capture_output=True, text=True)
+    if result.returncode:
+        raise RuntimeError(f"benchmark run failed:\n{result.stderr[-2000:]}")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--record", action="store_true", help="record fresh responses instead of replaying")
+    parser.add_argument("--target", default="mock", choices=("mock", "anthropic"), help="backend to record from")
+    parser.add_argument("--runs", type=int, default=3, help="replay runs")
+    parser.add_argument("--latency-scale", type=float, default=0.0,
+                        help="0 replays instantly, 1 with the recorded latency")
+    parser.add_argument("--fixtures", default=FIXTURE_DIR)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_scenarios()))
+        return
+
+    if args.record:
+        env = {"LLM_BACKEND": "record", "LLM_RECORD_TARGET": args.target, "LLM_REPLAY_DIR": args.fixtures}
+        timings = spawn(env)
+        print(f"recorded {len(timings)} scenarios from {args.target} into {args.fixtures}")
+        return
+
+    from src.components.llm_backends import FixtureStore
+
+    if not FixtureStore(args.fixtures).keys():
+        print(f"no recorded responses in {args.fixtures}; run with --record first")
+        sys.exit(1)
+    env = {"LLM_BACKEND": "replay", "LLM_REPLAY_DIR": args.fixtures,
+           "LLM_REPLAY_LATENCY_SCALE": str(args.latency_scale)}
+    try:
+        runs = [spawn(env) for _ in range(args.runs)]
+    except RuntimeError as e:
+        if "replay://" not in str(e):
+            raise
+        # A request the recording never made, e.g. after a prompt or scenario change
+        print(f"a request has no recorded response in {args.fixtures}; run with --record again")
+        sys.exit(1)
+    print(f"{args.runs} replay runs, latency x{args.latency_scale:g}; mean ms (stdev)")
+    print(f"{'scenario':>42} " + " ".join(f"{step:>16}" for step in STEPS))
+    for scenario in runs[0]:
+        cells = []
+        for step in STEPS:
+            values = [run[scenario][step] for run in runs]
+            spread = statistics.stdev(values) if len(values) > 1 else 0.0
+            cells.append(f"{statistics.mean(values):>9.1f} ({spread:>4.1f})")
+        print(f"{scenario:>42} " + " ".join(cells))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""Question recovery and parse throughput on a fuzzed corpus of broken responses
+
+A clean response is generated for 20 questions, then damaged the ways real
+responses break: truncation at random points, trailing and missing commas,
+code fences, prose before the JSON, raw newlines inside strings, Python
+literals, smart quotes and a bare array. Each case is parsed by the legacy
+clean_json_response (slice the outer braces, one json.loads) and by
+IncrementalQuestionParser fed in chunks of 1, 16 and 64 characters; recovered
+and reported-lost counts are compared and any exception fails the run.
+
+Run from the repository root:  python -m benchmarks.bench_incremental_json
+"""
+import json
+import random
+import time
+
+from src.components.incremental_json import IncrementalQuestionParser
+from src.components.mock_test_creator import clean_json_response
+
+QUESTIONS = 20
+TRUNCATIONS = 40
+CHUNK_SIZES = (1, 16, 64)
+SEED = 2024
+
+
+def make_questions(rng):
+    types = rng.choices(("mcq", "short", "long"), weights=(5, 3, 2), k=QUESTIONS)
+    questions = []
+    for i, question_type in enumerate(types, start=1):
+        question = {"id": i, "type": question_type, "question": f"Explain concept {i} of the topic with an example.",
+                    "marks": {"mcq": 1, "short": 3, "long": 5}[question_type], "answer": f"Answer {i}: " + "detail " * 8}
+        if question_type == "mcq":
+            question["options"] = [f"Option {c}" for c in "ABCD"]
+        questions.append(question)
+    return questions
+
+
+def make_corpus(rng):
+    """(label, text) cases; every case is derived from one clean response"""
+    questions = make_questions(rng)
+    clean = json.dumps({"test_info": {"subject": "Science", "total_questions": QUESTIONS}, "questions": questions},
+                       indent=2)
+    corpus = [("clean", clean)]
+    for cut in sorted(rng.sample(range(len(clean) // 10, len(clean)), TRUNCATIONS)):
+        corpus.append((f"truncated@{cut}", clean[:cut]))
+    corpus += [
+        ("trailing comma", clean.replace('"Option D"', '"Option D",', 3)),
+        ("missing comma", clean.replace('",\n      "marks"', '"\n      "marks"', 3)),
+        ("code fence", "```json\n" + clean + "\n```"),
+        ("prose prefix", "Here is the test you asked for:\n\n" + clean + "\n\nLet me know if you need changes."),
+        ("raw newline", clean.replace("with an example.", "with\nan example.", 4)),
+        ("python literals", clean.replace('"marks": 1', '"marks": 1, "calculator": True', 3)),
+        ("smart quotes", clean.replace('"answer"', '“answer”', 2)),
+        ("bare array", json.dumps(questions, indent=2)),
+        ("fenced bare array", "```json\n" + json.dumps(questions) + "\n```"),
+    ]
+    return corpus
+
+
+def legacy_recovered(text):
+    parsed, _ = clean_json_response(text)
+    if isinstance(parsed, dict):
+        return len(parsed.get("questions", []))
+    return len(parsed) if isinstance(parsed, list) else 0
+
+
+def incremental_parse(text, chunk_size):
+    parser = IncrementalQuestionParser()
+    for start in range(0, len(text), chunk_size):
+        parser.feed(text[start:start + chunk_size])
+    parser.finish()
+    return parser
+
+
+def main():
+    corpus = make_corpus(random.Random(SEED))
+    totals = {"legacy": 0, "incremental": 0, "lost": 0}
+    truncated = {"legacy": 0, "recovered": 0, "lost": 0}
+    print(f"{'case':>20} {'legacy':>7} {'recovered':>10} {'lost':>5}")
+    for label, text in corpus:
+        legacy = legacy_recovered(text)
+        results = {chunk_size: incremental_parse(text, chunk_size) for chunk_size in CHUNK_SIZES}
+        counts = {(len(p.questions), len(p.lost)) for p in results.values()}
+        assert len(counts) == 1, f"{label}: chunk size changed the result {counts}"
+        recovered, lost = counts.pop()
+        totals["legacy"] += legacy
+        totals["incremental"] += recovered
+        totals["lost"] += lost
+        if label.startswith("truncated"):
+            truncated["legacy"] += legacy
+            truncated["recovered"] += recovered
+            truncated["lost"] += lost
+        else:
+            print(f"{label:>20} {legacy:>7} {recovered:>10} {lost:>5}")
+    print(f"{f'{TRUNCATIONS} truncations':>20} {truncated['legacy']:>7} {truncated['recovered']:>10} {truncated['lost']:>5}")
+    print(f"{len(corpus)} cases: legacy recovered {totals['legacy']}, incremental recovered "
+          f"{totals['incremental']} and reported {totals['lost']} lost")
+
+    size = sum(len(text) for _, text in corpus)
+    for chunk_size in CHUNK_SIZES:
+        start = time.perf_counter()
+        for _, text in corpus:
+            incremental_parse(text, chunk_size)
+        elapsed = time.perf_counter() - start
+        print(f"chunk {chunk_size:>3}: {size / elapsed / 1e6:.2f} MB/s ({elapsed * 1000:.1f} ms for {size} chars)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""Offline generation throughput against the mock LLM backend
+
+Papers are generated end to end (prompt, streamed call, incremental parse,
+schema normalisation, dedup, bank and cache writes) through the mock backend,
+at several concurrency levels. Every paper has its own topic so identical
+requests are never coalesced. The cache, bank and token budget live in a
+temporary directory, and the rate limiter is opened up so it measures the
+pipeline rather than the account's limits.
+
+Run from the repository root:  python -m benchmarks.bench_llm_throughput [--error-rate 0.05]
+"""
+import argparse
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+os.environ.setdefault("MOCK_TEST_CACHE_DIR", tempfile.mkdtemp(prefix="bench_llm_"))
+os.environ.setdefault("CLAUDE_REQUESTS_PER_MINUTE", "100000")
+os.environ.setdefault("CLAUDE_TOKENS_PER_MINUTE", "1000000000")
+
+from src.components.generation_service import generate_test  # noqa: E402
+from src.components.llm_backends import MOCK_LLM_CONFIG, MockBackend, set_llm_backend  # noqa: E402
+from src.components.resilience import get_resilience_stats  # noqa: E402
+
+CONCURRENCY = (1, 4, 16)
+PAPER_TYPE = "Class Test (15 marks)"
+
+
+def _percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))] if values else 0.0
+
+
+def run(concurrency, papers, label):
+    """Generate papers with concurrency workers; returns (papers/s, per-paper seconds, errors)"""
+    def one(i):
+        start = time.perf_counter()
+        try:
+            test = generate_test("CBSE", 10, "Science", f"Bench {label} {concurrency} topic {i}", PAPER_TYPE,
+                                 force_fresh=True)
+            error = None if test else "no questions generated"
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        return time.perf_counter() - start, error
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(one, range(papers)))
+    elapsed = time.perf_counter() - start
+    return papers / elapsed, [seconds for seconds, _ in results], [error for _, error in results if error]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--papers", type=int, default=32, help="papers per concurrency level")
+    parser.add_argument("--latency", type=float, default=MOCK_LLM_CONFIG["latency"])
+    parser.add_argument("--chunk-delay", type=float, default=MOCK_LLM_CONFIG["chunk_delay"])
+    parser.add_argument("--error-rate", type=float, default=MOCK_LLM_CONFIG["error_rate"])
+    args = parser.parse_args()
+
+    config = dict(MOCK_LLM_CONFIG, latency=args.latency, chunk_delay=args.chunk_delay, error_rate=args.error_rate)
+    backend = set_llm_backend(MockBackend(url="", config=config))
+    print(f"backend: {backend.describe()} latency {args.latency}s, chunk delay {args.chunk_delay}s, "
+          f"error rate {args.error_rate:.0%}")
+    for concurrency in CONCURRENCY:
+        throughput, seconds, errors = run(concurrency, args.papers, int(time.time()))
+        print(f"concurrency {concurrency:>2}: {throughput:.2f} papers/s, p50 {_percentile(seconds, 0.5):.2f}s "
+              f"p95 {_percentile(seconds, 0.95):.2f}s, {len(errors)} failed" + (f" (first: {errors[0]})" if errors else ""))
+    counters = get_resilience_stats()["counters"]
+    print(f"retries {counters.get('retries', 0)}, server errors {counters.get('server_errors', 0)}, "
+          f"rate limited {counters.get('rate_limited', 0)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""Paper assembler solve time and accuracy over large synthetic question pools
+
+Every paper format in PAPER_FORMAT_TABLE is assembled from pools of 1k, 10k and
+50k random questions with realistic marks per type and twelve topics.
+
+Run from the repository root:  python -m benchmarks.bench_paper_assembler
+"""
+import random
+import time
+
+from src.components.paper_assembler import assemble_paper
+from src.components.paper_formats import PAPER_FORMAT_TABLE, resolve_paper_format
+
+POOL_SIZES = (1_000, 10_000, 50_000)
+TOPICS = [f"Topic {i}" for i in range(12)]
+MARKS_BY_TYPE = {"mcq": (1, 1, 1, 2), "short": (2, 2.5, 3, 4), "long": (4, 5, 6, 8)}
+SEED = 2024
+
+
+def make_pool(size, rng):
+    """Synthetic candidates; the type mix leans towards MCQs as real papers do"""
+    types = rng.choices(("mcq", "short", "long"), weights=(5, 3, 2), k=size)
+    return [
+        {"id": i, "type": question_type, "marks": rng.choice(MARKS_BY_TYPE[question_type]),
+         "topic": rng.choice(TOPICS), "question": f"Question {i}"}
+        for i, question_type in enumerate(types)
+    ]
+
+
+def main():
+    rng = random.Random(SEED)
+    formats = [resolve_paper_format(row[0]) for row in PAPER_FORMAT_TABLE]
+
+    print(f"{'pool':>7} {'formats':>8} {'mean ms':>8} {'max ms':>8} {'exact':>7} {'mean |gap|':>11} {'full coverage':>14}")
+    for size in POOL_SIZES:
+        pool = make_pool(size, rng)
+        timings, exact, gaps, covered = [], 0, [], 0
+        for paper_format in formats:
+            start = time.perf_counter()
+            result = assemble_paper(paper_format, pool)
+            timings.append((time.perf_counter() - start) * 1000)
+
+            assert all(result.counts[t] == n for t, n in zip(("mcq", "short", "long"), paper_format[:3]))
+            exact += result.exact
+            gaps.append(abs(result.total_marks - result.target_marks))
+            covered += not result.topics_missing or len(result.questions) < len(TOPICS)
+
+        print(f"{size:>7} {len(formats):>8} {sum(timings) / len(timings):>8.2f} {max(timings):>8.2f} "
+              f"{exact:>3}/{len(formats):<3} {sum(gaps) / len(gaps):>11.2f} {covered:>10}/{len(formats)}")
+
+
+if __name__ == "__main__":
+    main()
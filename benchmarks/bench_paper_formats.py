@@ -0,0 +1,63 @@
+"""Resolution cost of every paper type string offered by get_paper_types_by_board_and_grade
+
+Run from the repository root:  python -m benchmarks.bench_paper_formats
+"""
+import time
+
+from src.components.mock_test_creator import (
+    get_enhanced_question_counts_from_paper_type,
+    get_paper_types_by_board_and_grade
+)
+from src.components.paper_formats import (
+    PAPER_DESCRIPTION_TABLE,
+    PAPER_FORMAT_TABLE,
+    PaperFormatRegistry,
+    get_paper_format_counts
+)
+
+BOARDS = ["CBSE", "ICSE", "IB", "Cambridge IGCSE", "State Board"]
+GRADES = range(1, 13)
+WARM_REPEATS = 1000
+
+
+def collect_paper_types():
+    """Every (board, grade, paper_type) the create-test page can offer"""
+    rows = []
+    for board in BOARDS:
+        for grade in GRADES:
+            for paper_type in get_paper_types_by_board_and_grade(board, grade) or []:
+                rows.append((board, grade, paper_type))
+    return rows
+
+
+def main():
+    rows = collect_paper_types()
+    registry = PaperFormatRegistry(PAPER_FORMAT_TABLE, PAPER_DESCRIPTION_TABLE)
+
+    print(f"{'board':<16} {'grade':>5} {'cold us':>9} {'warm us':>9}  questions/marks  paper type")
+    cold_total = warm_total = 0.0
+    mismatches = []
+    for board, grade, paper_type in rows:
+        start = time.perf_counter()
+        paper_format = registry.resolve(paper_type)
+        cold = (time.perf_counter() - start) * 1e6
+
+        start = time.perf_counter()
+        for _ in range(WARM_REPEATS):
+            registry.resolve(paper_type)
+        warm = (time.perf_counter() - start) * 1e6 / WARM_REPEATS
+
+        if get_paper_format_counts(paper_type) != get_enhanced_question_counts_from_paper_type(paper_type):
+            mismatches.append(paper_type)
+
+        cold_total += cold
+        warm_total += warm
+        print(f"{board:<16} {grade:>5} {cold:>9.2f} {warm:>9.3f}  {paper_format.total_questions:>4}/{paper_format.total_marks:<4}       {paper_type}")
+
+    if rows:
+        print(f"\n{len(rows)} paper types: mean cold {cold_total / len(rows):.2f} us, mean warm {warm_total / len(rows):.3f} us")
+    print(f"{len(mismatches)} differ from get_question_counts_from_paper_type" + "".join(f"\n  {name}" for name in mismatches))
+
+
+if __name__ == "__main__":
+    main()
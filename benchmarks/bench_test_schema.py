@@ -0,0 +1,62 @@
+"""Normalisation cost and footprint of generated tests: raw dicts vs. Question records
+
+A 40-question paper (mixed types, some written the legacy way with
+"short_answer" types and list options) is normalised repeatedly; the time per
+paper and the memory held by the records vs. the parsed dicts are reported.
+
+Run from the repository root:  python -m benchmarks.bench_test_schema
+"""
+import json
+import random
+import time
+import tracemalloc
+
+from src.components.test_schema import normalise_test
+
+RUNS = 2000
+SEED = 2024
+
+
+def make_test(rng):
+    questions = []
+    for i in range(1, 41):
+        question_type = rng.choice(("mcq", "mcq", "short", "short_answer", "long_answer"))
+        question = {"id": i, "type": question_type, "question": f"Question {i} about the topic?",
+                    "marks": rng.choice((1, 2, "3", 5)), "sample_answer": "A model answer. " * 4,
+                    "explanation": "Because of the reason given in the chapter."}
+        if question_type == "mcq":
+            question["options"] = {k: f"Option {k}" for k in "ABCD"} if i % 2 else [f"{k}) Option {k}" for k in "ABCD"]
+            question["correct_answer"] = "A"
+        questions.append(question)
+    return {"test_info": {"board": "CBSE", "grade": 10, "subject": "Science", "topic": "Light"}, "questions": questions}
+
+
+def footprint(build):
+    """KiB allocated by what build() returns"""
+    tracemalloc.start()
+    kept = build()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del kept
+    return size / 1024
+
+
+def main():
+    test_data = make_test(random.Random(SEED))
+    text = json.dumps(test_data)
+
+    start = time.perf_counter()
+    for _ in range(RUNS):
+        normalise_test(test_data)
+    elapsed = time.perf_counter() - start
+    test = normalise_test(test_data)
+    print(f"normalise_test: {elapsed * 1e6 / RUNS:.1f} us per {len(test.questions)}-question paper "
+          f"({len(test.rejected)} rejected)")
+
+    dicts_kib = footprint(lambda: json.loads(text))
+    records_kib = footprint(lambda: normalise_test(json.loads(text)))
+    print(f"parsed dicts: {dicts_kib:.1f} KiB, records: {records_kib:.1f} KiB")
+
+
+if __name__ == "__main__":
+    main()
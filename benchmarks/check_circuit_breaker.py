@@ -0,0 +1,103 @@
+"""Circuit-breaker check: a half-open probe always ends with a verdict or frees the probe slot
+
+The breaker is opened and cooled down, then the probe call goes to the mock
+backend answering with a 400, or with 429s (retried once, then given up on).
+After each, the breaker must be open again or let the next call probe, never
+stuck in half-open with a probe nobody will resolve. A stream that breaks off
+after its headers must be recorded as a failure. Any failure exits with status 1.
+
+Run from the repository root:  python -m benchmarks.check_circuit_breaker
+"""
+import os
+import sys
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+os.environ.setdefault("MOCK_TEST_CACHE_DIR", tempfile.mkdtemp(prefix="check_breaker_"))
+os.environ["CLAUDE_RETRY_MAX_ATTEMPTS"] = "2"
+
+import requests  # noqa: E402
+
+from src.components import claude_client  # noqa: E402
+from src.components.llm_backends import MOCK_LLM_CONFIG, MockBackend, set_llm_backend  # noqa: E402
+from src.components.resilience import HALF_OPEN, OPEN, CircuitOpenError, get_circuit_breaker  # noqa: E402
+
+
+class DroppedStreamHandler(BaseHTTPRequestHandler):
+    """Answers 200 with one SSE event, then closes the connection mid chunked body"""
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("content-length", 0)))
+        self.send_response(200)
+        self.send_header("content-type", "text/event-stream")
+        self.send_header("transfer-encoding", "chunked")
+        self.end_headers()
+        event = b'event: message_start\ndata: {"type": "message_start", "message": {"usage": {}}}\n\n'
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(event), event))
+        self.wfile.write(b"400\r\npartial")
+        self.wfile.flush()
+        self.close_connection = True
+
+    def log_message(self, *args):
+        pass
+
+
+def half_open_breaker():
+    breaker = get_circuit_breaker()
+    with breaker._lock:
+        breaker.state = OPEN
+        breaker.opened_at = 0.0
+        breaker._probe_in_flight = False
+    return breaker
+
+
+def probe(backend, stream=False):
+    """Make the half-open probe call through backend; returns the breaker afterwards"""
+    set_llm_backend(backend)
+    breaker = half_open_breaker()
+    payload = claude_client.build_payload("Topic: Light\nGenerate exactly 2 MCQ questions.", max_tokens=200)
+    try:
+        if stream:
+            for _ in claude_client.stream_message_text(payload):
+                pass
+        else:
+            claude_client.post_message(payload)
+    except (CircuitOpenError, requests.RequestException):
+        pass
+    return breaker
+
+
+def mock_backend(status):
+    config = dict(MOCK_LLM_CONFIG, latency=0, latency_jitter=0, error_rate=1.0, error_statuses=(status,))
+    return MockBackend(url="", config=config)
+
+
+def main():
+    failures = []
+    for status in (400, 429):
+        breaker = probe(mock_backend(status))
+        state = breaker.state
+        stuck = state == HALF_OPEN and not breaker.allow()
+        print(f"probe answered {status}: {state}" + (", next call blocked" if stuck else ""))
+        if stuck:
+            failures.append(f"half-open probe answered {status} left the breaker stuck")
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), DroppedStreamHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    breaker = probe(MockBackend(url=f"http://127.0.0.1:{server.server_address[1]}/v1/messages"), stream=True)
+    server.shutdown()
+    failures_after = breaker.stats()["consecutive_failures"]
+    print(f"probe stream dropped: state {breaker.state}, consecutive failures {failures_after}")
+    if not failures_after:
+        failures.append("a stream failing mid-way was not recorded on the breaker")
+
+    for failure in failures:
+        print(f"FAILED      {failure}")
+    if failures:
+        sys.exit(1)
+    print("every half-open probe was resolved")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""Agreement check: validate_topic against the legacy validate_topic_against_curriculum
+
+Every board/grade/subject offered by the create page, including the ones
+without curriculum data, is validated with queries built from its own topics
+(whole topics, single words, fragments, joined topics), from another subject's
+topics and from unrelated text. Every query the legacy function accepted must
+still be accepted; any that is not fails the check (exit status 1). Queries
+only the index accepts (plural folding, close misspellings) are counted.
+
+Run from the repository root:  python -m benchmarks.check_topic_validation
+"""
+import random
+import sys
+
+from src.components.curriculum_store import get_curriculum_topics
+from src.components.mock_test_creator import get_subjects_by_board, validate_topic_against_curriculum
+from src.components.topic_index import validate_topic
+
+SEED = 2024
+UNRELATED = ("Medieval European Trade Guilds", "xyz", "ab", "football", "Cooking Pasta at Home", "   ")
+
+
+def queries_for(topics, rng, other_topics):
+    """Queries a tutor might type for a topic list"""
+    queries = list(UNRELATED) + rng.sample(other_topics, min(3, len(other_topics)))
+    for topic in rng.sample(list(topics), min(6, len(topics))):
+        words = topic.split()
+        queries += [topic, topic.upper(), words[0], words[-1], topic[:3], topic[1:-1], f"{topic} basics"]
+        queries += [word + "s" for word in words if len(word) > 3][:1]
+        queries += [word[:-1] for word in words if len(word) > 5][:1]
+    if len(topics) > 1:
+        queries.append(f"{topics[0]} and {topics[1]}")
+    return queries
+
+
+def main():
+    rng = random.Random(SEED)
+    combinations = [(board, grade, subject)
+                    for board, grades in get_subjects_by_board().items()
+                    for grade, subjects in grades.items()
+                    for subject in subjects]
+    all_topics = [topic for combination in combinations
+                  for topic in get_curriculum_topics(*combination)]
+
+    checked, regressions, widened, without_data = 0, [], 0, 0
+    for combination in combinations:
+        topics = get_curriculum_topics(*combination)
+        without_data += not topics
+        for query in queries_for(topics, rng, all_topics):
+            legacy_valid, _ = validate_topic_against_curriculum(*combination, query)
+            valid, _ = validate_topic(*combination, query)
+            checked += 1
+            if legacy_valid and not valid and query.strip():
+                regressions.append((combination, query))
+            elif valid and not legacy_valid:
+                widened += 1
+
+    print(f"{checked} queries over {len(combinations)} board/grade/subject combinations "
+          f"({without_data} without curriculum data)")
+    print(f"accepted by the index only: {widened}")
+    for combination, query in regressions[:20]:
+        print(f"REJECTED    {combination}: {query!r}")
+    if regressions:
+        print(f"{len(regressions)} queries the legacy validator accepted are rejected")
+        sys.exit(1)
+    print("every query the legacy validator accepted is still accepted")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+"""Concurrent-session load test of main.py: home -> create_test -> generate -> PDF
+
+Each simulated tutor is a Streamlit AppTest session running the real script:
+it opens the dashboard, goes to the create page and fills the form through the
+same widgets a tutor clicks (the custom list selectors, topic box and paper
+type), generates a paper and waits on the job queue until the test page is
+shown, then builds the questions and answers PDFs. Sessions run concurrently
+and share the process-wide job queue, caches and question bank, as they do on
+one server. Claude is replaced by the local stand-in, started in its own
+process so it does not compete with the app for the interpreter.
+
+Reported: sessions per second, p50/p95/p99 seconds per step, failures, and the
+resident memory added per session while all of them are kept open.
+
+Run from the repository root:  python -m benchmarks.load_sessions [--sessions 32 --concurrency 8]
+"""
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+os.environ.setdefault("MOCK_TEST_CACHE_DIR", tempfile.mkdtemp(prefix="load_sessions_"))
+os.environ.setdefault("CLAUDE_REQUESTS_PER_MINUTE", "100000")
+os.environ.setdefault("CLAUDE_TOKENS_PER_MINUTE", "1000000000")
+# The create page polls its job between reruns; poll quickly so waiting is not padded
+os.environ.setdefault("JOB_POLL_SECONDS", "0.1")
+os.environ["LLM_BACKEND"] = "mock"
+
+from streamlit.testing.v1 import AppTest  # noqa: E402
+
+APP_PATH = "main.py"
+# (board, grade, subject, topic, paper type) as offered by the create page's selectors
+SCENARIOS = (
+    ("CBSE", 10, "Science", "Light - Reflection and Refraction", "Chapter-wise Practice Test (25 Questions)"),
+    ("CBSE", 10, "Mathematics", "Quadratic Equations", "Pre-Board Examination Paper (35 Questions)"),
+    ("ICSE", 8, "Physics", "Force and Pressure", "Chapter-wise Practice (20 Questions)"),
+    ("CBSE", 12, "Chemistry", "Electrochemistry", "Practice Test Series (30 MCQ + 10 Long)"),
+)
+STEPS = ("home", "create_test", "generate", "pdf")
+
+
+def _percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))] if values else 0.0
+
+
+def _rss_kib():
+    """Resident set size of this process in KiB (peak size where /proc is unavailable)"""
+    try:
+        with open("/proc/self/status", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def start_stand_in(args):
+    """Run tools.mock_anthropic_server in a child process; returns (process, messages url)"""
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    process = subprocess.Popen(
+        [sys.executable, "-m", "tools.mock_anthropic_server", "--port", str(port),
+         "--latency", str(args.latency), "--latency-jitter", str(args.latency_jitter),
+         "--chunk-delay", str(args.chunk_delay), "--error-rate", str(args.error_rate)],
+        stdout=subprocess.DEVNULL
+    )
+    deadline = time.monotonic() + 10
+    while True:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.5).close()
+            break
+        except OSError:
+            if process.poll() is not None or time.monotonic() > deadline:
+                process.kill()
+                raise RuntimeError("the mock Messages API did not start")
+            time.sleep(0.05)
+    return process, f"http://127.0.0.1:{port}/v1/messages"
+
+
+def _check(at, step):
+    if at.exception:
+        raise RuntimeError(f"{step}: {at.exception[0].message}")
+
+
+def choose(at, key, value):
+    """Open a custom_list_selector and pick value, as a tutor clicking it would"""
+    at.button(key=f"{key}_selector_btn").click().run()
+    at.radio(key=f"{key}_selector_radio").set_value(value).run()
+
+
+def fill_form(at, scenario, fresh):
+    board, grade, subject, topic, paper_type = scenario
+    choose(at, "board_select", board)
+    choose(at, f"grade_select_{board}", f"Grade {grade}")
+    choose(at, f"subject_select_{board}_{grade}", subject)
+    at.text_input(key=f"topic_input_{subject}").input(topic).run()
+    choose(at, "paper_type_select", paper_type)
+    at.checkbox(key="stream_questions_checkbox").uncheck()
+    if fresh:
+        at.checkbox(key="force_fresh_checkbox").check()
+    at.run()
+
+
+def run_session(i, args):
+    """Drive one session through the flow; returns ({step: seconds}, error or None, AppTest)"""
+    timings = {}
+    at = AppTest.from_file(APP_PATH, default_timeout=args.timeout)
+    try:
+        start = time.perf_counter()
+        at.run()
+        _check(at, "home")
+        timings["home"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        at.button(key="big_create_test").click().run()
+        fill_form(at, SCENARIOS[i % len(SCENARIOS)], not args.allow_cache)
+        _check(at, "create_test")
+        timings["create_test"] = time.perf_counter() - start
+
+        # The generate rerun polls the job itself; rerun again if it returned before the job finished
+        start = time.perf_counter()
+        at.button(key="big_generate_btn").click().run()
+        deadline = time.monotonic() + args.timeout
+        while at.session_state.current_page != "test_display":
+            _check(at, "generate")
+            if at.error:
+                raise RuntimeError(f"generate: {at.error[0].value}")
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"generate: no test after {args.timeout:.0f}s")
+            at.run()
+        timings["generate"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        at.button(key="q_pdf").click().run()
+        at.button(key="a_pdf").click().run()
+        _check(at, "pdf")
+        if at.error:
+            raise RuntimeError(f"pdf: {at.error[0].value}")
+        timings["pdf"] = time.perf_counter() - start
+        return timings, None, at
+    except Exception as e:
+        return timings, f"{type(e).__name__}: {e}", at
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=32)
+    parser.add_argument("--concurrency", type=int, default=8, help="sessions in flight at once")
+    parser.add_argument("--timeout", type=float, default=120.0, help="seconds a session may wait for its paper")
+    parser.add_argument("--allow-cache", action="store_true",
+                        help="let sessions be served saved papers instead of ticking 'Generate fresh questions'")
+    parser.add_argument("--latency", type=float, default=0.5, help="stand-in seconds before the first byte")
+    parser.add_argument("--latency-jitter", type=float, default=0.2)
+    parser.add_argument("--chunk-delay", type=float, default=0.01)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    process, url = start_stand_in(args)
+    os.environ["MOCK_LLM_URL"] = url
+    try:
+        rss_before = _rss_kib()
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            results = list(pool.map(lambda i: run_session(i, args), range(args.sessions)))
+        elapsed = time.perf_counter() - start
+        # Every AppTest is still referenced here, so the growth is what the open sessions hold
+        rss_after = _rss_kib()
+    finally:
+        process.terminate()
+        process.wait()
+
+    errors = [error for _, error, _ in results if error]
+    completed = args.sessions - len(errors)
+    print(f"{args.sessions} sessions, {args.concurrency} concurrent, stand-in {url} "
+          f"(latency {args.latency}s, error rate {args.error_rate:.0%}), JOB_WORKERS {os.getenv('JOB_WORKERS', '4')}")
+    print(f"throughput: {completed / elapsed:.2f} sessions/s ({completed} completed in {elapsed:.1f}s), "
+          f"{len(errors)} failed" + (f" (first: {errors[0]})" if errors else ""))
+    print(f"{'step':>12} {'n':>5} {'p50 s':>8} {'p95 s':>8} {'p99 s':>8} {'max s':>8}")
+    for step in STEPS:
+        seconds = [timings[step] for timings, _, _ in results if step in timings]
+        print(f"{step:>12} {len(seconds):>5} {_percentile(seconds, 0.5):>8.2f} {_percentile(seconds, 0.95):>8.2f} "
+              f"{_percentile(seconds, 0.99):>8.2f} {max(seconds, default=0.0):>8.2f}")
+    print(f"memory: {(rss_after - rss_before) / 1024:.1f} MiB resident added, "
+          f"{(rss_after - rss_before) / max(1, args.sessions):.0f} KiB per session")
+
+
+if __name__ == "__main__":
+    main()
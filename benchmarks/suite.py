@@ -0,0 +1,211 @@
+"""Benchmark suite: curriculum lookups, topic validation, paper formats, JSON parsing and PDF building
+
+Every case is timed over several rounds, each long enough to measure, and the
+best and median time per call are kept. Results are written as JSON and
+compared with a stored baseline; a case slower than the baseline by more than
+the tolerance is a regression and fails the run (exit status 1). Legacy
+functions from mock_test_creator are measured next to the components that
+replaced them, over tests of 15, 35 and 80 questions.
+
+Run from the repository root:
+    python -m benchmarks.suite                    # run and compare with benchmarks/baseline.json
+    python -m benchmarks.suite --save-baseline    # run and store the results as the new baseline
+    python -m benchmarks.suite --filter pdf --tolerance 0.5
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from src.components.curriculum_store import get_curriculum_topics
+from src.components.generation_cache import CACHE_DIR
+from src.components.incremental_json import IncrementalQuestionParser
+from src.components.mock_test_creator import (
+    clean_json_response,
+    create_answers_pdf,
+    create_questions_pdf,
+    get_comprehensive_curriculum_topics,
+    get_paper_types_by_board_and_grade,
+    get_question_counts_from_paper_type,
+    get_subjects_by_board,
+    validate_topic_against_curriculum
+)
+from src.components.paper_formats import resolve_paper_format
+from src.components.pdf_export import render_pdf
+from src.components.test_schema import normalise_test
+from src.components.topic_index import validate_topic
+from tools.mock_anthropic_server import build_mock_test
+
+BASELINE_PATH = os.path.join("benchmarks", "baseline.json")
+RESULTS_PATH = os.path.join(CACHE_DIR, "benchmarks", "latest.json")
+ROUNDS = 5
+MIN_ROUND_SECONDS = 0.05
+# Slower than baseline by more than this fraction is a regression...
+DEFAULT_TOLERANCE = 0.25
+# ...unless the difference is below timer noise
+MIN_REGRESSION_US = 2.0
+BOARDS = ["CBSE", "ICSE", "IB", "Cambridge IGCSE", "State Board"]
+GRADES = range(1, 13)
+LOOKUP = ("CBSE", 10, "Science")
+# (mcq, short, long) of a class test, a unit test and a full board paper
+TEST_SIZES = {"15q": (8, 5, 2), "35q": (20, 10, 5), "80q": (50, 20, 10)}
+SEED = 2024
+
+
+def make_test(mcq, short, long_):
+    random.seed(SEED)
+    return build_mock_test(f"Topic: Light\nGenerate exactly {mcq} MCQ questions, {short} short answer questions "
+                           f"and {long_} long answer questions.")
+
+
+def _parse_incrementally(text):
+    parser = IncrementalQuestionParser()
+    for start in range(0, len(text), 64):
+        parser.feed(text[start:start + 64])
+    return parser.questions
+
+
+def build_cases(workdir):
+    """[(name, fn)] for every case; fn takes no arguments"""
+    paper_types = sorted({paper_type for board in BOARDS for grade in GRADES
+                          for paper_type in get_paper_types_by_board_and_grade(board, grade) or []})
+    topics = list(get_curriculum_topics(*LOOKUP))
+    exact, fuzzy, miss = topics[0], topics[0].split()[0].lower() + " basics", "Medieval European Trade Guilds"
+
+    cases = [
+        ("curriculum/get_comprehensive_curriculum_topics", get_comprehensive_curriculum_topics),
+        ("curriculum/get_subjects_by_board", get_subjects_by_board),
+        ("curriculum/store_topics", lambda: get_curriculum_topics(*LOOKUP)),
+        ("paper_types/get_paper_types_by_board_and_grade[all]",
+         lambda: [get_paper_types_by_board_and_grade(board, grade) for board in BOARDS for grade in GRADES]),
+        ("paper_formats/get_question_counts_from_paper_type[all]",
+         lambda: [get_question_counts_from_paper_type(paper_type) for paper_type in paper_types]),
+        ("paper_formats/resolve_paper_format[all]", lambda: [resolve_paper_format(paper_type) for paper_type in paper_types]),
+    ]
+    for label, topic in (("exact", exact), ("fuzzy", fuzzy), ("miss", miss)):
+        cases.append((f"topics/validate_topic_against_curriculum[{label}]",
+                      lambda topic=topic: validate_topic_against_curriculum(*LOOKUP, topic)))
+        cases.append((f"topics/validate_topic[{label}]", lambda topic=topic: validate_topic(*LOOKUP, topic)))
+
+    for size, counts in TEST_SIZES.items():
+        test_data = make_test(*counts)
+        text = "```json\n" + json.dumps(test_data, indent=2) + "\n```"
+        questions_path = os.path.join(workdir, f"questions_{size}.pdf")
+        answers_path = os.path.join(workdir, f"answers_{size}.pdf")
+        cases += [
+            (f"parsing/clean_json_response[{size}]", lambda text=text: clean_json_response(text)),
+            (f"parsing/incremental_parser[{size}]", lambda text=text: _parse_incrementally(text)),
+            (f"schema/normalise_test[{size}]", lambda test_data=test_data: normalise_test(test_data)),
+            (f"pdf/create_questions_pdf[{size}]",
+             lambda test_data=test_data, path=questions_path: create_questions_pdf(test_data, path)),
+            (f"pdf/create_answers_pdf[{size}]",
+             lambda test_data=test_data, path=answers_path: create_answers_pdf(test_data, path)),
+            (f"pdf/render_pdf_questions[{size}]", lambda test=normalise_test(test_data): render_pdf(test, "questions")),
+            (f"pdf/render_pdf_answers[{size}]", lambda test=normalise_test(test_data): render_pdf(test, "answers")),
+        ]
+    return cases
+
+
+def time_case(fn, rounds=ROUNDS):
+    """Best and median microseconds per call over rounds of enough calls to fill MIN_ROUND_SECONDS"""
+    fn()
+    loops = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        elapsed = time.perf_counter() - start
+        if elapsed >= MIN_ROUND_SECONDS:
+            break
+        loops *= 2 if elapsed == 0 else max(2, min(10, int(MIN_ROUND_SECONDS / elapsed) + 1))
+    per_call = [elapsed / loops]
+    for _ in range(rounds - 1):
+        start = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        per_call.append((time.perf_counter() - start) / loops)
+    return {"min_us": min(per_call) * 1e6, "median_us": statistics.median(per_call) * 1e6, "loops": loops, "rounds": rounds}
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True).stdout.strip()
+    except OSError:
+        return ""
+
+
+def compare(results, baseline, tolerance=DEFAULT_TOLERANCE):
+    """(regressions, improvements) as [(name, baseline us, current us)], on best time per call"""
+    regressions, improvements = [], []
+    for name, result in results["cases"].items():
+        before = baseline.get("cases", {}).get(name)
+        if before is None:
+            continue
+        old, new = before["min_us"], result["min_us"]
+        if new > old * (1 + tolerance) and new - old > MIN_REGRESSION_US:
+            regressions.append((name, old, new))
+        elif new < old / (1 + tolerance) and old - new > MIN_REGRESSION_US:
+            improvements.append((name, old, new))
+    return regressions, improvements
+
+
+def _write_json(path, data):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2, sort_keys=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--filter", default="", help="only cases whose name contains this")
+    parser.add_argument("--output", default=RESULTS_PATH)
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    args = parser.parse_args()
+
+    results = {
+        "meta": {"python": platform.python_version(), "platform": platform.platform(), "commit": _git_commit(),
+                 "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"), "rounds": ROUNDS},
+        "cases": {}
+    }
+    with tempfile.TemporaryDirectory(prefix="bench_suite_") as workdir:
+        for name, fn in build_cases(workdir):
+            if args.filter in name:
+                results["cases"][name] = timing = time_case(fn)
+                print(f"{name:<60} {timing['min_us']:>12.1f} us  (median {timing['median_us']:.1f})")
+
+    _write_json(args.output, results)
+    print(f"results written to {args.output}")
+    if args.save_baseline:
+        _write_json(args.baseline, results)
+        print(f"baseline saved to {args.baseline}")
+        return
+    if not os.path.exists(args.baseline):
+        print(f"no baseline at {args.baseline}; run with --save-baseline to store one")
+        return
+
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    regressions, improvements = compare(results, baseline, args.tolerance)
+    for name, old, new in improvements:
+        print(f"faster      {name}: {old:.1f} -> {new:.1f} us")
+    for name, old, new in regressions:
+        print(f"REGRESSION  {name}: {old:.1f} -> {new:.1f} us (+{(new / old - 1):.0%})")
+    if regressions:
+        print(f"{len(regressions)} regressions beyond {args.tolerance:.0%} against {args.baseline} "
+              f"(commit {baseline.get('meta', {}).get('commit') or '?'})")
+        sys.exit(1)
+    print(f"no regressions beyond {args.tolerance:.0%} against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,6 +4,8 @@ import requests
 import re
 from datetime import datetime
 import os
+import time
+import uuid
 # Import enhanced functions from mock_test_creator
 from src.components.mock_test_creator import (
     get_board_specific_guidelines,
@@ -11,15 +13,18 @@ from src.components.mock_test_creator import (
     get_available_subjects,
     get_paper_types_by_board_and_grade,
     get_ib_grade_options,
-    get_topics_by_board_grade_subject,
-    validate_topic_against_curriculum,
-    generate_questions,
-    test_claude_api,
     verify_api_key,
-    create_questions_pdf,
-    create_answers_pdf,
     get_comprehensive_curriculum_topics
 )
+from src.components.curriculum_store import get_curriculum_topics
+from src.components.topic_index import validate_topic, suggest_topics
+from src.components.paper_formats import resolve_paper_format
+from src.components.generation_service import submit_generation_job, get_generation_stats
+from src.components.job_queue import QUEUED, RUNNING, DONE, FAILED, QueueFullError, get_job_queue
+from src.components.pdf_export import get_questions_pdf, get_answers_pdf
+from src.components.test_schema import QuestionType, normalise_test
+from src.components.batch_generation import BATCH_BACKEND, curriculum_rows, read_batch_csv, submit_batch_job
+from src.components.tracing import PROFILERS, TRACE_PANEL, SessionTraces, get_trace_stats, phase, span, traced
 
 # Import dashboard functions
 from src.components.dashboard import show_dashboard
@@ -27,6 +32,7 @@ from src.components.dashboard import show_dashboard
 # ========================================
 # CUSTOM LIST SELECTION COMPONENT
 # ========================================
+@traced("custom_list_selector")
 def custom_list_selector(label, options, key=None, selected_value=""):
     """Create a custom list selector that shows options below the selection bar"""
     
@@ -81,7 +87,13 @@ def custom_list_selector(label, options, key=None, selected_value=""):
     
     return st.session_state[selected_key]
 
+# Time every phase of this rerun; a rerun cut short by st.rerun() is closed first
+if 'rerun_traces' not in st.session_state:
+    st.session_state.rerun_traces = SessionTraces()
+st.session_state.rerun_traces.start(st.session_state.get('current_page', 'home'))
+
 # Configure page
+phase("page_config")
 st.set_page_config(
     page_title="II Tuitions Mock Test Generator",
     page_icon="🎯",
@@ -90,6 +102,7 @@ st.set_page_config(
 )
 
 # ENHANCED CSS WITH CUSTOM LIST SELECTOR STYLING
+phase("css")
 st.markdown("""
 <style>
     @import url('https://fonts.googleapis.com/css2?family=Times+New+Roman:wght@400;700&display=swap');
@@ -873,6 +886,7 @@ button[key="back_to_home_top"]:hover, button[key="back_home_btn"]:hover {
     }
 </style>
 """, unsafe_allow_html=True)
+phase("definitions")
 
 # Configuration - FIXED API KEY CONFIGURATION
 CLAUDE_API_KEY = os.getenv("CLAUDE_API_KEY", "")
@@ -889,29 +903,30 @@ try:
 except ImportError:
     PDF_AVAILABLE = False
 
-def display_generated_test(test_data):
-    """Display the generated test in a formatted way with enhanced curriculum info"""
-    if not test_data:
+def display_generated_test(test):
+    """Display a NormalizedTest in a formatted way with enhanced curriculum info"""
+    if not test:
         st.error("No test data to display")
         return
     
-    test_info = test_data.get('test_info', {})
-    questions = test_data.get('questions', [])
-    show_answers_on_screen = test_info.get('show_answers_on_screen', False)
+    info = test.info
     
     # Test header
     st.markdown(f"""
     # 🎓 II Tuition Mock Test Generated
     
-    ## {test_info.get('subject', 'Subject')} Mock Test
+    ## {info.subject} Mock Test
     
-    **Board:** {test_info.get('board', 'N/A')} | **Grade:** {test_info.get('grade', 'N/A')} | **Topic:** {test_info.get('topic', 'N/A')}
+    **Board:** {info.board} | **Grade:** {info.grade} | **Topic:** {info.topic}
     
-    **Paper Type:** {test_info.get('paper_type', 'N/A')} | **Total Questions:** {test_info.get('total_questions', len(questions))}
+    **Paper Type:** {info.paper_type} | **Total Questions:** {info.total_questions}
     
-    **Curriculum Standard:** {test_info.get('curriculum_standard', 'N/A')}
+    **Curriculum Standard:** {info.curriculum_standard}
     """)
     
+    if test.rejected:
+        st.warning(f"⚠️ {len(test.rejected)} malformed question(s) were left out of this paper.")
+    
     # Instructions section
     st.markdown("### 📋 Instructions:")
     
@@ -942,45 +957,195 @@ def display_generated_test(test_data):
     st.markdown("---")
     
     # Questions display
-    for i, question in enumerate(questions, 1):
-        with st.container():
-            st.markdown(f"""
-            <div class="question-box">
-                <h4 style="color: #667eea; margin-bottom: 0.5rem;">Question {i}</h4>
-            </div>
-            """, unsafe_allow_html=True)
-        
-        st.markdown(f"**{question.get('question', 'Question text missing')}**")
-        
-        if question.get('type') == 'mcq' and 'options' in question:
-            options = question['options']
-            for option_key, option_text in options.items():
-                st.write(f"**{option_key})** {option_text}")
-            
-            # Only show correct answer if "Show Answers on Screen" was checked
-            if show_answers_on_screen and 'correct_answer' in question and question['correct_answer']:
-                st.success(f"**Correct Answer: {question['correct_answer']}**")
-                # Show explanation if available
-                if 'explanation' in question and question['explanation']:
-                    st.info(f"**Explanation:** {question['explanation']}")
+    for i, question in enumerate(test.questions, 1):
+        display_question(i, question, info.show_answers_on_screen)
+
+# Heading and prompt under written-answer questions, by type
+ANSWER_PROMPTS = {
+    QuestionType.SHORT: ("Short Answer Question", "Write your detailed answer below:"),
+    QuestionType.LONG: ("Long Answer Question", "Write your detailed answer with proper explanations:")
+}
+
+def display_question(i, question, show_answers_on_screen):
+    """Display a single Question record; used for full tests and for streamed questions"""
+    with st.container():
+        st.markdown(f"""
+        <div class="question-box">
+            <h4 style="color: #667eea; margin-bottom: 0.5rem;">Question {i}</h4>
+        </div>
+        """, unsafe_allow_html=True)
+    
+    st.markdown(f"**{question.text}**")
+    
+    if question.type is QuestionType.MCQ:
+        for option_key, option_text in question.options:
+            st.write(f"**{option_key})** {option_text}")
         
-        elif question.get('type') == 'short' or question.get('type') == 'short_answer':
-            marks = question.get('marks', 3)
-            st.write(f"**[Short Answer Question - {marks} marks]**")
-            st.write("Write your detailed answer below:")
-            # Only show sample answer if "Show Answers on Screen" was checked
-            if show_answers_on_screen and 'sample_answer' in question and question['sample_answer']:
-                st.info(f"**Sample Answer:** {question['sample_answer']}")
+        # Only show correct answer if "Show Answers on Screen" was checked
+        if show_answers_on_screen and question.correct_answer:
+            st.success(f"**Correct Answer: {question.correct_answer}**")
+            # Show explanation if available
+            if question.explanation:
+                st.info(f"**Explanation:** {question.explanation}")
+    
+    else:
+        heading, prompt = ANSWER_PROMPTS[question.type]
+        st.write(f"**[{heading} - {question.marks} marks]**")
+        st.write(prompt)
+        # Only show sample answer if "Show Answers on Screen" was checked
+        if show_answers_on_screen and question.sample_answer:
+            st.info(f"**Sample Answer:** {question.sample_answer}")
+    
+    st.markdown("---")
+
+# Seconds between refreshes while a background job is pending
+JOB_POLL_SECONDS = float(os.getenv("JOB_POLL_SECONDS", "1.5"))
+# Streamlit 1.37+ can refresh just the status block on a timer; older versions rerun the page after it has rendered
+_job_status_fragment = st.fragment(run_every=JOB_POLL_SECONDS) if hasattr(st, "fragment") else None
+
+def job_pending(job_id):
+    """True while a job is still queued or running"""
+    job = get_job_queue().get(job_id)
+    return job is not None and job.status in (QUEUED, RUNNING)
+
+def show_job_status(show_status, job_id):
+    """Render a job's status; returns True when the page must be rerun to poll it again
+    
+    With fragments only the status block refreshes; once the job settles the whole
+    page is rerun so its final state renders outside the timer.
+    """
+    if _job_status_fragment is not None and job_pending(job_id):
+        @_job_status_fragment
+        def refresh_job_status():
+            if job_pending(job_id):
+                show_status()
+            else:
+                st.rerun()
+        refresh_job_status()
+        return False
+    return show_status()
+
+def show_generation_job_status():
+    """Render this session's background generation job; returns True while it is pending"""
+    job_state = st.session_state.generation_job
+    job_queue = get_job_queue()
+    job = job_queue.get(job_state['id'])
+    
+    if job is None:
+        st.session_state.generation_job = None
+        st.warning("⚠️ The generation job expired. Please generate the test again.")
+        return False
+    
+    if job.status == DONE:
+        st.session_state.generation_job = None
+        # Normalised once here; reruns and PDF downloads reuse the records
+        st.session_state.generated_test = normalise_test(job.result)
+        st.session_state.current_page = 'test_display'
+        st.success("✅ Curriculum-aligned test generated successfully!")
+        st.balloons()
+        st.rerun()
+    
+    if job.status == FAILED:
+        st.session_state.generation_job = None
+        st.error(f"❌ Failed to generate test: {job.error}. Please check your API connection and try again.")
+        return False
+    
+    if job.status not in (QUEUED, RUNNING):
+        st.session_state.generation_job = None
+        st.info("Generation cancelled.")
+        return False
+    
+    if job.status == QUEUED:
+        position = job_queue.position(job.id)
+        st.info(f"⏳ Waiting for a free generator ({position or 0} ahead of you, job {job.id[:8]})")
+        if st.button("✖ Cancel", key="cancel_generation_job"):
+            job_queue.cancel(job.id)
+            st.rerun()
+    else:
+        received = len(job.partial)
+        st.info(f"🤖 Generating curriculum-aligned questions... {received} ready after {job.elapsed():.0f}s")
+        if job_state['show_partial']:
+            # Questions are appended by the worker thread; normalise only the ones new since the last rerun
+            shown = job_state.setdefault('partial', [])
+            arrived = list(job.partial)[job_state.setdefault('partial_seen', 0):]
+            job_state['partial_seen'] += len(arrived)
+            shown.extend(normalise_test({'questions': arrived}).questions)
+            for i, question in enumerate(shown, 1):
+                display_question(i, question, job_state['include_answers'])
+    return True
+
+def show_batch_job_status():
+    """Render this session's batch job's progress or the finished zip; returns True while it is pending"""
+    job_queue = get_job_queue()
+    job = job_queue.get(st.session_state.batch_job)
+    total = len(st.session_state.batch_rows)
+    
+    if job is None:
+        st.session_state.batch_job = None
+        st.warning("⚠️ The batch job expired. Start it again to resume from its checkpoint.")
+        return False
+    
+    if job.status == DONE:
+        summary = job.result['summary']
+        st.success(f"✅ Batch finished: {summary['done']} papers generated, {summary['failed']} failed")
+        st.download_button(
+            label="⬇️ Download class set (zip)",
+            data=job.result['zip'],
+            file_name=f"class_set_{summary['id']}.zip",
+            mime="application/zip",
+            key="download_batch_zip"
+        )
+        return False
+    
+    if job.status == FAILED:
+        st.session_state.batch_job = None
+        st.error(f"❌ Batch failed: {job.error}. Start it again to resume from its checkpoint.")
+        return False
+    
+    if job.status not in (QUEUED, RUNNING):
+        st.session_state.batch_job = None
+        st.info("Batch cancelled.")
+        return False
+    
+    if job.status == QUEUED:
+        st.info(f"⏳ Batch waiting for a free generator ({job_queue.position(job.id) or 0} ahead)")
+        if st.button("✖ Cancel batch", key="cancel_batch_job"):
+            job_queue.cancel(job.id)
+            st.rerun()
+    else:
+        finished = list(job.partial)
+        st.progress(min(len(finished) / total, 1.0) if total else 0.0,
+                    text=f"{len(finished)} of {total} papers finished after {job.elapsed():.0f}s")
+        failed = [entry for entry in finished if entry['status'] == 'failed']
+        for entry in failed:
+            st.warning(f"⚠️ {entry['row'][3]}: {entry['error']}")
+    return True
+
+def show_trace_panel(session_traces):
+    """Rerun timings for this session, span totals for the process and on-demand profiling"""
+    with st.expander("🛠️ Rerun timings"):
+        st.caption("Profile the next rerun of this page; the report appears here and in the log")
+        profile_cols = st.columns(len(PROFILERS))
+        for col, profiler in zip(profile_cols, PROFILERS):
+            if col.button(f"Profile next rerun ({profiler})", key=f"trace_profile_{profiler}"):
+                session_traces.profile_next = profiler
+                st.rerun()
         
-        elif question.get('type') == 'long' or question.get('type') == 'long_answer':
-            marks = question.get('marks', 6)
-            st.write(f"**[Long Answer Question - {marks} marks]**")
-            st.write("Write your detailed answer with proper explanations:")
-            # Only show sample answer if "Show Answers on Screen" was checked
-            if show_answers_on_screen and 'sample_answer' in question and question['sample_answer']:
-                st.info(f"**Sample Answer:** {question['sample_answer']}")
+        finished = list(session_traces.history)
+        if finished:
+            st.code(finished[-1].format(), language=None)
+            profiled = [trace for trace in finished if trace.profile]
+            if profiled:
+                st.write(f"**Last profile ({profiled[-1].profiler}, {profiled[-1].label} rerun)**")
+                st.code(profiled[-1].profile, language=None)
+            st.write("**Recent reruns**")
+            st.code("\n".join(trace.summary() for trace in reversed(finished)), language=None)
         
-        st.markdown("---")
+        st.write("**All sessions and workers**")
+        st.code("\n".join(
+            f"{name:<36} {stats['calls']:>7} calls {stats['mean_ms']:>9.1f} ms mean {stats['max_ms']:>9.1f} ms max"
+            for name, stats in get_trace_stats().items()
+        ), language=None)
 
 # Navigation function for dashboard
 def navigate_to_page(page_name):
@@ -989,12 +1154,27 @@ def navigate_to_page(page_name):
     st.rerun()
 
 # Initialize enhanced session state
+phase("session_init")
 if 'current_page' not in st.session_state:
     st.session_state.current_page = 'home'
 
 if 'generated_test' not in st.session_state:
     st.session_state.generated_test = None
 
+# Identifies this browser session to the job queue's per-user fairness
+if 'user_id' not in st.session_state:
+    st.session_state.user_id = uuid.uuid4().hex
+
+if 'generation_job' not in st.session_state:
+    st.session_state.generation_job = None
+
+# Rows of the class set being prepared on the batch page, and its job id once started
+if 'batch_rows' not in st.session_state:
+    st.session_state.batch_rows = []
+
+if 'batch_job' not in st.session_state:
+    st.session_state.batch_job = None
+
 if 'form_data' not in st.session_state:
     st.session_state.form_data = {
         'board': '',
@@ -1013,9 +1193,13 @@ if 'last_validated_topic' not in st.session_state:
     st.session_state.last_validated_topic = ''
 
 # MAIN APPLICATION CONTENT - ENHANCED WITH CURRICULUM INTEGRATION
+phase(f"page:{st.session_state.current_page}")
+# Set by a page showing a pending job that needs the page rerun to poll it
+poll_jobs = False
 if st.session_state.current_page == 'home':
     # Show dashboard using imported function
-    show_dashboard(navigate_to_page)
+    with span("dashboard"):
+        show_dashboard(navigate_to_page)
 
 elif st.session_state.current_page == 'create_test':
     # Add Back button at the top left corner
@@ -1024,6 +1208,10 @@ elif st.session_state.current_page == 'create_test':
         if st.button("🏠 Back to Home", key="back_to_home_top"):
             st.session_state.current_page = 'home'
             st.rerun()
+    with col2:
+        if st.button("📚 Batch class set", key="open_batch_page"):
+            st.session_state.current_page = 'batch_generate'
+            st.rerun()
     
     st.markdown('# 🎯 Create Curriculum-Aligned Mock Test')
 
@@ -1061,7 +1249,8 @@ elif st.session_state.current_page == 'create_test':
     
     if board:
         if board == "IB":
-            grade_options = get_ib_grade_options()
+            with span("curriculum/grade_options"):
+                grade_options = get_ib_grade_options()
             selected_grade = custom_list_selector(
                 "Select your current IB programme and grade", 
                 grade_options, 
@@ -1124,7 +1313,8 @@ elif st.session_state.current_page == 'create_test':
         """, unsafe_allow_html=True)
     
     if board and grade:
-        available_subjects = get_available_subjects(board, grade_num if board == "IB" else grade)
+        with span("curriculum/subjects"):
+            available_subjects = get_available_subjects(board, grade_num if board == "IB" else grade)
         
         if available_subjects:
             selected_subject = custom_list_selector(
@@ -1161,7 +1351,8 @@ elif st.session_state.current_page == 'create_test':
     
     if subject and board and grade:
         # Get curriculum topics for the selected combination
-        curriculum_topics = get_topics_by_board_grade_subject(board, grade_num if board == "IB" else grade, subject)
+        with span("curriculum/topics"):
+            curriculum_topics = get_curriculum_topics(board, grade_num if board == "IB" else grade, subject)
         
         if curriculum_topics:
              
@@ -1194,44 +1385,46 @@ elif st.session_state.current_page == 'create_test':
     topic_valid = True
     
     if topic and subject and board and grade:
-        # Use enhanced curriculum validation function
-        is_relevant, curriculum_topics = validate_topic_against_curriculum(board, grade_num if board == "IB" else grade, subject, topic)
+        # Use the prebuilt curriculum index for validation and ranked suggestions
+        lookup_grade = grade_num if board == "IB" else grade
+        with span("curriculum/validate_topic"):
+            is_relevant, curriculum_topics = validate_topic(board, lookup_grade, subject, topic)
+            ranked_topics = suggest_topics(board, lookup_grade, subject, topic, k=8)
         
         if not is_relevant:
             topic_valid = False
             st.error(f"⚠️ Topic '{topic}' doesn't match {board} Grade {grade} {subject} curriculum")
             
-            # Show curriculum-based suggestions
+            # Show the closest curriculum topics first, then fill up from the curriculum list
             if curriculum_topics:
                 st.info(f"💡 **Suggested topics from {board} Grade {grade} {subject} curriculum:**")
                 
+                suggested = [t for t, _ in ranked_topics]
+                suggested += [t for t in curriculum_topics if t not in suggested][:16 - len(suggested)]
+                
                 col1, col2 = st.columns(2)
-                topics_count = len(curriculum_topics)
-                mid_point = min(topics_count // 2, 8)  # Limit to 8 suggestions per column
+                mid_point = (len(suggested) + 1) // 2
                 
                 with col1:
-                    st.write("**Primary Topics:**")
-                    for i in range(min(mid_point, len(curriculum_topics))):
-                        curriculum_topic = str(curriculum_topics[i])
+                    st.write("**Closest Topics:**")
+                    for curriculum_topic, score in ranked_topics[:mid_point]:
+                        st.write(f"• {curriculum_topic} ({score:.0%} match)")
+                    for curriculum_topic in suggested[len(ranked_topics):mid_point]:
                         st.write(f"• {curriculum_topic}")
                 
                 with col2:
                     st.write("**Additional Topics:**")
-                    start_idx = mid_point
-                    for i in range(start_idx, min(start_idx + 8, len(curriculum_topics))):
-                        if i < len(curriculum_topics):
-                            curriculum_topic = str(curriculum_topics[i])
-                            st.write(f"• {curriculum_topic}")
+                    for curriculum_topic in suggested[mid_point:]:
+                        st.write(f"• {curriculum_topic}")
                             
                 # Show that there are more topics available
                 if len(curriculum_topics) > 16:
                     st.info(f"📚 And {len(curriculum_topics) - 16} more topics in {board} Grade {grade} {subject} curriculum")
         else:
             st.success(f"✅ Topic '{topic}' is valid for {board} Grade {grade} {subject}")
-            # Show matched curriculum topics for confirmation
-            matched_topics = [t for t in curriculum_topics if topic.lower() in t.lower() or t.lower() in topic.lower()]
-            if matched_topics:
-                st.info(f"🎯 **Matched curriculum topics:** {', '.join(matched_topics[:3])}")
+            # Show the best matching curriculum topics for confirmation
+            if ranked_topics:
+                st.info(f"🎯 **Matched curriculum topics:** {', '.join(t for t, _ in ranked_topics[:3])}")
         
         # Store validation result
         st.session_state.last_validated_topic = topic if is_relevant else ''
@@ -1300,7 +1493,8 @@ elif st.session_state.current_page == 'create_test':
     
     if board and grade:
         # Get paper types based on board and grade
-        paper_options = get_paper_types_by_board_and_grade(board, grade_num if board == "IB" else grade)
+        with span("curriculum/paper_types"):
+            paper_options = get_paper_types_by_board_and_grade(board, grade_num if board == "IB" else grade)
         
         if paper_options:
             col1, col2 = st.columns(2)
@@ -1316,60 +1510,10 @@ elif st.session_state.current_page == 'create_test':
                     st.session_state.form_data['paper_type'] = paper_type
             
             with col2:
-                # Enhanced descriptions based on paper type
+                # Description comes from the shared paper-format registry
                 if paper_type:
-                    if "40 MCQs" in paper_type:
-                        st.info("✅ 40 Multiple Choice Questions")
-                    elif "30 MCQs" in paper_type:
-                        st.info("✅ 30 Multiple Choice Questions")
-                    elif "25 MCQs" in paper_type or "25 MCQ" in paper_type:
-                        st.info("✅ 25 Multiple Choice Questions")
-                    elif "20 Mixed" in paper_type:
-                        st.info("✅ 20 Mixed Questions (MCQ + Short)")
-                    elif "15 Short + 15 Long" in paper_type:
-                        st.info("✅ 15 Short + 15 Long Answer Questions")
-                    elif "15 Activity" in paper_type or "Skills Practice" in paper_type:
-                        st.info("✅ 15 Hands-on Activity Tasks")
-                    elif "25 Exploration" in paper_type or "Inquiry Tasks" in paper_type:
-                        st.info("✅ 25 Inquiry-based Questions")
-                    elif "Primary Assessment" in paper_type or "Foundation Test" in paper_type:
-                        st.info("✅ 20 Age-appropriate Mixed Questions")
-                    elif "Board Pattern Paper 1" in paper_type:
-                        st.info("✅ 25 MCQs + 15 Short Answers")
-                    elif "Board Pattern Paper 2" in paper_type:
-                        st.info("✅ 10 Short + 10 Long Answer Questions")
-                    elif "Sample Paper Format" in paper_type or "Mock" in paper_type:
-                        st.info("✅ Full Board Exam Pattern")
-                    elif "ICSE Board Format Paper 1" in paper_type:
-                        st.info("✅ 40 Multiple Choice Questions")
-                    elif "ICSE Board Format Paper 2" in paper_type:
-                        st.info("✅ Descriptive Answer Questions")
-                    elif "Theory" in paper_type:
-                        st.info("✅ Theory Questions (Mixed Format)")
-                    elif "Practical" in paper_type:
-                        st.info("✅ Practical-based Questions")
-                    elif "A-Level" in paper_type:
-                        st.info("✅ Advanced Level Questions")
-                    elif "HSC Board Pattern" in paper_type:
-                        st.info("✅ 40 Higher Secondary Questions")
-                    elif "State Board" in paper_type:
-                        st.info("✅ State Board Exam Pattern")
-                    elif "Criterion-Based" in paper_type:
-                        st.info("✅ 25 Criterion-based Questions")
-                    elif "Personal Project" in paper_type:
-                        st.info("✅ 15 Research Questions")
-                    elif "Certificate Practice" in paper_type:
-                        st.info("✅ 40 Certificate Exam Questions")
-                    elif "Data Analysis" in paper_type:
-                        st.info("✅ Data Analysis & Application")
-                    elif "Cambridge Primary" in paper_type:
-                        st.info("✅ 20 Primary Level Questions")
-                    elif "Checkpoint" in paper_type:
-                        st.info("✅ 30 Checkpoint Assessment Questions")
-                    elif "Oral Assessment" in paper_type:
-                        st.info("✅ 10 Oral Questions")
-                    else:
-                        st.info("✅ Custom Question Format")
+                    paper_format = resolve_paper_format(paper_type)
+                    st.info(f"✅ {paper_format.description}")
         else:
             st.error("❌ No paper types available for this grade")
             paper_type = ""
@@ -1378,6 +1522,8 @@ elif st.session_state.current_page == 'create_test':
         paper_type = ""
     
     include_answers = st.checkbox("Show answers on screen after generation", value=False, key="show_answers_checkbox")
+    force_fresh = st.checkbox("Generate fresh questions (skip saved papers)", value=False, key="force_fresh_checkbox")
+    stream_questions = st.checkbox("Show questions as they are generated", value=True, key="stream_questions_checkbox")
     
     # Move the Generate button to the end of the page
     st.markdown("---")
@@ -1391,22 +1537,67 @@ elif st.session_state.current_page == 'create_test':
             if not all_valid or not paper_type:
                 st.error("❌ Please fix validation errors and select paper type before creating the test")
             else:
-                with st.spinner("🤖 Generating curriculum-aligned questions..."):
-                    # FIXED - CORRECT NUMBER OF PARAMETERS
-                    test_data = generate_questions(board, grade_num if board == "IB" else grade, subject, topic, paper_type, include_answers)
-                    
-                    if test_data:
-                        st.success("✅ Curriculum-aligned test generated successfully!")
-                        st.balloons()
-                        st.session_state.generated_test = test_data
-                        st.session_state.current_page = 'test_display'
-                        st.rerun()
-                    else:
-                        st.error("❌ Failed to generate test. Please check your API connection and try again.")
+                lookup_grade = grade_num if board == "IB" else grade
+                try:
+                    # Generation runs on the shared worker pool; this page polls for the result
+                    job_id = submit_generation_job(
+                        st.session_state.user_id, board, lookup_grade, subject, topic, paper_type,
+                        include_answers, force_fresh=force_fresh
+                    )
+                    st.session_state.generation_job = {
+                        'id': job_id,
+                        'show_partial': stream_questions,
+                        'include_answers': include_answers
+                    }
+                except QueueFullError as e:
+                    st.error(f"❌ {str(e)}")
+    
+    if st.session_state.generation_job:
+        poll_jobs = show_job_status(show_generation_job_status, st.session_state.generation_job['id'])
+    
+    with st.expander("📊 Generation statistics"):
+        generation_stats = get_generation_stats()
+        stat_col1, stat_col2, stat_col3, stat_col4 = st.columns(4)
+        stat_col1.metric("Saved papers served", generation_stats['cache']['hits'], help="Requests answered from the generation cache")
+        stat_col2.metric("Claude calls saved", generation_stats['single_flight']['coalesced_calls'], help="Requests that joined an identical generation already in progress")
+        stat_col3.metric("Claude calls made", generation_stats['resilience']['counters'].get('attempts', 0), help="Messages API requests sent, retries included")
+        stat_col4.metric("Questions in bank", generation_stats['question_bank']['total'], help="Saved questions new papers are assembled from before asking Claude")
+        resilience_stats = generation_stats['resilience']
+        stat_col5, stat_col6, stat_col7, stat_col8 = st.columns(4)
+        stat_col5.metric("Retried calls", resilience_stats['counters'].get('retries', 0), help="Claude calls retried after a 429, 5xx or connection error")
+        stat_col6.metric("Rate-limit waits", resilience_stats['rate_limiter']['waits'], help="Calls held back to stay within the account's requests and tokens per minute")
+        stat_col7.metric("Claude status", resilience_stats['circuit_breaker']['state'].replace('_', ' ').title())
+        stat_col8.metric("Fallback papers", generation_stats['cache']['fallbacks'], help="Saved papers served while Claude was unavailable")
+        latency_stats = generation_stats['latency']
+        if latency_stats['calls']:
+            st.caption(
+                f"Claude latency over the last {latency_stats['calls']} calls (p50 / p95 / max ms): "
+                f"connect {latency_stats['connect_ms']['p50']:.0f} / {latency_stats['connect_ms']['p95']:.0f} / {latency_stats['connect_ms']['max']:.0f}, "
+                f"first byte {latency_stats['ttfb_ms']['p50']:.0f} / {latency_stats['ttfb_ms']['p95']:.0f} / {latency_stats['ttfb_ms']['max']:.0f}, "
+                f"total {latency_stats['total_ms']['p50']:.0f} / {latency_stats['total_ms']['p95']:.0f} / {latency_stats['total_ms']['max']:.0f} "
+                f"({latency_stats['new_connections']} new connections, {latency_stats['errors']} errors)"
+            )
+        token_stats = generation_stats['tokens']
+        if token_stats['calls']:
+            ttfb = token_stats['ttfb_ms']
+            st.caption(
+                f"Prompt cache: {token_stats['cached_fraction']:.0%} of input tokens read from cache "
+                f"({token_stats['cache_read_input_tokens']:,} cached, {token_stats['cache_creation_input_tokens']:,} written, "
+                f"{token_stats['input_tokens']:,} uncached over {token_stats['calls']} calls)"
+                + (f" · first byte {ttfb['cached']['p50']:.0f} ms cached vs {ttfb['uncached']['p50']:.0f} ms uncached"
+                   if 'cached' in ttfb and 'uncached' in ttfb else "")
+            )
+        budget_stats = generation_stats['token_budget']
+        if budget_stats['observations']:
+            st.caption(
+                f"Output token budget: {budget_stats['mean_predicted']:.0f} predicted vs {budget_stats['mean_actual']:.0f} actual per call "
+                f"(±{budget_stats['mean_abs_error_pct']:.0f}%, {budget_stats['truncated']} truncated of {budget_stats['observations']})"
+            )
+        st.caption(f"LLM backend: {generation_stats['backend']}")
 
 elif st.session_state.current_page == 'test_display':
     if st.session_state.generated_test:
-        test_data = st.session_state.generated_test
+        test = st.session_state.generated_test
         
         # Enhanced Header buttons with PDF download functionality
         st.markdown("### Navigation & Downloads")
@@ -1427,34 +1618,38 @@ elif st.session_state.current_page == 'test_display':
         with button_col3:
             if st.button("📄 Questions PDF", key="q_pdf", use_container_width=True):
                 if PDF_AVAILABLE:
-                    with st.spinner("Generating questions PDF..."):
-                        questions_pdf = create_questions_pdf(test_data, "questions.pdf")
+                    with st.spinner("Generating questions PDF..."), span("pdf/questions"):
+                        # Rendered in memory; repeat clicks for the same test reuse the cached bytes
+                        questions_pdf = get_questions_pdf(test)
                         if questions_pdf:
-                            with open(questions_pdf, "rb") as pdf_file:
-                                st.download_button(
-                                    label="⬇️ Download Questions",
-                                    data=pdf_file.read(),
-                                    file_name=f"mock_test_questions_{test_data['test_info']['subject']}_grade_{test_data['test_info']['grade']}.pdf",
-                                    mime="application/pdf",
-                                    key="download_q"
-                                )
+                            st.download_button(
+                                label="⬇️ Download Questions",
+                                data=questions_pdf,
+                                file_name=f"mock_test_questions_{test.info.subject}_grade_{test.info.grade}.pdf",
+                                mime="application/pdf",
+                                key="download_q"
+                            )
+                        else:
+                            st.error("Error creating PDF. Please try again.")
                 else:
                     st.error("PDF generation not available. Please install reportlab: pip install reportlab")
         
         with button_col4:
             if st.button("📝 Answers PDF", key="a_pdf", use_container_width=True):
                 if PDF_AVAILABLE:
-                    with st.spinner("Generating answers PDF..."):
-                        answers_pdf = create_answers_pdf(test_data, "answers.pdf")
+                    with st.spinner("Generating answers PDF..."), span("pdf/answers"):
+                        # Rendered in memory; repeat clicks for the same test reuse the cached bytes
+                        answers_pdf = get_answers_pdf(test)
                         if answers_pdf:
-                            with open(answers_pdf, "rb") as pdf_file:
-                                st.download_button(
-                                    label="⬇️ Download Answers",
-                                    data=pdf_file.read(),
-                                    file_name=f"mock_test_answers_{test_data['test_info']['subject']}_grade_{test_data['test_info']['grade']}.pdf",
-                                    mime="application/pdf",
-                                    key="download_a"
-                                )
+                            st.download_button(
+                                label="⬇️ Download Answers",
+                                data=answers_pdf,
+                                file_name=f"mock_test_answers_{test.info.subject}_grade_{test.info.grade}.pdf",
+                                mime="application/pdf",
+                                key="download_a"
+                            )
+                        else:
+                            st.error("Error creating PDF. Please try again.")
                 else:
                     st.error("PDF generation not available. Please install reportlab: pip install reportlab")
         
@@ -1467,8 +1662,14 @@ elif st.session_state.current_page == 'test_display':
         if not PDF_AVAILABLE:
             st.warning("📋 **PDF functionality requires additional package.** Run: `pip install reportlab` to enable PDF downloads.")
         
+        if test.info.served_from_fallback:
+            st.warning("⚠️ Claude is unavailable right now, so this is the most recent saved paper for the same request. Try generating again in a few minutes.")
+        
+        if test.info.repeated_questions:
+            st.info(f"ℹ️ {test.info.repeated_questions} question(s) closely repeat earlier papers for this subject; not enough new ones could be generated.")
+        
         # Display the generated test with enhanced curriculum info
-        display_generated_test(test_data)
+        display_generated_test(test)
         
     else:
         st.warning("No test generated yet. Please create a test first.")
@@ -1476,6 +1677,83 @@ elif st.session_state.current_page == 'test_display':
             st.session_state.current_page = 'create_test'
             st.rerun()
 
+elif st.session_state.current_page == 'batch_generate':
+    if st.button("← Back to Create", key="batch_back_create"):
+        st.session_state.current_page = 'create_test'
+        st.rerun()
+    
+    st.markdown('# 📚 Generate a Class Set')
+    st.write("Generate a paper for every row below and download all question and answer PDFs as one zip. "
+             "Restarting the same batch resumes where it stopped.")
+    
+    batch_col1, batch_col2 = st.columns(2)
+    with batch_col1:
+        st.markdown("**Add every curriculum topic**")
+        batch_board = st.selectbox("Board", ["CBSE", "ICSE", "IB", "Cambridge IGCSE", "State Board"], key="batch_board")
+        batch_grade = st.selectbox("Grade", list(range(1, 13)), index=9, key="batch_grade")
+        batch_subjects = get_available_subjects(batch_board, batch_grade) or []
+        batch_subject = st.selectbox("Subject", batch_subjects, key="batch_subject")
+        batch_paper_type = st.selectbox("Paper type", get_paper_types_by_board_and_grade(batch_board, batch_grade) or [], key="batch_paper_type")
+        if st.button("➕ Add all topics", key="batch_add_topics", disabled=not (batch_subject and batch_paper_type)):
+            added = curriculum_rows(batch_board, batch_grade, batch_subject, batch_paper_type)
+            st.session_state.batch_rows.extend(row for row in added if row not in st.session_state.batch_rows)
+            st.rerun()
+    
+    with batch_col2:
+        st.markdown("**Or upload a CSV**")
+        st.caption("Columns: board, grade, subject, topic, paper_type")
+        batch_csv = st.file_uploader("Batch CSV", type=["csv"], key="batch_csv")
+        if batch_csv is not None and st.button("➕ Add CSV rows", key="batch_add_csv"):
+            try:
+                added = read_batch_csv(batch_csv.getvalue().decode("utf-8-sig"))
+                st.session_state.batch_rows.extend(row for row in added if row not in st.session_state.batch_rows)
+                st.rerun()
+            except ValueError as e:
+                st.error(f"❌ {str(e)}")
+    
+    if st.session_state.batch_rows:
+        st.markdown(f"### {len(st.session_state.batch_rows)} papers in this batch")
+        st.dataframe([row._asdict() for row in st.session_state.batch_rows], use_container_width=True)
+        
+        use_message_batches = st.checkbox(
+            "Overnight mode (Message Batches)", key="batch_use_message_batches",
+            value=BATCH_BACKEND == "message_batches",
+            help="Submit all papers as one asynchronous batch: cheaper, but results can take hours"
+        )
+        run_col1, run_col2 = st.columns(2)
+        with run_col1:
+            if st.button("🚀 Start batch", key="start_batch", disabled=bool(st.session_state.batch_job), use_container_width=True):
+                try:
+                    st.session_state.batch_job = submit_batch_job(
+                        st.session_state.user_id, st.session_state.batch_rows,
+                        backend="message_batches" if use_message_batches else "sync"
+                    )
+                except QueueFullError as e:
+                    st.error(f"❌ {str(e)}")
+        with run_col2:
+            if st.button("🗑️ Clear rows", key="clear_batch", use_container_width=True):
+                st.session_state.batch_rows = []
+                st.session_state.batch_job = None
+                st.rerun()
+    else:
+        st.info("Add curriculum topics or upload a CSV to build the batch.")
+    
+    if st.session_state.batch_job:
+        poll_jobs = show_job_status(show_batch_job_status, st.session_state.batch_job)
+
+# ========================================
+# RERUN TIMINGS (TRACE_PANEL=1)
+# ========================================
+phase("debug_panel")
+if TRACE_PANEL:
+    show_trace_panel(st.session_state.rerun_traces)
+st.session_state.rerun_traces.finish()
+
+# A pending job without a fragment timer is polled only once the whole page has rendered
+if poll_jobs:
+    time.sleep(JOB_POLL_SECONDS)
+    st.rerun()
+
 # Entry point
 if __name__ == "__main__":
     pass
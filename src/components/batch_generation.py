@@ -0,0 +1,287 @@
+import csv
+import hashlib
+import io
+import json
+import logging
+import os
+import re
+import threading
+import time
+import zipfile
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import requests
+
+from src.components.generation_cache import CACHE_DIR
+from src.components.generation_service import generate_test
+from src.components.job_queue import PRIORITY_BATCH, get_job_queue
+from src.components.message_batches import collect_test_batch, submit_test_batch, wait_for_message_batch
+from src.components.pdf_export import PDF_AVAILABLE, render_pdf
+from src.components.test_schema import normalise_test
+
+# ========================================
+# BATCH CLASS-SET GENERATION
+# ========================================
+# Generates a list of (board, grade, subject, topic, paper_type) rows with
+# bounded concurrency and writes each paper's question and answer PDFs into a
+# batch directory. Progress is checkpointed after every row, so re-running the
+# same rows resumes where the previous run stopped. A 429 from the API pauses
+# every worker until its retry-after has passed. The finished set is zipped
+# together with a manifest.
+#
+# With the "message_batches" backend the pending rows are instead submitted as
+# one asynchronous Message Batch; its id is checkpointed, so a restart resumes
+# polling the same batch instead of paying for it twice.
+
+BATCH_DIR = os.path.join(CACHE_DIR, "batches")
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "3"))
+# "sync" (concurrent Messages API calls) or "message_batches"
+BATCH_BACKEND = os.getenv("BATCH_BACKEND", "sync")
+BATCH_BACKENDS = ("sync", "message_batches")
+BATCH_MAX_ATTEMPTS = int(os.getenv("BATCH_MAX_ATTEMPTS", "3"))
+# Pause when a rate-limited response carries no retry-after header
+BATCH_RATE_LIMIT_PAUSE = float(os.getenv("BATCH_RATE_LIMIT_PAUSE", "30"))
+CHECKPOINT_FILE = "checkpoint.json"
+CSV_COLUMNS = ("board", "grade", "subject", "topic", "paper_type")
+
+BatchRow = namedtuple("BatchRow", CSV_COLUMNS)
+
+logger = logging.getLogger(__name__)
+
+
+def _coerce_grade(grade):
+    """Numeric grades stay ints so they match the rest of the app's lookups"""
+    text = str(grade).strip()
+    return int(text) if text.isdigit() else text
+
+
+def read_batch_csv(text):
+    """Parse CSV text with board,grade,subject,topic,paper_type columns into rows"""
+    reader = csv.DictReader(io.StringIO(text))
+    missing = [column for column in CSV_COLUMNS if column not in (reader.fieldnames or [])]
+    if missing:
+        raise ValueError(f"Batch CSV is missing columns: {', '.join(missing)}")
+    return [
+        BatchRow(record["board"].strip(), _coerce_grade(record["grade"]), record["subject"].strip(),
+                 record["topic"].strip(), record["paper_type"].strip())
+        for record in reader if record.get("topic", "").strip()
+    ]
+
+
+def curriculum_rows(board, grade, subject, paper_type):
+    """One row per curriculum topic for a board/grade/subject"""
+    from src.components.curriculum_store import get_curriculum_topics
+
+    return [BatchRow(board, grade, subject, topic, paper_type) for topic in get_curriculum_topics(board, grade, subject)]
+
+
+def batch_id(rows):
+    """Stable id for a list of rows, so re-running the same list resumes it"""
+    payload = json.dumps([list(row) for row in rows], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+def _slug(text, limit=40):
+    return re.sub(r'[^a-z0-9]+', '_', str(text).lower()).strip('_')[:limit] or "paper"
+
+
+def _retry_after(error):
+    """Seconds to wait after a rate-limited response, or None when it was not rate limited"""
+    response = getattr(error, "response", None)
+    if response is None or response.status_code != 429:
+        return None
+    try:
+        return float(response.headers.get("retry-after", BATCH_RATE_LIMIT_PAUSE))
+    except ValueError:
+        return BATCH_RATE_LIMIT_PAUSE
+
+
+class BatchRunner:
+    """Runs one batch of rows into a checkpointed directory"""
+
+    def __init__(self, rows, directory=None, concurrency=BATCH_CONCURRENCY, max_attempts=BATCH_MAX_ATTEMPTS,
+                 backend=BATCH_BACKEND):
+        if backend not in BATCH_BACKENDS:
+            raise ValueError(f"Unknown batch backend: {backend}")
+        self.rows = list(rows)
+        self.backend = backend
+        self.id = batch_id(self.rows)
+        self.directory = directory or os.path.join(BATCH_DIR, self.id)
+        self.concurrency = concurrency
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        self._paused_until = 0.0
+        os.makedirs(self.directory, exist_ok=True)
+        self.checkpoint = self._load_checkpoint()
+
+    def _checkpoint_path(self):
+        return os.path.join(self.directory, CHECKPOINT_FILE)
+
+    def _load_checkpoint(self):
+        try:
+            with open(self._checkpoint_path(), encoding="utf-8") as f:
+                checkpoint = json.load(f)
+        except (OSError, ValueError):
+            checkpoint = {}
+        if checkpoint.get("id") != self.id:
+            checkpoint = {"id": self.id, "rows": {}}
+        return checkpoint
+
+    def _save_checkpoint(self):
+        """Write the checkpoint atomically so a crash never leaves it half-written"""
+        path = self._checkpoint_path()
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(self.checkpoint, f, indent=2)
+        os.replace(path + ".tmp", path)
+
+    def _record(self, index, entry):
+        with self._lock:
+            self.checkpoint["rows"][str(index)] = entry
+            self._save_checkpoint()
+
+    def pending(self):
+        """Indexes of rows not completed by this or an earlier run"""
+        return [index for index in range(len(self.rows))
+                if self.checkpoint["rows"].get(str(index), {}).get("status") != "done"]
+
+    def _wait_for_rate_limit(self):
+        while True:
+            with self._lock:
+                wait = self._paused_until - time.time()
+            if wait <= 0:
+                return
+            time.sleep(min(wait, 1.0))
+
+    def _pause(self, seconds):
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.time() + seconds)
+        logger.warning("rate limited, pausing batch %s for %.0fs", self.id, seconds)
+
+    def _generate(self, row):
+        """Generate one paper, waiting out rate limits and retrying transient HTTP failures"""
+        for attempt in range(1, self.max_attempts + 1):
+            self._wait_for_rate_limit()
+            try:
+                test_data = generate_test(row.board, row.grade, row.subject, row.topic, row.paper_type)
+                if not test_data:
+                    raise RuntimeError("No questions were generated")
+                return test_data
+            except requests.RequestException as e:
+                if attempt == self.max_attempts:
+                    raise
+                retry_after = _retry_after(e)
+                if retry_after is not None:
+                    # Every worker shares the same API limit, so all of them wait
+                    self._pause(retry_after)
+                else:
+                    time.sleep(2 ** attempt)
+
+    def _fail_row(self, index, error):
+        logger.warning("batch %s row %d failed: %s", self.id, index + 1, error)
+        entry = {"status": "failed", "error": str(error), "row": list(self.rows[index])}
+        self._record(index, entry)
+        return entry
+
+    def _write_row(self, index, test_data):
+        """Write a finished paper's PDFs and JSON and checkpoint the row"""
+        row = self.rows[index]
+        stem = f"{index + 1:03d}_{_slug(row.topic)}"
+        entry = {"status": "done", "row": list(row), "questions": len(test_data.get('questions', []))}
+        if PDF_AVAILABLE:
+            test = normalise_test(test_data)
+            for kind in ("questions", "answers"):
+                filename = f"{stem}_{kind}.pdf"
+                with open(os.path.join(self.directory, filename), "wb") as f:
+                    f.write(render_pdf(test, kind))
+                entry[f"{kind}_pdf"] = filename
+        with open(os.path.join(self.directory, f"{stem}.json"), "w", encoding="utf-8") as f:
+            json.dump(test_data, f, ensure_ascii=False, indent=2)
+        entry["json"] = f"{stem}.json"
+        self._record(index, entry)
+        return entry
+
+    def _run_row(self, index):
+        try:
+            test_data = self._generate(self.rows[index])
+        except Exception as e:
+            return self._fail_row(index, e)
+        return self._write_row(index, test_data)
+
+    def _run_message_batch(self, pending, on_row):
+        batch_id = self.checkpoint.get("message_batch_id")
+        if batch_id is None:
+            batch_id = submit_test_batch(self.rows, pending)
+            with self._lock:
+                self.checkpoint["message_batch_id"] = batch_id
+                self._save_checkpoint()
+        else:
+            logger.info("resuming message batch %s", batch_id)
+
+        batch = wait_for_message_batch(batch_id)
+        for index, test_data, error in collect_test_batch(batch, self.rows):
+            if index not in pending:
+                continue
+            entry = self._write_row(index, test_data) if test_data else self._fail_row(index, error)
+            if on_row:
+                on_row(index, entry)
+
+        # Rows still pending go into a fresh batch on the next run
+        with self._lock:
+            self.checkpoint.pop("message_batch_id", None)
+            self._save_checkpoint()
+
+    def run(self, on_row=None):
+        """Generate every pending row; on_row(index, entry) is called as each one finishes"""
+        pending = self.pending()
+        if not pending:
+            return self.summary()
+        if self.backend == "message_batches":
+            self._run_message_batch(pending, on_row)
+            return self.summary()
+        with ThreadPoolExecutor(max_workers=max(1, min(self.concurrency, len(pending)))) as executor:
+            # In finishing order, so a slow or backing-off row does not hide the progress of later ones
+            futures = {executor.submit(self._run_row, index): index for index in pending}
+            for future in as_completed(futures):
+                if on_row:
+                    on_row(futures[future], future.result())
+        return self.summary()
+
+    def summary(self):
+        statuses = [entry.get("status") for entry in self.checkpoint["rows"].values()]
+        return {
+            "id": self.id,
+            "total": len(self.rows),
+            "done": statuses.count("done"),
+            "failed": statuses.count("failed"),
+            "directory": self.directory
+        }
+
+    def build_zip(self):
+        """Zip of every finished paper's PDFs (or JSON) plus a manifest.csv"""
+        buffer = io.BytesIO()
+        manifest = io.StringIO()
+        writer = csv.writer(manifest)
+        writer.writerow(CSV_COLUMNS + ("status", "questions", "files", "error"))
+        with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+            for index, row in enumerate(self.rows):
+                entry = self.checkpoint["rows"].get(str(index), {"status": "pending"})
+                files = [entry[key] for key in ("questions_pdf", "answers_pdf", "json") if entry.get(key)]
+                for filename in files:
+                    archive.write(os.path.join(self.directory, filename), filename)
+                writer.writerow(list(row) + [entry["status"], entry.get("questions", ""), " ".join(files), entry.get("error", "")])
+            archive.writestr("manifest.csv", manifest.getvalue())
+        return buffer.getvalue()
+
+
+def run_batch_job(job, rows, backend=BATCH_BACKEND):
+    """Job-queue worker: run a batch, exposing finished rows on job.partial, and return the zip"""
+    runner = BatchRunner(rows, backend=backend)
+    job.partial.extend(entry for entry in runner.checkpoint["rows"].values() if entry.get("status") == "done")
+    runner.run(on_row=lambda index, entry: job.partial.append(entry))
+    return {"summary": runner.summary(), "zip": runner.build_zip()}
+
+
+def submit_batch_job(user_id, rows, backend=BATCH_BACKEND):
+    """Queue a batch behind interactive generations and return its job id"""
+    return get_job_queue().submit(user_id, run_batch_job, list(rows), backend, priority=PRIORITY_BATCH)
@@ -0,0 +1,409 @@
+import json
+import logging
+import os
+import random
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+from src.components.llm_backends import CLAUDE_API_URL, get_llm_backend
+from src.components.resilience import CircuitOpenError, get_circuit_breaker, get_rate_limiter, get_resilience_counters
+
+# ========================================
+# CLAUDE MESSAGES API CLIENT
+# ========================================
+# Every Anthropic call goes through one process-wide requests.Session so
+# connections are kept alive and reused across reruns and sessions. Each call
+# records how long connection setup, the first byte and the whole call took,
+# and how many input tokens were read from or written to the prompt cache.
+# Calls are paced by the shared rate limiter, retried with jittered exponential
+# backoff (honouring retry-after) on 429, 5xx and connection errors, and refused
+# while the circuit breaker is open. Requests go to the backend chosen by
+# LLM_BACKEND (the API, the local stand-in or recorded replays).
+
+CLAUDE_API_KEY = os.getenv("CLAUDE_API_KEY", "")
+CLAUDE_MODEL = os.getenv("CLAUDE_MODEL", "claude-3-5-sonnet-20241022")
+ANTHROPIC_VERSION = "2023-06-01"
+CONNECT_TIMEOUT = float(os.getenv("CLAUDE_CONNECT_TIMEOUT", "10"))
+READ_TIMEOUT = float(os.getenv("CLAUDE_READ_TIMEOUT", "120"))
+POOL_CONNECTIONS = int(os.getenv("CLAUDE_POOL_CONNECTIONS", "4"))
+POOL_MAXSIZE = int(os.getenv("CLAUDE_POOL_MAXSIZE", "16"))
+LATENCY_SAMPLES = 500
+RETRY_MAX_ATTEMPTS = int(os.getenv("CLAUDE_RETRY_MAX_ATTEMPTS", "4"))
+RETRY_BASE_DELAY = float(os.getenv("CLAUDE_RETRY_BASE_DELAY", "1"))
+RETRY_MAX_DELAY = float(os.getenv("CLAUDE_RETRY_MAX_DELAY", "30"))
+USAGE_FIELDS = ("input_tokens", "cache_read_input_tokens", "cache_creation_input_tokens", "output_tokens")
+# 529 is Anthropic's "overloaded"
+RETRYABLE_STATUSES = (429, 500, 502, 503, 504, 529)
+
+_session = None
+_session_lock = threading.Lock()
+_connect_timing = threading.local()
+_latency_samples = deque(maxlen=LATENCY_SAMPLES)
+_latency_lock = threading.Lock()
+
+logger = logging.getLogger(__name__)
+
+
+# ========================================
+# TIMED CONNECTION POOL
+# ========================================
+
+class _TimedHTTPConnection(HTTPConnection):
+    def connect(self):
+        start = time.perf_counter()
+        super().connect()
+        _connect_timing.connect_ms = (time.perf_counter() - start) * 1000
+
+
+class _TimedHTTPSConnection(HTTPSConnection):
+    def connect(self):
+        start = time.perf_counter()
+        super().connect()
+        _connect_timing.connect_ms = (time.perf_counter() - start) * 1000
+
+
+class _TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _TimedHTTPConnection
+
+
+class _TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _TimedHTTPSConnection
+
+
+class TimedHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter whose connections record DNS + TCP + TLS setup time"""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _TimedHTTPConnectionPool,
+            "https": _TimedHTTPSConnectionPool
+        }
+
+
+def get_session():
+    """Return the process-wide keep-alive session"""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = TimedHTTPAdapter(pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE, max_retries=0)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                get_llm_backend().mount(session)
+                _session = session
+    return _session
+
+
+def reset_session():
+    """Drop the pooled session so the next call builds one for the current backend"""
+    global _session
+    with _session_lock:
+        session, _session = _session, None
+    if session is not None:
+        session.close()
+
+
+def _record_latency(sample):
+    with _latency_lock:
+        _latency_samples.append(sample)
+
+
+def _percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def get_latency_stats():
+    """Summarise recent calls: connect vs. time-to-first-byte vs. total, in ms"""
+    with _latency_lock:
+        samples = list(_latency_samples)
+    if not samples:
+        return {"calls": 0}
+
+    stats = {
+        "calls": len(samples),
+        "new_connections": sum(1 for sample in samples if sample["connect_ms"] > 0),
+        "errors": sum(1 for sample in samples if sample["status"] is None or sample["status"] >= 400)
+    }
+    for metric in ("connect_ms", "ttfb_ms", "total_ms"):
+        values = [sample[metric] for sample in samples]
+        stats[metric] = {"p50": _percentile(values, 0.5), "p95": _percentile(values, 0.95), "max": max(values)}
+    return stats
+
+
+def get_token_stats():
+    """Input tokens read from the prompt cache vs. written to it vs. uncached, over recent calls
+
+    ttfb_ms compares time-to-first-byte of calls that read a cached prefix with
+    those that did not.
+    """
+    with _latency_lock:
+        samples = [sample for sample in _latency_samples if sample["status"] is not None and sample["status"] < 400]
+    totals = {field: sum(sample[field] for sample in samples) for field in USAGE_FIELDS}
+    prompt_tokens = totals["input_tokens"] + totals["cache_read_input_tokens"] + totals["cache_creation_input_tokens"]
+    stats = {
+        "calls": len(samples),
+        **totals,
+        "cached_fraction": totals["cache_read_input_tokens"] / prompt_tokens if prompt_tokens else 0.0,
+        "ttfb_ms": {}
+    }
+    for label, group in (("cached", [s for s in samples if s["cache_read_input_tokens"]]),
+                         ("uncached", [s for s in samples if not s["cache_read_input_tokens"]])):
+        if group:
+            stats["ttfb_ms"][label] = {"calls": len(group), "p50": _percentile([s["ttfb_ms"] for s in group], 0.5)}
+    return stats
+
+
+# ========================================
+# MESSAGES API CALLS
+# ========================================
+
+def build_headers(api_key=None):
+    """Headers for a Messages API request"""
+    return {
+        "x-api-key": api_key or CLAUDE_API_KEY,
+        "anthropic-version": ANTHROPIC_VERSION,
+        "content-type": "application/json"
+    }
+
+
+def build_payload(prompt, max_tokens=4000, stream=False, system=None):
+    """Messages API body for a single user prompt, with optional system blocks"""
+    payload = {
+        "model": CLAUDE_MODEL,
+        "max_tokens": max_tokens,
+        "messages": [{"role": "user", "content": prompt}]
+    }
+    if system:
+        payload["system"] = system
+    if stream:
+        payload["stream"] = True
+    return payload
+
+
+def build_prompt_payload(prompt, max_tokens=4000, stream=False):
+    """Messages API body for a GenerationPrompt: cacheable system prefix, per-request user tail"""
+    return build_payload(prompt.user, max_tokens, stream, system=prompt.system)
+
+
+class _TimedCall:
+    """Context manager around one pooled request that records its latency breakdown"""
+
+    def __init__(self, payload, api_key, stream):
+        self.payload = payload
+        self.api_key = api_key
+        self.stream = stream
+        self.response = None
+
+    def __enter__(self):
+        _connect_timing.connect_ms = 0.0
+        self.start = time.perf_counter()
+        self.sample = {"connect_ms": 0.0, "ttfb_ms": 0.0, "total_ms": 0.0, "status": None, "stream": self.stream,
+                       "input_tokens": 0, "cache_read_input_tokens": 0, "cache_creation_input_tokens": 0, "output_tokens": 0}
+        try:
+            # stream=True returns as soon as the headers arrive, which gives time-to-first-byte
+            self.response = get_session().post(
+                get_llm_backend().messages_url(), headers=build_headers(self.api_key), json=self.payload,
+                timeout=(CONNECT_TIMEOUT, READ_TIMEOUT), stream=True
+            )
+        except requests.RequestException:
+            self._finish()
+            raise
+        self.sample["ttfb_ms"] = (time.perf_counter() - self.start) * 1000
+        self.sample["status"] = self.response.status_code
+        return self.response
+
+    def _finish(self):
+        self.sample["connect_ms"] = getattr(_connect_timing, "connect_ms", 0.0)
+        self.sample["total_ms"] = (time.perf_counter() - self.start) * 1000
+        _record_latency(self.sample)
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.response is not None:
+            self.response.close()
+            self._finish()
+        return False
+
+
+def estimate_tokens(payload):
+    """Rough token count a call reserves from the limiter: prompt characters / 4 plus max_tokens"""
+    return len(json.dumps(payload.get("messages", []))) // 4 + len(json.dumps(payload.get("system", ""))) // 4 \
+        + payload.get("max_tokens", 0)
+
+
+def _retry_delay(attempt, response=None):
+    """retry-after when the server sent one, else full-jitter exponential backoff"""
+    if response is not None:
+        try:
+            return float(response.headers["retry-after"])
+        except (KeyError, ValueError):
+            pass
+    return random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** attempt))
+
+
+def _open_call(payload, api_key, stream):
+    """Open a call that returned 2xx, retrying and rate limiting on the way; returns the entered _TimedCall"""
+    limiter, breaker, counters = get_rate_limiter(), get_circuit_breaker(), get_resilience_counters()
+    tokens = estimate_tokens(payload)
+    for attempt in range(1, RETRY_MAX_ATTEMPTS + 1):
+        if not breaker.allow():
+            counters.bump("short_circuited")
+            raise CircuitOpenError(f"Claude is unavailable; retrying in {breaker.retry_in():.0f}s")
+        limiter.acquire(tokens)
+        counters.bump("attempts")
+        call = _TimedCall(payload, api_key, stream)
+        try:
+            response = call.__enter__()
+        except (requests.ConnectionError, requests.Timeout):
+            counters.bump("connection_errors")
+            breaker.record_failure()
+            if attempt == RETRY_MAX_ATTEMPTS:
+                raise
+            delay = _retry_delay(attempt)
+        except Exception:
+            breaker.release_probe()
+            raise
+        else:
+            status = response.status_code
+            if status < 400:
+                breaker.record_success()
+                return call
+            final = status not in RETRYABLE_STATUSES or attempt == RETRY_MAX_ATTEMPTS
+            delay = _retry_delay(attempt, response)
+            if status == 429:
+                counters.bump("rate_limited")
+                limiter.penalise(delay)
+            elif status >= 500:
+                counters.bump("server_errors")
+            # A 429 that outlasts every retry counts against upstream health too
+            if status >= 500 or (status == 429 and final):
+                breaker.record_failure()
+            else:
+                breaker.release_probe()
+            if final:
+                try:
+                    response.raise_for_status()
+                finally:
+                    call.__exit__(None, None, None)
+            call.__exit__(None, None, None)
+        counters.bump("retries")
+        logger.warning("Claude call failed (attempt %d of %d), retrying in %.1fs", attempt, RETRY_MAX_ATTEMPTS, delay)
+        time.sleep(delay)
+
+
+@contextmanager
+def _guarded_call(payload, api_key, stream):
+    """A rate-limited, retried call, closed (and its latency and usage recorded) on exit
+
+    Failures while reading the body (a dropped stream, a mid-stream error
+    event, an unreadable body) count against upstream health like a 5xx.
+    """
+    call = _open_call(payload, api_key, stream)
+    try:
+        yield call
+    except (requests.RequestException, ValueError):
+        get_circuit_breaker().record_failure()
+        raise
+    finally:
+        call.__exit__(None, None, None)
+
+
+def _record_usage(sample, usage):
+    """Add a usage block's token counts to a call's sample"""
+    for field in USAGE_FIELDS:
+        sample[field] += usage.get(field) or 0
+
+
+def _used_tokens(sample):
+    """Tokens a call counts against the limiter; prompt-cache reads do not"""
+    return sample["input_tokens"] + sample["cache_creation_input_tokens"] + sample["output_tokens"]
+
+
+def post_message(payload, api_key=None):
+    """Send a Messages API request and return the decoded response body"""
+    with _guarded_call(payload, api_key, stream=False) as call:
+        body = json.loads(call.response.content)
+        _record_usage(call.sample, body.get("usage", {}))
+    get_rate_limiter().refund(estimate_tokens(payload) - _used_tokens(call.sample))
+    return body
+
+
+def response_text(body):
+    """Concatenate the text blocks of a Messages API response"""
+    return "".join(block.get("text", "") for block in body.get("content", []) if block.get("type") == "text")
+
+
+def iter_sse_events(lines):
+    """Yield (event, data) pairs from an iterable of server-sent event lines"""
+    event, data = None, []
+    for line in lines:
+        if isinstance(line, bytes):
+            line = line.decode("utf-8")
+        line = line.rstrip("\r")
+        if not line:
+            if data:
+                yield event, "\n".join(data)
+            event, data = None, []
+        elif line.startswith(":"):
+            continue
+        elif line.startswith("event:"):
+            event = line[6:].strip()
+        elif line.startswith("data:"):
+            data.append(line[5:].lstrip())
+    if data:
+        yield event, "\n".join(data)
+
+
+def stream_message_text(payload, api_key=None, usage=None):
+    """Send a streaming Messages API request and yield text deltas as they arrive
+
+    The stream is read to its end (past message_stop) so the connection goes
+    back to the pool instead of being dropped. Retries happen only before the
+    first byte; an error mid-stream reaches the caller. A usage dict, when
+    given, is filled with the call's token counts and stop_reason.
+    """
+    payload = dict(payload, stream=True)
+    with _guarded_call(payload, api_key, stream=True) as call:
+        for event, data in iter_sse_events(call.response.iter_lines()):
+            message = json.loads(data)
+            if event == "error" or message.get("type") == "error":
+                raise requests.HTTPError(message.get("error", {}).get("message", "stream error"), response=call.response)
+            if message.get("type") == "message_start":
+                _record_usage(call.sample, message.get("message", {}).get("usage", {}))
+            elif message.get("type") == "message_delta":
+                _record_usage(call.sample, {"output_tokens": message.get("usage", {}).get("output_tokens", 0)})
+                if usage is not None:
+                    usage["stop_reason"] = message.get("delta", {}).get("stop_reason")
+            elif message.get("type") == "content_block_delta":
+                delta = message.get("delta", {})
+                if delta.get("type") == "text_delta":
+                    yield delta.get("text", "")
+    if usage is not None:
+        usage.update((field, call.sample[field]) for field in USAGE_FIELDS)
+    if _used_tokens(call.sample):
+        get_rate_limiter().refund(estimate_tokens(payload) - _used_tokens(call.sample))
+
+
+def test_claude_api(api_key=None):
+    """Check the API key and connectivity with a minimal request; returns (ok, message)"""
+    try:
+        body = post_message(build_payload("Reply with OK.", max_tokens=5), api_key)
+        return True, f"Connected to {body.get('model', CLAUDE_MODEL)} via {get_llm_backend().describe()}"
+    except CircuitOpenError as e:
+        return False, str(e)
+    except requests.HTTPError as e:
+        status = e.response.status_code if e.response is not None else "?"
+        return False, f"API returned HTTP {status}"
+    except requests.RequestException as e:
+        return False, f"Connection failed: {str(e)}"
+    except ValueError:
+        return False, "API returned a response that is not valid JSON"
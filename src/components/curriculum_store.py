@@ -0,0 +1,196 @@
+import hashlib
+import json
+import os
+import re
+import threading
+from types import MappingProxyType
+
+# ========================================
+# LOAD-ONCE CURRICULUM STORE
+# ========================================
+# get_comprehensive_curriculum_topics() rebuilds its ~11k line dict literal on
+# every call. The store below builds a frozen copy once per process (from a
+# precompiled JSON artifact when one is present and current) and answers
+# board/grade/subject lookups with a single dict access.
+
+CURRICULUM_ARTIFACT_VERSION = 1
+CURRICULUM_SOURCE_MODULE = "src.components.mock_test_creator"
+CURRICULUM_ARTIFACT_PATH = os.getenv(
+    "CURRICULUM_ARTIFACT_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", f"curriculum_v{CURRICULUM_ARTIFACT_VERSION}.json")
+)
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def normalise_grade(grade):
+    """Reduce a grade value ("Grade 10", 10, "MYP Year 5 (Grade 10)") to a lookup key"""
+    if isinstance(grade, int):
+        return str(grade)
+    text = str(grade).strip()
+    numbers = re.findall(r'Grade (\d+)', text)
+    if not numbers:
+        numbers = re.findall(r'\d+', text)
+    return str(int(numbers[0])) if numbers else text.casefold()
+
+
+def _is_grade_key(key):
+    """Check whether a curriculum dict key names a grade rather than a subject"""
+    return isinstance(key, int) or bool(re.fullmatch(r'(Grade\s*)?\d+', str(key).strip()))
+
+
+def _freeze_topics(topics):
+    """Turn a topic container into an immutable tuple of strings"""
+    if isinstance(topics, dict):
+        topics = list(topics.keys())
+    elif isinstance(topics, str):
+        topics = [topics]
+    return tuple(str(topic) for topic in topics)
+
+
+def _flatten_curriculum(curriculum):
+    """Flatten the nested curriculum dict into (board, subject, grade_key) -> topics"""
+    flat = {}
+    for board, board_data in curriculum.items():
+        if not isinstance(board_data, dict):
+            continue
+        for outer_key, outer_data in board_data.items():
+            if not isinstance(outer_data, dict):
+                continue
+            for inner_key, topics in outer_data.items():
+                # Both board -> subject -> grade and board -> grade -> subject layouts are accepted
+                if _is_grade_key(outer_key) and not _is_grade_key(inner_key):
+                    subject, grade = inner_key, outer_key
+                else:
+                    subject, grade = outer_key, inner_key
+                flat[(str(board), str(subject), normalise_grade(grade))] = _freeze_topics(topics)
+    return flat
+
+
+def _source_fingerprint():
+    """Hash the curriculum source file so stale artifacts are detected"""
+    try:
+        import importlib.util
+        spec = importlib.util.find_spec(CURRICULUM_SOURCE_MODULE)
+        if spec is None or not spec.origin or not os.path.exists(spec.origin):
+            return None
+        with open(spec.origin, "rb") as source_file:
+            return hashlib.sha256(source_file.read()).hexdigest()
+    except (ImportError, ValueError, OSError):
+        return None
+
+
+def build_curriculum_artifact(path=CURRICULUM_ARTIFACT_PATH):
+    """Precompile the curriculum dict literal into a versioned JSON artifact"""
+    from src.components.mock_test_creator import get_comprehensive_curriculum_topics
+
+    flat = _flatten_curriculum(get_comprehensive_curriculum_topics())
+    artifact = {
+        "version": CURRICULUM_ARTIFACT_VERSION,
+        "source_sha256": _source_fingerprint(),
+        "entries": [
+            {"board": board, "subject": subject, "grade": grade, "topics": list(topics)}
+            for (board, subject, grade), topics in sorted(flat.items())
+        ]
+    }
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as artifact_file:
+        json.dump(artifact, artifact_file, ensure_ascii=False, separators=(",", ":"))
+    return path
+
+
+def _load_artifact(path):
+    """Load a precompiled artifact, or None when it is missing, outdated or stale"""
+    try:
+        with open(path, "r", encoding="utf-8") as artifact_file:
+            artifact = json.load(artifact_file)
+    except (OSError, ValueError):
+        return None
+
+    if artifact.get("version") != CURRICULUM_ARTIFACT_VERSION:
+        return None
+    fingerprint = _source_fingerprint()
+    if fingerprint and artifact.get("source_sha256") and artifact["source_sha256"] != fingerprint:
+        return None
+
+    return {
+        (entry["board"], entry["subject"], entry["grade"]): tuple(entry["topics"])
+        for entry in artifact.get("entries", [])
+    }
+
+
+class CurriculumStore:
+    """Immutable, process-wide view of the curriculum topics"""
+
+    def __init__(self, flat, source):
+        self.source = source
+        self._topics = flat
+        self._fallback = {}
+        self._fallback_lock = threading.Lock()
+
+        tree = {}
+        for (board, subject, grade), topics in flat.items():
+            tree.setdefault(board, {}).setdefault(subject, {})[grade] = topics
+        self.tree = MappingProxyType({
+            board: MappingProxyType({subject: MappingProxyType(grades) for subject, grades in subjects.items()})
+            for board, subjects in tree.items()
+        })
+        self.boards = tuple(self.tree.keys())
+        self._subjects = {board: tuple(subjects.keys()) for board, subjects in self.tree.items()}
+
+    def get_topics(self, board, grade, subject):
+        """Return the curriculum topics for a board/grade/subject as a tuple"""
+        key = (board, subject, normalise_grade(grade))
+        topics = self._topics.get(key)
+        if topics is not None:
+            return topics
+
+        # Unknown combinations go through the legacy lookup once so its fallback topics are kept
+        topics = self._fallback.get(key)
+        if topics is None:
+            from src.components.mock_test_creator import get_topics_by_board_grade_subject
+            with self._fallback_lock:
+                topics = self._fallback.get(key)
+                if topics is None:
+                    topics = _freeze_topics(get_topics_by_board_grade_subject(board, grade, subject) or [])
+                    self._fallback[key] = topics
+        return topics
+
+    def get_subjects(self, board):
+        """Return the subjects that have curriculum topics for a board"""
+        return self._subjects.get(board, ())
+
+    def get_statistics(self):
+        """Return topic counts for the dashboard"""
+        return {
+            "boards": len(self.boards),
+            "subjects": sum(len(subjects) for subjects in self._subjects.values()),
+            "combinations": len(self._topics),
+            "topics": sum(len(topics) for topics in self._topics.values())
+        }
+
+
+def get_curriculum_store():
+    """Return the process-wide curriculum store, building it on first use"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                flat = _load_artifact(CURRICULUM_ARTIFACT_PATH)
+                source = "artifact"
+                if flat is None:
+                    from src.components.mock_test_creator import get_comprehensive_curriculum_topics
+                    flat = _flatten_curriculum(get_comprehensive_curriculum_topics())
+                    source = "dict_literal"
+                _store = CurriculumStore(flat, source)
+    return _store
+
+
+def get_curriculum_topics(board, grade, subject):
+    """Store-backed replacement for get_topics_by_board_grade_subject"""
+    return get_curriculum_store().get_topics(board, grade, subject)
+
+
+if __name__ == "__main__":
+    print(f"Curriculum artifact written to {build_curriculum_artifact()}")
@@ -0,0 +1,195 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+
+# ========================================
+# PERSISTENT GENERATION CACHE
+# ========================================
+# Parsed test JSON keyed by a normalised request fingerprint, stored in SQLite so
+# every Streamlit session and worker process on the host shares it. Entries expire
+# after a TTL and the least recently used ones are evicted past the size limits.
+# The last successful paper per request is also kept, TTL-free, as the fallback
+# served while Claude is failing.
+
+CACHE_DIR = os.getenv("MOCK_TEST_CACHE_DIR", ".cache")
+CACHE_DB_PATH = os.path.join(CACHE_DIR, "generation_cache.sqlite3")
+CACHE_TTL_SECONDS = int(os.getenv("GENERATION_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+CACHE_MAX_ENTRIES = int(os.getenv("GENERATION_CACHE_MAX_ENTRIES", "2000"))
+CACHE_MAX_BYTES = int(os.getenv("GENERATION_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+FALLBACK_MAX_ENTRIES = int(os.getenv("GENERATION_FALLBACK_MAX_ENTRIES", "5000"))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS generations (
+    fingerprint TEXT PRIMARY KEY,
+    payload TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS generations_last_access ON generations (last_access);
+CREATE TABLE IF NOT EXISTS last_good (
+    fingerprint TEXT PRIMARY KEY,
+    payload TEXT NOT NULL,
+    stored_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS last_good_stored_at ON last_good (stored_at);
+CREATE TABLE IF NOT EXISTS counters (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+
+def _normalise_field(value):
+    """Case- and whitespace-insensitive form of one request field"""
+    return re.sub(r'\s+', ' ', str(value)).strip().casefold()
+
+
+def request_fingerprint(board, grade, subject, topic, paper_type):
+    """Stable hash identifying one generation request"""
+    fields = [_normalise_field(value) for value in (board, grade, subject, topic, paper_type)]
+    return hashlib.sha256("\x1f".join(fields).encode("utf-8")).hexdigest()
+
+
+class GenerationCache:
+    """SQLite-backed TTL + LRU cache of generated tests"""
+
+    def __init__(self, path=CACHE_DB_PATH, ttl_seconds=CACHE_TTL_SECONDS,
+                 max_entries=CACHE_MAX_ENTRIES, max_bytes=CACHE_MAX_BYTES):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+
+    def _connect(self):
+        """Open a short-lived connection; SQLite handles locking between processes"""
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def _bump(self, conn, name, amount=1):
+        """Increment a shared counter"""
+        conn.execute(
+            "INSERT INTO counters (name, value) VALUES (?, ?) "
+            "ON CONFLICT(name) DO UPDATE SET value = value + excluded.value",
+            (name, amount)
+        )
+
+    def get(self, fingerprint):
+        """Return the cached test for a fingerprint, or None on a miss or expiry"""
+        return self._lookup(fingerprint, counted=True)
+
+    def peek(self, fingerprint):
+        """Like get(), but a re-check of a request already counted: hits and misses are not bumped"""
+        return self._lookup(fingerprint, counted=False)
+
+    def _lookup(self, fingerprint, counted):
+        now = time.time()
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT payload, created_at FROM generations WHERE fingerprint = ?", (fingerprint,)
+            ).fetchone()
+            if row is None or now - row[1] > self.ttl_seconds:
+                if counted:
+                    self._bump(conn, "misses")
+                return None
+            conn.execute("UPDATE generations SET last_access = ? WHERE fingerprint = ?", (now, fingerprint))
+            if counted:
+                self._bump(conn, "hits")
+        return json.loads(row[0])
+
+    def put(self, fingerprint, test_data):
+        """Store a generated test and evict down to the size limits"""
+        payload = json.dumps(test_data, ensure_ascii=False, separators=(",", ":"))
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO generations (fingerprint, payload, size, created_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (fingerprint, payload, len(payload), now, now)
+            )
+            conn.execute(
+                "INSERT OR REPLACE INTO last_good (fingerprint, payload, stored_at) VALUES (?, ?, ?)",
+                (fingerprint, payload, now)
+            )
+            self._bump(conn, "stores")
+            self._evict(conn, now)
+
+    def _evict(self, conn, now):
+        """Drop expired entries, then least recently used ones past the limits, and trim the fallbacks"""
+        expired = conn.execute("DELETE FROM generations WHERE created_at < ?", (now - self.ttl_seconds,)).rowcount
+        evicted = 0
+        count, total_bytes = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM generations").fetchone()
+        if count > self.max_entries or total_bytes > self.max_bytes:
+            for fingerprint, size in conn.execute(
+                "SELECT fingerprint, size FROM generations ORDER BY last_access ASC"
+            ).fetchall():
+                if count <= self.max_entries and total_bytes <= self.max_bytes:
+                    break
+                conn.execute("DELETE FROM generations WHERE fingerprint = ?", (fingerprint,))
+                count -= 1
+                total_bytes -= size
+                evicted += 1
+        conn.execute(
+            "DELETE FROM last_good WHERE fingerprint IN ("
+            "SELECT fingerprint FROM last_good ORDER BY stored_at DESC LIMIT -1 OFFSET ?)",
+            (FALLBACK_MAX_ENTRIES,)
+        )
+        if expired:
+            self._bump(conn, "expired", expired)
+        if evicted:
+            self._bump(conn, "evictions", evicted)
+
+    def get_last_good(self, fingerprint):
+        """Most recent successful test for a fingerprint regardless of age, or None"""
+        with self._connect() as conn:
+            row = conn.execute("SELECT payload FROM last_good WHERE fingerprint = ?", (fingerprint,)).fetchone()
+            if row is not None:
+                self._bump(conn, "fallbacks")
+        return json.loads(row[0]) if row is not None else None
+
+    def invalidate(self, fingerprint):
+        """Remove one entry"""
+        with self._connect() as conn:
+            conn.execute("DELETE FROM generations WHERE fingerprint = ?", (fingerprint,))
+
+    def stats(self):
+        """Return hit/miss counters and current size"""
+        with self._connect() as conn:
+            counters = dict(conn.execute("SELECT name, value FROM counters").fetchall())
+            count, total_bytes = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM generations").fetchone()
+        lookups = counters.get("hits", 0) + counters.get("misses", 0)
+        return {
+            "hits": counters.get("hits", 0),
+            "misses": counters.get("misses", 0),
+            "stores": counters.get("stores", 0),
+            "evictions": counters.get("evictions", 0),
+            "expired": counters.get("expired", 0),
+            "fallbacks": counters.get("fallbacks", 0),
+            "hit_rate": counters.get("hits", 0) / lookups if lookups else 0.0,
+            "entries": count,
+            "bytes": total_bytes
+        }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_generation_cache():
+    """Return the process-wide generation cache"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = GenerationCache()
+    return _cache
@@ -0,0 +1,276 @@
+import copy
+import logging
+import os
+
+import requests
+
+from src.components.claude_client import build_prompt_payload, get_latency_stats, get_token_stats, stream_message_text
+from src.components.generation_cache import get_generation_cache, request_fingerprint
+from src.components.incremental_json import IncrementalQuestionParser, log_lost_questions
+from src.components.job_queue import PRIORITY_INTERACTIVE, get_job_queue
+from src.components.llm_backends import get_llm_backend
+from src.components.near_duplicates import PaperDeduplicator
+from src.components.paper_formats import resolve_paper_format
+from src.components.prompt_builder import build_generation_prompt
+from src.components.question_bank import get_question_bank
+from src.components.resilience import CircuitOpenError, get_resilience_stats
+from src.components.sectioned_generation import (
+    build_test_info,
+    iter_sections,
+    merge_sections
+)
+from src.components.single_flight import Flight, get_single_flight
+from src.components.test_schema import normalise_question
+from src.components.token_budget import get_token_budget
+from src.components.tracing import traced
+
+# ========================================
+# TEST GENERATION SERVICE
+# ========================================
+# Single entry point the UI uses to obtain a test. It consults the shared
+# generation cache before paying for a Claude call, and joins an identical
+# request that is already in flight instead of starting another. New papers are
+# assembled from the question bank first; only the shortfall is generated, in
+# one call when its token budget fits and as parallel sections beyond.
+# All calls go through the pooled claude_client and the configured LLM backend. While Claude is failing, the
+# most recent successful paper for the same request is served instead.
+
+# Extra requests allowed for questions lost to truncation or malformed JSON, rejected by the schema or dropped as near-duplicates
+GENERATION_TOP_UPS = int(os.getenv("GENERATION_TOP_UPS", "1"))
+
+logger = logging.getLogger(__name__)
+
+
+def _with_display_options(test_data, include_answers):
+    """Copy of a test with the per-request display flag applied"""
+    test_data = copy.deepcopy(test_data)
+    test_data.setdefault('test_info', {})['show_answers_on_screen'] = include_answers
+    return test_data
+
+
+@traced("generation/generate_test")
+def generate_test(board, grade, subject, topic, paper_type, include_answers=False, force_fresh=False):
+    """Return a generated test, served from the cache unless force_fresh is set"""
+    test_data = None
+    for event, payload in stream_test(board, grade, subject, topic, paper_type, include_answers, force_fresh):
+        if event == "test":
+            test_data = payload
+    return test_data
+
+
+def stream_test(board, grade, subject, topic, paper_type, include_answers=False, force_fresh=False):
+    """Yield ("question", question) events as questions arrive, then ("test", test_data)
+
+    Cached papers are replayed immediately. Identical requests already in flight
+    are joined instead of paying for another call; force_fresh requests always
+    generate their own paper and are not joined either. When Claude fails, or the
+    stream ends without a single complete question, the last good paper for the
+    request is served flagged served_from_fallback; without one the error is
+    raised, or ("test", None) yielded for an empty stream.
+    """
+    cache = get_generation_cache()
+    fingerprint = request_fingerprint(board, grade, subject, topic, paper_type)
+
+    if not force_fresh:
+        cached = cache.get(fingerprint)
+        if cached is not None:
+            yield from _replay(_with_display_options(cached, include_answers))
+            return
+
+    single_flight = get_single_flight()
+    if force_fresh:
+        flight, leader = Flight(), True
+    else:
+        flight, leader = single_flight.begin(fingerprint)
+    if not leader:
+        logger.info("joined in-flight generation %s", fingerprint[:12])
+        for question in flight.follow():
+            yield "question", question
+        test_data = flight.wait()
+        yield "test", _with_display_options(test_data, include_answers) if test_data else None
+        return
+
+    try:
+        # The previous leader may have finished between the cache miss and begin(); already counted as a miss
+        cached = None if force_fresh else cache.peek(fingerprint)
+        events = _replay(cached) if cached is not None else \
+            _assemble_and_generate(board, grade, subject, topic, paper_type, use_bank=not force_fresh)
+
+        test_data = None
+        upstream_error = None
+        try:
+            for event, payload in events:
+                if event == "question":
+                    flight.publish(payload)
+                    yield event, payload
+                else:
+                    test_data = payload
+        except (CircuitOpenError, requests.RequestException) as e:
+            upstream_error = e
+        if test_data and cached is None and upstream_error is None:
+            # A short paper is served this once but never saved as the cached or last good paper
+            expected = resolve_paper_format(paper_type).total_questions
+            if len(test_data.get('questions', [])) >= expected:
+                cache.put(fingerprint, test_data)
+            else:
+                logger.warning("not caching %s: %d of %d questions generated",
+                               fingerprint[:12], len(test_data.get('questions', [])), expected)
+        elif upstream_error is not None or not test_data:
+            test_data = _last_good_paper(cache, fingerprint, upstream_error)
+        flight.finish(test_data)
+    except Exception as e:
+        flight.fail(e)
+        raise
+    finally:
+        if not flight.done:
+            flight.fail(RuntimeError("Generation was abandoned before it finished"))
+        single_flight.end(fingerprint, flight)
+
+    yield "test", _with_display_options(test_data, include_answers) if test_data else None
+
+
+def _last_good_paper(cache, fingerprint, upstream_error):
+    """The last successful paper for the request, flagged as a fallback; re-raises the error without one"""
+    fallback = cache.get_last_good(fingerprint)
+    if fallback is None:
+        if upstream_error is not None:
+            raise upstream_error
+        return None
+    logger.warning("serving the last good paper for %s: %s", fingerprint[:12], upstream_error or "no questions generated")
+    fallback.setdefault('test_info', {})['served_from_fallback'] = True
+    return fallback
+
+
+def _replay(test_data):
+    """Events for a test that is already complete"""
+    for question in test_data.get('questions', []):
+        yield "question", question
+    yield "test", test_data
+
+
+def _assemble_and_generate(board, grade, subject, topic, paper_type, use_bank=True):
+    """Take what the question bank has, generate only the shortfall, and bank the new questions"""
+    bank = get_question_bank()
+    paper_format = resolve_paper_format(paper_type)
+    if use_bank:
+        banked, shortfall = bank.assemble(board, grade, subject, topic, paper_type)
+        if banked:
+            logger.info("question bank supplied %d of %d questions", len(banked), paper_format.total_questions)
+    else:
+        banked = []
+        shortfall = {"mcq": paper_format.mcq_count, "short": paper_format.short_count, "long": paper_format.long_count}
+
+    for question in banked:
+        question.pop('bank_id', None)
+        question.pop('repeats_earlier_paper', None)
+    banked = [question for question in map(normalise_question, banked) if question is not None]
+    for question in banked:
+        yield "question", question
+
+    # Near-duplicates of questions already on this paper or on earlier papers are dropped
+    deduplicator = PaperDeduplicator(board, grade, subject)
+    deduplicator.seed(banked)
+    generated = []
+    for attempt in range(1 + GENERATION_TOP_UPS):
+        missing = sum(shortfall.values())
+        if missing <= 0:
+            break
+        if attempt:
+            # Only the questions still missing are asked for again
+            logger.info("re-requesting %d missing questions: %s", missing, shortfall)
+        if not get_token_budget().fits_single_call(shortfall):
+            new_questions = _stream_sections(board, grade, subject, topic, paper_type, shortfall)
+        else:
+            new_questions = _stream_single_call(board, grade, subject, topic, paper_type, shortfall)
+        for question in new_questions:
+            # Malformed questions are rejected here, before the bank, the cache or the screen
+            question = normalise_question(question)
+            if question is None or shortfall.get(question['type'], 0) <= 0 or not deduplicator.check(question):
+                continue
+            shortfall[question['type']] -= 1
+            generated.append(question)
+            yield "question", question
+
+    # With the top-ups spent, a flagged repeat of an earlier paper beats a short paper
+    for question in deduplicator.reuse_held(shortfall):
+        shortfall[question['type']] -= 1
+        generated.append(question)
+        yield "question", question
+
+    if deduplicator.dropped_in_paper or deduplicator.dropped_from_history:
+        logger.info("dropped %d near-duplicates within the paper and %d of earlier papers (%d of those kept to fill the paper)",
+                    deduplicator.dropped_in_paper, deduplicator.dropped_from_history, deduplicator.reused_from_history)
+    if generated:
+        deduplicator.commit()
+        bank.add_questions(board, grade, subject, topic, generated)
+
+    questions = merge_sections([banked, generated])
+    if not questions:
+        yield "test", None
+        return
+    test_info = build_test_info(board, grade, subject, topic, paper_type, False, questions)
+    if deduplicator.reused_from_history:
+        test_info['repeated_questions'] = deduplicator.reused_from_history
+    yield "test", {'test_info': test_info, 'questions': questions}
+
+
+def _stream_sections(board, grade, subject, topic, paper_type, counts):
+    """Large shortfalls are generated as concurrent sections, yielded as each completes"""
+    for _, questions in iter_sections(board, grade, subject, topic, paper_type, counts=counts):
+        yield from questions
+
+
+def _stream_single_call(board, grade, subject, topic, paper_type, counts):
+    """Small shortfalls come from one streamed call, parsed question by question"""
+    prompt = build_generation_prompt(
+        board, grade, subject, topic, paper_type,
+        mcq_count=counts.get("mcq", 0), short_count=counts.get("short", 0), long_count=counts.get("long", 0)
+    )
+    # The caller decrements its shortfall dict as questions arrive; keep what was asked for
+    counts = dict(counts)
+    budget = get_token_budget()
+    predicted = budget.predict(counts)
+    usage = {}
+    parser = IncrementalQuestionParser()
+    for text in stream_message_text(build_prompt_payload(prompt, max_tokens=budget.max_tokens(counts)), usage=usage):
+        yield from parser.feed(text)
+    budget.record(counts, predicted, usage.get("output_tokens"), usage.get("stop_reason"))
+    log_lost_questions(parser, counts)
+
+
+@traced("generation/stats")
+def get_generation_stats():
+    """Cache, request-coalescing, bank, retry/breaker, latency, token and backend details for the statistics panel"""
+    return {
+        "cache": get_generation_cache().stats(),
+        "single_flight": get_single_flight().stats(),
+        "question_bank": get_question_bank().stats(),
+        "resilience": get_resilience_stats(),
+        "latency": get_latency_stats(),
+        "tokens": get_token_stats(),
+        "token_budget": get_token_budget().report(),
+        "backend": get_llm_backend().describe()
+    }
+
+
+@traced("generation/job")
+def run_generation_job(job, board, grade, subject, topic, paper_type, include_answers=False, force_fresh=False):
+    """Job-queue worker: stream the test, exposing questions on job.partial as they arrive"""
+    test_data = None
+    for event, payload in stream_test(board, grade, subject, topic, paper_type, include_answers, force_fresh):
+        if event == "question":
+            job.partial.append(payload)
+        else:
+            test_data = payload
+    if not test_data:
+        raise RuntimeError("No questions were generated")
+    return test_data
+
+
+def submit_generation_job(user_id, board, grade, subject, topic, paper_type, include_answers=False,
+                          force_fresh=False, priority=PRIORITY_INTERACTIVE):
+    """Queue a generation in the background and return its job id"""
+    return get_job_queue().submit(
+        user_id, run_generation_job, board, grade, subject, topic, paper_type, include_answers, force_fresh,
+        priority=priority
+    )
@@ -0,0 +1,173 @@
+import json
+import logging
+import re
+from collections import Counter
+
+# ========================================
+# INCREMENTAL QUESTIONS-ARRAY PARSER
+# ========================================
+# Fed with text deltas from a streaming response, it hands back each object of the
+# top-level "questions" array as soon as its closing brace arrives. One bad
+# object never costs the rest of the response: each object is parsed on its
+# own, common slips (trailing or missing commas, Python literals, raw newlines
+# in strings) are repaired, and whatever still cannot be read, including an
+# object cut off by truncation, is reported as lost so only those questions
+# need to be requested again.
+
+_QUESTIONS_KEY = re.compile(r'"questions"\s*:\s*\[')
+# A response that is only the array, optionally inside a code fence
+_BARE_ARRAY = re.compile(r'\s*(?:```[A-Za-z]*\s*)?\[')
+_TRAILING_COMMA = re.compile(r',\s*([}\]])')
+_MISSING_COMMA = re.compile(r'("|\d|true|false|null|[}\]])(\s*\n\s*")')
+_PYTHON_LITERAL = re.compile(r'(:\s*)(True|False|None)\b')
+_SMART_QUOTES = re.compile(r'[“”]')
+_QUESTION_ID = re.compile(r'"id"\s*:\s*"?(\w+)')
+_QUESTION_TYPE = re.compile(r'"type"\s*:\s*"(\w+)"')
+QUESTION_TYPES = ("mcq", "short", "long")
+SNIPPET_CHARS = 80
+
+logger = logging.getLogger(__name__)
+
+
+def repair_object(text):
+    """Fix the slips models make inside one JSON object, for a second parse attempt"""
+    text = _TRAILING_COMMA.sub(r'\1', text)
+    text = _MISSING_COMMA.sub(r'\1,\2', text)
+    return _PYTHON_LITERAL.sub(lambda m: m.group(1) + {"True": "true", "False": "false", "None": "null"}[m.group(2)], text)
+
+
+def _question_type(question_type):
+    question_type = str(question_type).lower().replace("_answer", "")
+    return question_type if question_type in QUESTION_TYPES else "mcq"
+
+
+class IncrementalQuestionParser:
+    """Yield complete question objects from a growing JSON document"""
+
+    def __init__(self):
+        self.buffer = ""
+        self.questions = []
+        self.lost = []
+        self._pos = 0
+        self._in_array = False
+        self._array_closed = False
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._object_start = None
+
+    def feed(self, text):
+        """Add a text delta and return the question objects it completed"""
+        self.buffer += text
+        completed = []
+
+        if not self._in_array:
+            match = _QUESTIONS_KEY.search(self.buffer, max(0, self._pos - 32)) or _BARE_ARRAY.match(self.buffer)
+            if not match:
+                self._pos = len(self.buffer)
+                return completed
+            self._in_array = True
+            self._pos = match.end()
+
+        buffer = self.buffer
+        index = self._pos
+        while index < len(buffer) and not self._array_closed:
+            char = buffer[index]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char in "{[":
+                if self._depth == 0 and char == "{":
+                    self._object_start = index
+                self._depth += 1
+            elif char in "}]":
+                if self._depth == 0 and char == "]":
+                    self._array_closed = True
+                else:
+                    self._depth -= 1
+                    if self._depth == 0 and char == "}" and self._object_start is not None:
+                        question = self._decode(buffer[self._object_start:index + 1])
+                        if question is not None:
+                            completed.append(question)
+                        self._object_start = None
+            index += 1
+
+        self._pos = index
+        self.questions.extend(completed)
+        return completed
+
+    def _lose(self, reason, text):
+        id_match = _QUESTION_ID.search(text)
+        type_match = _QUESTION_TYPE.search(text)
+        self.lost.append({
+            "reason": reason,
+            "id": id_match.group(1) if id_match else None,
+            "type": _question_type(type_match.group(1)) if type_match else None,
+            "snippet": text[:SNIPPET_CHARS]
+        })
+
+    def _decode(self, text):
+        """Parse one question object, repairing it if needed; records it as lost when it cannot be read"""
+        repaired = repair_object(text)
+        for candidate in (text, repaired, _SMART_QUOTES.sub('"', repaired)):
+            try:
+                question = json.loads(candidate, strict=False)
+            except ValueError:
+                continue
+            if isinstance(question, dict) and str(question.get('question', '')).strip():
+                return question
+            self._lose("no question text", text)
+            return None
+        self._lose("malformed", text)
+        return None
+
+    def finish(self):
+        """Mark an object left open at the end of the response as lost; returns every lost entry"""
+        if self._object_start is not None:
+            self._lose("truncated", self.buffer[self._object_start:])
+            self._object_start = None
+        return self.lost
+
+    @property
+    def complete(self):
+        """True once the closing bracket of the questions array has been seen"""
+        return self._array_closed
+
+    def report(self, requested=None):
+        """What was recovered and lost; with requested ({type: n}) also the questions still missing"""
+        report = {"recovered": len(self.questions), "lost": list(self.lost), "truncated": not self._array_closed}
+        if requested is not None:
+            received = Counter(_question_type(question.get('type', 'mcq')) for question in self.questions)
+            report["missing"] = {question_type: max(0, requested.get(question_type, 0) - received[question_type])
+                                 for question_type in QUESTION_TYPES}
+        return report
+
+    def document(self):
+        """Parse the whole buffer, or None when it is not valid JSON yet"""
+        start, end = self.buffer.find("{"), self.buffer.rfind("}")
+        if start == -1 or end <= start:
+            return None
+        try:
+            return json.loads(self.buffer[start:end + 1])
+        except ValueError:
+            return None
+
+
+def log_lost_questions(parser, requested):
+    """Finish a parser and log what the response lost; returns the parser's report"""
+    parser.finish()
+    report = parser.report(requested)
+    if report["lost"] or any(report["missing"].values()):
+        logger.warning(
+            "response recovered %d questions, lost %d (%s)%s; missing %s",
+            report["recovered"], len(report["lost"]),
+            ", ".join(f"{entry['reason']} id={entry['id']}" for entry in report["lost"]) or "none",
+            " after truncation" if report["truncated"] else "", report["missing"]
+        )
+    return report
@@ -0,0 +1,239 @@
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+
+# ========================================
+# BACKGROUND GENERATION JOB QUEUE
+# ========================================
+# Generation runs on a small pool of worker threads instead of the Streamlit
+# script thread. The UI submits a job, keeps its id in session state and polls
+# until the result is ready. Pending jobs are bounded overall and per user;
+# lower priority numbers run first, and users take turns within a priority so
+# one busy session cannot starve the others. Running jobs are never preempted,
+# so batch jobs (which can run for hours) may only hold a few of the workers.
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+JOB_QUEUE_MAX_PENDING = int(os.getenv("JOB_QUEUE_MAX_PENDING", "100"))
+JOB_MAX_PENDING_PER_USER = int(os.getenv("JOB_MAX_PENDING_PER_USER", "3"))
+JOB_RESULT_TTL_SECONDS = int(os.getenv("JOB_RESULT_TTL_SECONDS", "900"))
+# Workers that PRIORITY_BATCH (and lower) jobs may occupy at once; at least one is always left for
+# interactive jobs, so with a single worker batch jobs are refused
+JOB_MAX_BATCH_WORKERS = int(os.getenv("JOB_MAX_BATCH_WORKERS", "1"))
+
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BATCH = 10
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED_STATES = (DONE, FAILED, CANCELLED)
+
+logger = logging.getLogger(__name__)
+
+
+class QueueFullError(RuntimeError):
+    """Raised when a job cannot be accepted because the queue is at capacity"""
+
+
+class Job:
+    """One unit of background work and everything the UI needs to poll it"""
+
+    def __init__(self, user_id, priority, fn, args, kwargs):
+        self.id = uuid.uuid4().hex
+        self.user_id = user_id
+        self.priority = priority
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.status = QUEUED
+        self.result = None
+        self.error = None
+        self.partial = []
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+
+    @property
+    def finished(self):
+        return self.status in FINISHED_STATES
+
+    def elapsed(self):
+        """Seconds since submission, frozen once the job finishes"""
+        return (self.finished_at or time.time()) - self.submitted_at
+
+
+class GenerationJobQueue:
+    """Bounded worker pool with priorities and round-robin fairness between users"""
+
+    def __init__(self, workers=JOB_WORKERS, max_pending=JOB_QUEUE_MAX_PENDING,
+                 max_pending_per_user=JOB_MAX_PENDING_PER_USER, result_ttl=JOB_RESULT_TTL_SECONDS,
+                 max_batch_workers=JOB_MAX_BATCH_WORKERS):
+        self.workers = workers
+        self.max_batch_workers = max(0, min(max_batch_workers, workers - 1))
+        self.max_pending = max_pending
+        self.max_pending_per_user = max_pending_per_user
+        self.result_ttl = result_ttl
+        self._jobs = {}
+        self._pending = {}  # priority -> OrderedDict(user_id -> deque of jobs)
+        self._pending_count = 0
+        self._running = 0
+        self._running_batch = 0
+        self._rejected = 0
+        self._condition = threading.Condition()
+        self._threads = []
+
+    def _start_workers(self):
+        """Start the worker threads on first use"""
+        while len(self._threads) < self.workers:
+            thread = threading.Thread(target=self._work, name=f"generation-worker-{len(self._threads)}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def _user_pending(self, user_id):
+        return sum(len(users.get(user_id, ())) for users in self._pending.values())
+
+    def submit(self, user_id, fn, *args, priority=PRIORITY_INTERACTIVE, **kwargs):
+        """Queue fn(job, *args, **kwargs) and return the job id"""
+        with self._condition:
+            self._prune()
+            if self._pending_count >= self.max_pending:
+                self._rejected += 1
+                raise QueueFullError("The generation queue is full, please try again shortly")
+            if self._user_pending(user_id) >= self.max_pending_per_user:
+                self._rejected += 1
+                raise QueueFullError(f"You already have {self.max_pending_per_user} tests waiting to be generated")
+            if priority >= PRIORITY_BATCH and not self.max_batch_workers:
+                self._rejected += 1
+                raise QueueFullError("Batch generation needs at least two generation workers (JOB_WORKERS)")
+
+            job = Job(user_id, priority, fn, args, kwargs)
+            self._jobs[job.id] = job
+            self._pending.setdefault(priority, OrderedDict()).setdefault(user_id, deque()).append(job)
+            self._pending_count += 1
+            self._start_workers()
+            self._condition.notify()
+            return job.id
+
+    def _next_job(self):
+        """Pop the oldest job of the next user in line at the most urgent priority that may start"""
+        for priority in sorted(self._pending):
+            if priority >= PRIORITY_BATCH and self._running_batch >= self.max_batch_workers:
+                continue
+            users = self._pending[priority]
+            while users:
+                user_id, jobs = users.popitem(last=False)
+                job = jobs.popleft()
+                if jobs:
+                    users[user_id] = jobs  # back of the line for this priority
+                self._pending_count -= 1
+                return job
+            del self._pending[priority]
+        return None
+
+    def _work(self):
+        while True:
+            with self._condition:
+                job = self._next_job()
+                while job is None:
+                    self._condition.wait()
+                    job = self._next_job()
+                job.status = RUNNING
+                job.started_at = time.time()
+                self._running += 1
+                if job.priority >= PRIORITY_BATCH:
+                    self._running_batch += 1
+
+            try:
+                result = job.fn(job, *job.args, **job.kwargs)
+                status, error = DONE, None
+            except Exception as e:
+                logger.exception("generation job %s failed", job.id)
+                result, status, error = None, FAILED, str(e)
+
+            with self._condition:
+                job.result = result
+                job.error = error
+                job.status = status
+                job.finished_at = time.time()
+                job.fn = job.args = job.kwargs = None
+                self._running -= 1
+                if job.priority >= PRIORITY_BATCH:
+                    self._running_batch -= 1
+                    # A batch held back by the cap may start now
+                    self._condition.notify()
+
+    def get(self, job_id):
+        """Return the job for an id, or None when it is unknown or expired"""
+        return self._jobs.get(job_id)
+
+    def position(self, job_id):
+        """Number of jobs that will start before this one, or None when it is not queued"""
+        with self._condition:
+            job = self._jobs.get(job_id)
+            if job is None or job.status != QUEUED:
+                return None
+            ahead = 0
+            for priority in sorted(self._pending):
+                # Replay the round-robin dispatch for this priority without consuming it
+                lines = [list(jobs) for jobs in self._pending[priority].values()]
+                for turn in range(max((len(jobs) for jobs in lines), default=0)):
+                    for jobs in lines:
+                        if turn < len(jobs):
+                            if jobs[turn] is job:
+                                return ahead
+                            ahead += 1
+            return ahead
+
+    def cancel(self, job_id):
+        """Cancel a job that has not started yet; returns True when it was cancelled"""
+        with self._condition:
+            job = self._jobs.get(job_id)
+            if job is None or job.status != QUEUED:
+                return False
+            users = self._pending[job.priority]
+            users[job.user_id].remove(job)
+            if not users[job.user_id]:
+                del users[job.user_id]
+            self._pending_count -= 1
+            job.status = CANCELLED
+            job.finished_at = time.time()
+            return True
+
+    def _prune(self):
+        """Forget finished jobs whose results were never collected"""
+        cutoff = time.time() - self.result_ttl
+        for job_id in [job_id for job_id, job in self._jobs.items() if job.finished and job.finished_at < cutoff]:
+            del self._jobs[job_id]
+
+    def stats(self):
+        """Queue depth, running jobs and outcome counts"""
+        with self._condition:
+            stats = {
+                "workers": len(self._threads),
+                "pending": self._pending_count,
+                "running": self._running,
+                "running_batch": self._running_batch,
+                "rejected": self._rejected
+            }
+            for state in FINISHED_STATES:
+                stats[state] = sum(1 for job in self._jobs.values() if job.status == state)
+            return stats
+
+
+_job_queue = None
+_job_queue_lock = threading.Lock()
+
+
+def get_job_queue():
+    """Process-wide job queue shared by every Streamlit session"""
+    global _job_queue
+    if _job_queue is None:
+        with _job_queue_lock:
+            if _job_queue is None:
+                _job_queue = GenerationJobQueue()
+    return _job_queue
@@ -0,0 +1,346 @@
+import hashlib
+import io
+import json
+import logging
+import os
+import threading
+import time
+from collections import Counter
+
+import requests
+from requests.adapters import BaseAdapter
+from requests.structures import CaseInsensitiveDict
+
+# ========================================
+# LLM BACKENDS
+# ========================================
+# Where Messages API requests go, chosen by LLM_BACKEND:
+#   anthropic  the real API at CLAUDE_API_URL
+#   mock       the local stand-in (tools/mock_anthropic_server.py), started
+#              in-process unless MOCK_LLM_URL points at a running one; it returns
+#              schema-valid tests with configurable latency, errors and streaming
+#   replay     recorded responses served from REPLAY_DIR without any network,
+#              immediately or with the recorded latency scaled by
+#              REPLAY_LATENCY_SCALE
+#   record     LLM_RECORD_TARGET (anthropic or mock), saving every successful
+#              response with its timings to REPLAY_DIR for later replay
+# claude_client asks the backend for the URL and lets it mount a transport
+# adapter on the pooled session, so retries, rate limiting, the circuit breaker
+# and latency/token statistics behave the same whichever backend answers.
+
+LLM_BACKEND = os.getenv("LLM_BACKEND", "anthropic")
+CLAUDE_API_URL = os.getenv("CLAUDE_API_URL", "https://api.anthropic.com/v1/messages")
+# Empty starts a stand-in on a free local port the first time it is needed
+MOCK_LLM_URL = os.getenv("MOCK_LLM_URL", "")
+MOCK_LLM_CONFIG = {
+    "latency": float(os.getenv("MOCK_LLM_LATENCY", "0.5")),
+    "latency_jitter": float(os.getenv("MOCK_LLM_LATENCY_JITTER", "0.2")),
+    "chunk_delay": float(os.getenv("MOCK_LLM_CHUNK_DELAY", "0.01")),
+    "chunk_size": int(os.getenv("MOCK_LLM_CHUNK_SIZE", "64")),
+    "error_rate": float(os.getenv("MOCK_LLM_ERROR_RATE", "0")),
+    "batch_latency": float(os.getenv("MOCK_LLM_BATCH_LATENCY", "1.0"))
+}
+REPLAY_DIR = os.getenv("LLM_REPLAY_DIR", os.path.join("benchmarks", "fixtures", "llm"))
+# 0 replays as fast as possible, 1 with the recorded first-byte and body times
+REPLAY_LATENCY_SCALE = float(os.getenv("LLM_REPLAY_LATENCY_SCALE", "0"))
+LLM_RECORD_TARGET = os.getenv("LLM_RECORD_TARGET", "anthropic")
+# Fields of a request that decide its response; the API key and headers do not
+REQUEST_KEY_FIELDS = ("model", "system", "messages", "max_tokens", "stream", "temperature")
+# Fallback match when only max_tokens differs, e.g. after the token budget was recalibrated
+LOOSE_KEY_FIELDS = tuple(field for field in REQUEST_KEY_FIELDS if field != "max_tokens")
+# Response headers worth replaying; framing and encoding headers describe the original transfer only
+RECORDED_HEADERS = ("content-type", "retry-after", "request-id")
+
+logger = logging.getLogger(__name__)
+
+
+def request_key(payload, key_fields=REQUEST_KEY_FIELDS):
+    """Stable hash of the parts of a Messages API request that decide its response"""
+    fields = {field: payload.get(field) for field in key_fields if payload.get(field) is not None}
+    return hashlib.sha256(json.dumps(fields, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+class AnthropicBackend:
+    """The Messages API itself"""
+
+    name = "anthropic"
+
+    def __init__(self, url=CLAUDE_API_URL):
+        self.url = url
+
+    def messages_url(self):
+        return self.url
+
+    def mount(self, session):
+        """Nothing to mount: the session's pooled HTTP adapter is used"""
+
+    def describe(self):
+        return f"{self.name} ({self.url})"
+
+
+class MockBackend(AnthropicBackend):
+    """The local stand-in server, external (MOCK_LLM_URL) or started on first use"""
+
+    name = "mock"
+
+    def __init__(self, url=MOCK_LLM_URL, config=None):
+        super().__init__(url)
+        self.config = dict(MOCK_LLM_CONFIG if config is None else config)
+        self.server = None
+        self._lock = threading.Lock()
+
+    def messages_url(self):
+        if not self.url:
+            with self._lock:
+                if not self.url:
+                    from tools.mock_anthropic_server import start_server
+                    self.server, base_url = start_server("127.0.0.1", 0, **self.config)
+                    self.url = base_url + "/v1/messages"
+                    logger.info("started mock Messages API on %s with %s", self.url, self.config)
+        return self.url
+
+    def describe(self):
+        return f"{self.name} ({self.url or 'started on the first call'})"
+
+
+class FixtureStore:
+    """Recorded responses on disk: one <request key>.json file per distinct request
+
+    Identical requests made more than once in a run (sections with the same
+    counts, top-ups) each get their own response, kept in order, so a replay
+    sees the same variety the recording did.
+    """
+
+    def __init__(self, directory=REPLAY_DIR):
+        self.directory = directory
+        self._loose_index = None
+        self._lock = threading.Lock()
+
+    def path(self, key):
+        return os.path.join(self.directory, f"{key}.json")
+
+    def load(self, key):
+        """The recorded fixture ({"request", "responses", ...}) for a request key, or None"""
+        try:
+            with open(self.path(key), encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def find(self, payload):
+        """The fixture recorded for a request, falling back to one differing only in max_tokens"""
+        fixture = self.load(request_key(payload))
+        if fixture is not None:
+            return fixture
+        with self._lock:
+            if self._loose_index is None:
+                self._loose_index = {}
+                for key in self.keys():
+                    recorded = self.load(key)
+                    if recorded and recorded.get("loose_key"):
+                        self._loose_index[recorded["loose_key"]] = key
+            key = self._loose_index.get(request_key(payload, LOOSE_KEY_FIELDS))
+        return self.load(key) if key else None
+
+    def save(self, payload, response):
+        """Append a response to the request's fixture, written atomically; returns the request key"""
+        key = request_key(payload)
+        with self._lock:
+            os.makedirs(self.directory, exist_ok=True)
+            fixture = self.load(key) or {
+                "key": key, "loose_key": request_key(payload, LOOSE_KEY_FIELDS), "request": payload, "responses": []
+            }
+            fixture["responses"].append(response)
+            tmp_path = f"{self.path(key)}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(fixture, f, ensure_ascii=False, indent=1)
+            os.replace(tmp_path, self.path(key))
+            self._loose_index = None
+        return key
+
+    def keys(self):
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted(name[:-5] for name in os.listdir(self.directory) if name.endswith(".json"))
+
+
+class _PacedBody(io.BytesIO):
+    """Response body that takes seconds_per_byte to read, spreading the recorded body time over the stream"""
+
+    def __init__(self, body, seconds_per_byte):
+        super().__init__(body)
+        self.seconds_per_byte = seconds_per_byte
+
+    def read(self, size=-1):
+        chunk = super().read(size)
+        if chunk and self.seconds_per_byte:
+            time.sleep(len(chunk) * self.seconds_per_byte)
+        return chunk
+
+
+def build_response(request, status, headers, body, seconds_per_byte=0.0):
+    """requests.Response carrying body bytes, readable streamed or whole like a network response"""
+    response = requests.Response()
+    response.status_code = status
+    response.reason = "OK" if status < 400 else "Error"
+    response.headers = CaseInsensitiveDict(headers)
+    response.raw = _PacedBody(body, seconds_per_byte)
+    response.url = request.url
+    response.request = request
+    response.encoding = "utf-8"
+    return response
+
+
+class ReplayAdapter(BaseAdapter):
+    """Transport adapter answering requests from a FixtureStore; unrecorded requests get a 404
+
+    With latency_scale above 0 the recorded time to first byte is waited out
+    before the response is returned and the rest of the recorded time is spread
+    over reading the body, both scaled.
+    """
+
+    def __init__(self, store, latency_scale=REPLAY_LATENCY_SCALE):
+        super().__init__()
+        self.store = store
+        self.latency_scale = latency_scale
+        self._served = Counter()
+        self._lock = threading.Lock()
+
+    def send(self, request, **kwargs):
+        payload = json.loads(request.body or b"{}")
+        fixture = self.store.find(payload)
+        if fixture is None:
+            key = request_key(payload)
+            error = {"type": "error", "error": {"type": "not_found_error", "message": f"no recording for request {key[:12]}"}}
+            return build_response(request, 404, {"content-type": "application/json"}, json.dumps(error).encode("utf-8"))
+        # The nth identical request gets the nth recorded response
+        with self._lock:
+            occurrence = self._served[fixture["key"]]
+            self._served[fixture["key"]] += 1
+        recorded = fixture["responses"][occurrence % len(fixture["responses"])]
+        body = recorded["body"].encode("utf-8")
+        timings = recorded.get("timings", {})
+        ttfb = timings.get("ttfb_ms", 0.0) / 1000 * self.latency_scale
+        body_seconds = max(0.0, timings.get("total_ms", 0.0) - timings.get("ttfb_ms", 0.0)) / 1000 * self.latency_scale
+        if ttfb:
+            time.sleep(ttfb)
+        response = build_response(request, recorded["status"], recorded.get("headers", {}), body,
+                                  body_seconds / len(body) if body else 0.0)
+        response.connection = self
+        return response
+
+    def close(self):
+        pass
+
+
+class ReplayBackend(AnthropicBackend):
+    """Recorded responses, served in-process with no network"""
+
+    name = "replay"
+    url_prefix = "replay://llm/"
+
+    def __init__(self, directory=REPLAY_DIR, latency_scale=REPLAY_LATENCY_SCALE):
+        super().__init__(self.url_prefix + "v1/messages")
+        self.store = FixtureStore(directory)
+        self.latency_scale = latency_scale
+
+    def mount(self, session):
+        session.mount(self.url_prefix, ReplayAdapter(self.store, self.latency_scale))
+
+    def describe(self):
+        return (f"{self.name} ({len(self.store.keys())} recordings in {self.store.directory}, "
+                f"latency x{self.latency_scale:g})")
+
+
+class RecordingAdapter(BaseAdapter):
+    """Wraps the adapter for the messages URL and saves each successful response with its timings
+
+    The body is read in full before it is handed on, so a recorded call streams
+    to the app all at once; the recorded timings are those of the upstream.
+    """
+
+    def __init__(self, inner, store, url):
+        super().__init__()
+        self.inner = inner
+        self.store = store
+        self.url = url
+
+    def send(self, request, **kwargs):
+        if request.method != "POST" or request.url != self.url:
+            return self.inner.send(request, **kwargs)
+        start = time.perf_counter()
+        upstream = self.inner.send(request, **kwargs)
+        ttfb_ms = (time.perf_counter() - start) * 1000
+        try:
+            body = upstream.content
+        finally:
+            upstream.close()
+        total_ms = (time.perf_counter() - start) * 1000
+        headers = {name: upstream.headers[name] for name in RECORDED_HEADERS if name in upstream.headers}
+        if upstream.status_code < 400:
+            self.store.save(json.loads(request.body or b"{}"), {
+                "status": upstream.status_code, "headers": headers, "body": body.decode("utf-8"),
+                "timings": {"ttfb_ms": round(ttfb_ms, 2), "total_ms": round(total_ms, 2)},
+                "recorded_at": time.time()
+            })
+        response = build_response(request, upstream.status_code, headers, body)
+        response.connection = self
+        return response
+
+    def close(self):
+        self.inner.close()
+
+
+class RecordingBackend(AnthropicBackend):
+    """Another backend's responses, saved to a FixtureStore as they pass through"""
+
+    name = "record"
+
+    def __init__(self, target=None, directory=REPLAY_DIR):
+        self.target = target or LLM_BACKENDS[LLM_RECORD_TARGET]()
+        super().__init__(None)
+        self.store = FixtureStore(directory)
+
+    def messages_url(self):
+        return self.target.messages_url()
+
+    def mount(self, session):
+        self.target.mount(session)
+        url = self.messages_url()
+        session.mount(url, RecordingAdapter(session.get_adapter(url), self.store, url))
+
+    def describe(self):
+        return f"{self.name} ({self.target.describe()} into {self.store.directory})"
+
+
+LLM_BACKENDS = {
+    "anthropic": AnthropicBackend,
+    "mock": MockBackend,
+    "replay": ReplayBackend,
+    "record": RecordingBackend
+}
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_llm_backend():
+    """Return the process-wide backend selected by LLM_BACKEND"""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                if LLM_BACKEND not in LLM_BACKENDS:
+                    raise ValueError(f"Unknown LLM_BACKEND {LLM_BACKEND!r}; expected one of {', '.join(LLM_BACKENDS)}")
+                _backend = LLM_BACKENDS[LLM_BACKEND]()
+    return _backend
+
+
+def set_llm_backend(backend):
+    """Switch the process to another backend, e.g. from a benchmark; returns it"""
+    global _backend
+    from src.components.claude_client import reset_session
+    with _backend_lock:
+        _backend = backend
+    reset_session()
+    return backend
@@ -0,0 +1,182 @@
+import json
+import logging
+import os
+import re
+import time
+from collections import defaultdict
+
+from src.components.claude_client import CONNECT_TIMEOUT, READ_TIMEOUT, build_headers, build_prompt_payload, get_session, response_text
+from src.components.generation_cache import get_generation_cache, request_fingerprint
+from src.components.incremental_json import IncrementalQuestionParser, log_lost_questions
+from src.components.llm_backends import get_llm_backend
+from src.components.paper_formats import resolve_paper_format
+from src.components.prompt_builder import build_generation_prompt
+from src.components.question_bank import get_question_bank
+from src.components.sectioned_generation import build_test_info, merge_sections, plan_sections, section_limits
+from src.components.token_budget import get_token_budget
+
+# ========================================
+# MESSAGE BATCHES BACKEND
+# ========================================
+# Bulk generation submits every paper's sections as one asynchronous Message
+# Batch instead of one synchronous call each, polls until the batch has ended,
+# and maps the results back into the usual test_info / questions schema. Papers
+# are split into the same sections as interactive generation, and finished
+# papers go into the generation cache and question bank like any other.
+
+# Defaults to <backend messages URL>/batches, so the local stand-in serves both
+MESSAGE_BATCHES_URL = os.getenv("CLAUDE_BATCHES_URL", "")
+MESSAGE_BATCH_POLL_SECONDS = float(os.getenv("MESSAGE_BATCH_POLL_SECONDS", "30"))
+# Batches are processed within 24 hours
+MESSAGE_BATCH_TIMEOUT = float(os.getenv("MESSAGE_BATCH_TIMEOUT", str(24 * 3600)))
+
+_CUSTOM_ID = re.compile(r'^row(\d+)-s(\d+)$')
+
+logger = logging.getLogger(__name__)
+
+
+def batches_url():
+    return MESSAGE_BATCHES_URL or get_llm_backend().messages_url().rstrip("/") + "/batches"
+
+
+def _request(method, url, api_key=None, **kwargs):
+    response = get_session().request(method, url, headers=build_headers(api_key),
+                                     timeout=(CONNECT_TIMEOUT, READ_TIMEOUT), **kwargs)
+    response.raise_for_status()
+    return response
+
+
+# ========================================
+# BATCH ENDPOINTS
+# ========================================
+
+def create_message_batch(requests, api_key=None):
+    """Submit [{"custom_id", "params"}] requests as one batch and return the batch object"""
+    return _request("POST", batches_url(), api_key, json={"requests": requests}).json()
+
+
+def get_message_batch(batch_id, api_key=None):
+    return _request("GET", f"{batches_url()}/{batch_id}", api_key).json()
+
+
+def cancel_message_batch(batch_id, api_key=None):
+    return _request("POST", f"{batches_url()}/{batch_id}/cancel", api_key).json()
+
+
+def iter_message_batch_results(batch, api_key=None):
+    """Yield each result line ({"custom_id", "result"}) of an ended batch"""
+    response = _request("GET", batch["results_url"], api_key, stream=True)
+    try:
+        for line in response.iter_lines():
+            if line:
+                yield json.loads(line)
+    finally:
+        response.close()
+
+
+def wait_for_message_batch(batch_id, poll_seconds=MESSAGE_BATCH_POLL_SECONDS, timeout=MESSAGE_BATCH_TIMEOUT,
+                           api_key=None, on_poll=None):
+    """Poll until the batch has ended and return it; on_poll(batch) sees every status"""
+    deadline = time.time() + timeout
+    while True:
+        batch = get_message_batch(batch_id, api_key)
+        if on_poll:
+            on_poll(batch)
+        if batch.get("processing_status") == "ended":
+            return batch
+        if time.time() >= deadline:
+            raise TimeoutError(f"Message batch {batch_id} did not end within {timeout:.0f}s")
+        time.sleep(poll_seconds)
+
+
+# ========================================
+# TEST PAPERS AS BATCH REQUESTS
+# ========================================
+
+def _row_sections(row):
+    paper_format = resolve_paper_format(row.paper_type)
+    return plan_sections({"mcq": paper_format.mcq_count, "short": paper_format.short_count, "long": paper_format.long_count},
+                         section_limits())
+
+
+def build_test_batch_requests(rows, indexes=None):
+    """One batch request per section of every row (or of the rows at indexes)"""
+    requests = []
+    for index in (range(len(rows)) if indexes is None else indexes):
+        row = rows[index]
+        for section_index, counts in enumerate(_row_sections(row)):
+            prompt = build_generation_prompt(
+                row.board, row.grade, row.subject, row.topic, row.paper_type,
+                mcq_count=counts.get("mcq", 0), short_count=counts.get("short", 0), long_count=counts.get("long", 0)
+            )
+            requests.append({
+                "custom_id": f"row{index}-s{section_index}",
+                "params": build_prompt_payload(prompt, max_tokens=get_token_budget().max_tokens(counts))
+            })
+    return requests
+
+
+def submit_test_batch(rows, indexes=None, api_key=None):
+    """Submit the rows' papers as one Message Batch and return its id"""
+    requests = build_test_batch_requests(rows, indexes)
+    batch = create_message_batch(requests, api_key)
+    logger.info("submitted message batch %s with %d requests", batch["id"], len(requests))
+    return batch["id"]
+
+
+def _store_test(row, test_data):
+    """Finished batch papers serve later identical requests and feed the question bank"""
+    get_generation_cache().put(request_fingerprint(row.board, row.grade, row.subject, row.topic, row.paper_type), test_data)
+    get_question_bank().add_questions(row.board, row.grade, row.subject, row.topic, test_data['questions'])
+
+
+def _record_budget(row, section_index, message):
+    """Batch results calibrate the token budget like synchronous calls do"""
+    sections = _row_sections(row)
+    if section_index < len(sections):
+        budget = get_token_budget()
+        counts = sections[section_index]
+        budget.record(counts, budget.predict(counts), message.get("usage", {}).get("output_tokens"), message.get("stop_reason"))
+
+
+def collect_test_batch(batch, rows, api_key=None):
+    """Map an ended batch's results back to tests; yields (row index, test_data, error)
+
+    A row with any failed section is reported with an error and test_data None,
+    so it is generated again rather than saved short.
+    """
+    sections = defaultdict(dict)
+    errors = defaultdict(list)
+    for line in iter_message_batch_results(batch, api_key):
+        match = _CUSTOM_ID.match(line.get("custom_id", ""))
+        if not match:
+            continue
+        index, section_index = int(match.group(1)), int(match.group(2))
+        result = line.get("result", {})
+        if result.get("type") == "succeeded":
+            message = result.get("message", {})
+            _record_budget(rows[index], section_index, message)
+            parser = IncrementalQuestionParser()
+            parser.feed(response_text(message))
+            log_lost_questions(parser, _row_sections(rows[index])[section_index])
+            sections[index][section_index] = parser.questions
+        else:
+            errors[index].append(result.get("error", {}).get("message") or result.get("type", "unknown"))
+
+    for index in sorted(set(sections) | set(errors)):
+        row = rows[index]
+        expected = len(_row_sections(row))
+        if errors[index] or len(sections[index]) < expected:
+            reasons = "; ".join(errors[index]) or "missing results"
+            yield index, None, f"{expected - len(sections[index])} of {expected} sections failed ({reasons})"
+            continue
+        questions = merge_sections([sections[index][section_index] for section_index in sorted(sections[index])])
+        if not questions:
+            yield index, None, "No questions were generated"
+            continue
+        test_data = {
+            'test_info': build_test_info(row.board, row.grade, row.subject, row.topic, row.paper_type, False, questions),
+            'questions': questions
+        }
+        _store_test(row, test_data)
+        yield index, test_data, None
@@ -0,0 +1,272 @@
+import hashlib
+import os
+import random
+import re
+import sqlite3
+import struct
+import threading
+import time
+from collections import defaultdict
+
+from src.components.curriculum_store import normalise_grade
+from src.components.generation_cache import CACHE_DIR
+
+# ========================================
+# NEAR-DUPLICATE QUESTION DETECTION
+# ========================================
+# Questions are reduced to MinHash signatures over character shingles and bucketed
+# with locality-sensitive hashing, so each new question is compared only with the
+# few earlier ones sharing a band rather than with every question seen. Checks
+# run within the paper being generated and against the signatures of previously
+# generated papers for the same board/grade/subject, kept in SQLite. That history
+# is capped and aged out per scope, so a much-repeated topic does not run out of
+# questions it is allowed to ask.
+
+NEAR_DUPLICATE_DB_PATH = os.path.join(CACHE_DIR, "near_duplicates.sqlite3")
+NEAR_DUPLICATE_THRESHOLD = float(os.getenv("NEAR_DUPLICATE_THRESHOLD", "0.7"))
+# Questions of earlier papers are compared with for this many days, newest first up to the cap per scope
+NEAR_DUPLICATE_HISTORY_DAYS = float(os.getenv("NEAR_DUPLICATE_HISTORY_DAYS", "60"))
+NEAR_DUPLICATE_HISTORY_MAX = int(os.getenv("NEAR_DUPLICATE_HISTORY_MAX", "2000"))
+SHINGLE_SIZE = 5
+NUM_PERMUTATIONS = 64
+LSH_BANDS = 16
+LSH_ROWS = NUM_PERMUTATIONS // LSH_BANDS
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+_rng = random.Random(1729)
+_PERMUTATIONS = [(_rng.randrange(1, _MERSENNE_PRIME), _rng.randrange(0, _MERSENNE_PRIME)) for _ in range(NUM_PERMUTATIONS)]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS signatures (
+    id INTEGER PRIMARY KEY,
+    scope TEXT NOT NULL,
+    text TEXT NOT NULL,
+    signature BLOB NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS bands (
+    scope TEXT NOT NULL,
+    band_key TEXT NOT NULL,
+    signature_id INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS bands_lookup ON bands (scope, band_key);
+CREATE INDEX IF NOT EXISTS bands_signature ON bands (signature_id);
+CREATE INDEX IF NOT EXISTS signatures_age ON signatures (scope, created_at);
+"""
+
+
+def normalise_text(text):
+    return re.sub(r'[^a-z0-9]+', ' ', str(text).lower()).strip()
+
+
+def shingles(text, size=SHINGLE_SIZE):
+    """Set of hashed character shingles of the normalised text"""
+    text = normalise_text(text)
+    if len(text) <= size:
+        text = text.ljust(size)
+    return {
+        int.from_bytes(hashlib.blake2b(text[i:i + size].encode("utf-8"), digest_size=4).digest(), "big")
+        for i in range(len(text) - size + 1)
+    }
+
+
+def minhash_signature(text):
+    """MinHash signature of a question text"""
+    hashed = shingles(text)
+    return tuple(
+        min(((a * value + b) % _MERSENNE_PRIME) & _MAX_HASH for value in hashed)
+        for a, b in _PERMUTATIONS
+    )
+
+
+def signature_similarity(first, second):
+    """Estimated Jaccard similarity of two signatures"""
+    return sum(1 for a, b in zip(first, second) if a == b) / len(first)
+
+
+def band_keys(signature):
+    """One LSH bucket key per band of the signature"""
+    return [
+        f"{band}:{hashlib.blake2b(struct.pack(f'>{LSH_ROWS}I', *signature[band * LSH_ROWS:(band + 1) * LSH_ROWS]), digest_size=8).hexdigest()}"
+        for band in range(LSH_BANDS)
+    ]
+
+
+class NearDuplicateIndex:
+    """In-memory LSH index; add() and find() are both O(bands)"""
+
+    def __init__(self, threshold=NEAR_DUPLICATE_THRESHOLD):
+        self.threshold = threshold
+        self._buckets = defaultdict(list)
+        self._signatures = []
+
+    def find(self, signature):
+        """Index of the most similar earlier entry above the threshold, or None"""
+        candidates = {index for key in band_keys(signature) for index in self._buckets.get(key, ())}
+        best, best_score = None, self.threshold
+        for index in candidates:
+            score = signature_similarity(signature, self._signatures[index])
+            if score >= best_score:
+                best, best_score = index, score
+        return best
+
+    def add(self, signature):
+        index = len(self._signatures)
+        self._signatures.append(signature)
+        for key in band_keys(signature):
+            self._buckets[key].append(index)
+        return index
+
+
+def dedupe_questions(questions, threshold=NEAR_DUPLICATE_THRESHOLD):
+    """Drop near-duplicates within one list of questions, keeping the first of each group"""
+    index = NearDuplicateIndex(threshold)
+    kept = []
+    for question in questions:
+        signature = minhash_signature(question.get('question', ''))
+        if index.find(signature) is None:
+            index.add(signature)
+            kept.append(question)
+    return kept
+
+
+def history_scope(board, grade, subject):
+    """Papers for the same board, grade and subject are compared with each other"""
+    return "\x1f".join((normalise_text(board), normalise_grade(grade), normalise_text(subject)))
+
+
+class SignatureStore:
+    """SQLite-backed LSH index of questions from previously generated papers, capped and aged out per scope"""
+
+    def __init__(self, path=NEAR_DUPLICATE_DB_PATH, threshold=NEAR_DUPLICATE_THRESHOLD,
+                 max_age_days=NEAR_DUPLICATE_HISTORY_DAYS, max_entries=NEAR_DUPLICATE_HISTORY_MAX):
+        self.path = path
+        self.threshold = threshold
+        self.max_age = max_age_days * 86400
+        self.max_entries = max_entries
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def find(self, scope, signature):
+        """Text of the most similar stored question above the threshold, or None"""
+        keys = band_keys(signature)
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT text, signature FROM signatures WHERE created_at >= ? AND id IN ("
+                f"SELECT signature_id FROM bands WHERE scope = ? AND band_key IN ({','.join('?' * len(keys))}))",
+                (time.time() - self.max_age, scope, *keys)
+            ).fetchall()
+        best, best_score = None, self.threshold
+        for text, packed in rows:
+            score = signature_similarity(signature, struct.unpack(f">{NUM_PERMUTATIONS}I", packed))
+            if score >= best_score:
+                best, best_score = text, score
+        return best
+
+    def add_many(self, scope, entries):
+        """Store (text, signature) pairs and prune the scope's history"""
+        now = time.time()
+        with self._connect() as conn:
+            for text, signature in entries:
+                signature_id = conn.execute(
+                    "INSERT INTO signatures (scope, text, signature, created_at) VALUES (?, ?, ?, ?)",
+                    (scope, text, struct.pack(f">{NUM_PERMUTATIONS}I", *signature), now)
+                ).lastrowid
+                conn.executemany(
+                    "INSERT INTO bands (scope, band_key, signature_id) VALUES (?, ?, ?)",
+                    [(scope, key, signature_id) for key in band_keys(signature)]
+                )
+            self._prune(conn, scope, now)
+
+    def _prune(self, conn, scope, now):
+        """Delete the scope's signatures older than the history age or beyond its newest max_entries"""
+        stale = conn.execute(
+            "SELECT id FROM signatures WHERE scope = ? AND (created_at < ? OR id NOT IN ("
+            "SELECT id FROM signatures WHERE scope = ? ORDER BY created_at DESC, id DESC LIMIT ?))",
+            (scope, now - self.max_age, scope, self.max_entries)
+        ).fetchall()
+        if stale:
+            conn.executemany("DELETE FROM bands WHERE signature_id = ?", stale)
+            conn.executemany("DELETE FROM signatures WHERE id = ?", stale)
+
+
+class PaperDeduplicator:
+    """Online filter for the questions of one paper as they arrive
+
+    check() rejects a question that nearly repeats one already on the paper or
+    one from an earlier paper in the same scope; commit() records the paper's new
+    questions so later papers are checked against them. Repeats of earlier papers
+    are held back, and reuse_held() returns them when the paper would otherwise
+    be left short.
+    """
+
+    def __init__(self, board, grade, subject, store=None, threshold=NEAR_DUPLICATE_THRESHOLD):
+        self.scope = history_scope(board, grade, subject)
+        self.store = store or get_signature_store()
+        self.paper = NearDuplicateIndex(threshold)
+        self.new_entries = []
+        self.held = []
+        self.dropped_in_paper = 0
+        self.dropped_from_history = 0
+        self.reused_from_history = 0
+
+    def seed(self, questions):
+        """Questions already on the paper (for example from the bank) that new ones must not repeat"""
+        for question in questions:
+            self.paper.add(minhash_signature(question.get('question', '')))
+
+    def check(self, question):
+        """True when the question is new enough to keep; kept questions join the paper index"""
+        text = question.get('question', '')
+        signature = minhash_signature(text)
+        if self.paper.find(signature) is not None:
+            self.dropped_in_paper += 1
+            return False
+        if self.store.find(self.scope, signature) is not None:
+            self.dropped_from_history += 1
+            self.held.append((question, signature))
+            return False
+        self.paper.add(signature)
+        self.new_entries.append((text, signature))
+        return True
+
+    def reuse_held(self, shortfall):
+        """Held repeats of earlier papers for the types shortfall still lacks, flagged repeats_earlier_paper
+
+        The caller decrements shortfall as it takes each question.
+        """
+        held, self.held = self.held, []
+        for question, signature in held:
+            if shortfall.get(question['type'], 0) <= 0 or self.paper.find(signature) is not None:
+                continue
+            self.paper.add(signature)
+            self.reused_from_history += 1
+            yield dict(question, repeats_earlier_paper=True)
+
+    def commit(self):
+        if self.new_entries:
+            self.store.add_many(self.scope, self.new_entries)
+            self.new_entries = []
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_signature_store():
+    """Return the process-wide signature store"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = SignatureStore()
+    return _store
@@ -0,0 +1,138 @@
+from collections import defaultdict, namedtuple
+
+# ========================================
+# CONSTRAINT-SOLVING PAPER ASSEMBLER
+# ========================================
+# Picks questions from a candidate pool so the paper has exactly the format's
+# mcq/short/long counts and a marks total as close as possible to total_marks
+# (exact when the pool allows it), while covering as many topics as it can.
+#
+# Candidates are grouped into (type, marks) classes, so the knapsack runs over a
+# handful of classes rather than over every question: per type a bounded
+# knapsack finds every reachable marks sum for exactly the required count, the
+# per-type sums are combined to the total closest to the target, and questions
+# are then drawn from each chosen class topic-first.
+
+QUESTION_TYPES = ("mcq", "short", "long")
+# Marks are compared as integers in hundredths, so 2.5 and 3.33 work like whole marks
+MARKS_SCALE = 100
+
+AssemblyResult = namedtuple("AssemblyResult", [
+    "questions", "total_marks", "target_marks", "exact", "counts", "shortfall", "topics_covered", "topics_missing"
+])
+
+
+def _question_type(question):
+    question_type = str(question.get('type', 'mcq')).lower().replace("_answer", "")
+    return question_type if question_type in QUESTION_TYPES else "mcq"
+
+
+def _scaled_marks(question, default):
+    try:
+        return round(float(question.get('marks')) * MARKS_SCALE)
+    except (TypeError, ValueError):
+        return round(default * MARKS_SCALE)
+
+
+def question_topic(question):
+    """Topic a candidate counts towards for coverage"""
+    return question.get('topic') or question.get('curriculum_topic') or ""
+
+
+def _reachable_sums(classes, count):
+    """Bounded knapsack over (marks, available) classes for exactly count items
+
+    Returns {marks_sum: [take per class]} for every reachable sum.
+    """
+    # states: (items taken, marks sum) -> takes per class so far
+    states = {(0, 0): ()}
+    for marks, available in classes:
+        next_states = {}
+        for (taken, total), takes in states.items():
+            for take in range(min(available, count - taken) + 1):
+                key = (taken + take, total + take * marks)
+                if key not in next_states:
+                    next_states[key] = takes + (take,)
+        states = next_states
+    return {total: list(takes) for (taken, total), takes in states.items() if taken == count}
+
+
+def _combine(per_type_sums, target):
+    """Choose one reachable sum per type so the overall total is closest to target"""
+    combined = {0: ()}
+    for sums in per_type_sums:
+        next_combined = {}
+        for total, picks in combined.items():
+            for marks_sum in sums:
+                next_combined.setdefault(total + marks_sum, picks + (marks_sum,))
+        combined = next_combined
+    best = min(combined, key=lambda total: (abs(total - target), total > target))
+    return best, combined[best]
+
+
+def _draw(candidates, take, covered):
+    """Take questions from one class, preferring topics not yet on the paper"""
+    chosen = []
+    by_topic = defaultdict(list)
+    for question in candidates:
+        by_topic[question_topic(question)].append(question)
+    # Uncovered topics first, then round-robin so one topic does not fill the class
+    order = sorted(by_topic, key=lambda topic: topic in covered)
+    while len(chosen) < take:
+        for topic in order:
+            if by_topic[topic] and len(chosen) < take:
+                chosen.append(by_topic[topic].pop(0))
+                covered.add(topic)
+        order = [topic for topic in order if by_topic[topic]]
+    return chosen
+
+
+def assemble_paper(paper_format, pool, topics=None):
+    """Select questions from pool matching paper_format's counts, marks and topic coverage
+
+    paper_format is a PaperFormat from resolve_paper_format; pool is a list of
+    question dicts (type, marks, optional topic); topics, when given, are the
+    topics the paper should cover. Types the pool cannot fill are reported in
+    shortfall and filled as far as possible.
+    """
+    wanted = {"mcq": paper_format.mcq_count, "short": paper_format.short_count, "long": paper_format.long_count}
+    default_marks = {"mcq": paper_format.mcq_marks_each, "short": paper_format.short_marks_each,
+                     "long": paper_format.long_marks_each}
+    target = round(paper_format.total_marks * MARKS_SCALE)
+
+    classes = {question_type: defaultdict(list) for question_type in QUESTION_TYPES}
+    for question in pool:
+        question_type = _question_type(question)
+        classes[question_type][_scaled_marks(question, default_marks[question_type])].append(question)
+
+    class_lists = []
+    per_type_sums = []
+    shortfall = {}
+    for question_type in QUESTION_TYPES:
+        type_classes = sorted((marks, len(questions)) for marks, questions in classes[question_type].items())
+        available = sum(count for _, count in type_classes)
+        count = min(wanted[question_type], available)
+        shortfall[question_type] = wanted[question_type] - count
+        class_lists.append(type_classes)
+        per_type_sums.append(_reachable_sums(type_classes, count))
+
+    total, picks = _combine(per_type_sums, target)
+
+    covered = set()
+    chosen = []
+    for question_type, type_classes, sums, marks_sum in zip(QUESTION_TYPES, class_lists, per_type_sums, picks):
+        for (marks, _), take in zip(type_classes, sums[marks_sum]):
+            if take:
+                chosen.extend(_draw(classes[question_type][marks], take, covered))
+
+    wanted_topics = set(topics) if topics else {question_topic(question) for question in pool} - {""}
+    return AssemblyResult(
+        questions=chosen,
+        total_marks=total / MARKS_SCALE,
+        target_marks=paper_format.total_marks,
+        exact=total == target,
+        counts={question_type: wanted[question_type] - shortfall[question_type] for question_type in QUESTION_TYPES},
+        shortfall=shortfall,
+        topics_covered=sorted(wanted_topics & covered),
+        topics_missing=sorted(wanted_topics - covered)
+    )
@@ -0,0 +1,305 @@
+import re
+import threading
+from collections import namedtuple
+
+# ========================================
+# DECLARATIVE PAPER-FORMAT REGISTRY
+# ========================================
+# Every paper type string returned by get_paper_types_by_board_and_grade resolves
+# through these tables instead of if/elif chains. Rows are checked in order, so
+# the first matching pattern wins exactly as the chains did: count rows match the
+# lower-cased paper type, description rows match it as written.
+
+PaperFormat = namedtuple("PaperFormat", [
+    "mcq_count", "short_count", "long_count",
+    "mcq_marks_each", "short_marks_each", "long_marks_each",
+    "total_marks", "paper_duration", "total_questions", "description"
+])
+
+# (pattern, mcq, short, long, mcq_marks_each, short_marks_each, long_marks_each, total_marks, paper_duration)
+PAPER_FORMAT_TABLE = (
+    # ========== CBSE PATTERNS (Research-based from official CBSE data) ==========
+    # CBSE Primary Classes (1-5) - 40-60 marks total
+    ('formative assessment test (20 mixed questions)', 10, 10, 0, 1, 2, 5, 30, '2 hours'),
+    ('summative assessment paper (25 mixed questions)', 15, 10, 0, 1, 2.5, 5, 40, '2.5 hours'),
+    ('unit test format (15 questions)', 10, 5, 0, 1, 2, 5, 20, '1.5 hours'),
+    ('term examination paper (30 questions)', 15, 12, 3, 1, 2, 3, 48, '2.5 hours'),
+    ('activity-based assessment (20 practical tasks)', 0, 20, 0, 1, 2, 5, 40, '2 hours'),
+    ('oral assessment test (10 questions)', 0, 10, 0, 1, 2, 5, 20, '30 minutes'),
+    ('project work assessment (15 creative tasks)', 0, 15, 0, 1, 2, 5, 30, '2 hours'),
+    # CBSE Middle Classes (6-8) - 50-80 marks total
+    ('periodic test paper (35 mixed questions)', 20, 12, 3, 1, 2, 4, 56, '2.5 hours'),
+    ('term examination format (40 questions)', 20, 15, 5, 1, 2, 4, 70, '3 hours'),
+    ('unit assessment test (30 questions)', 15, 12, 3, 1, 2, 3, 48, '2.5 hours'),
+    ('half-yearly examination (45 questions)', 25, 15, 5, 1, 2, 5, 80, '3 hours'),
+    ('annual examination paper (50 questions)', 30, 15, 5, 1, 2, 6, 90, '3 hours'),
+    ('internal assessment format (25 questions)', 15, 8, 2, 1, 2, 4, 39, '2 hours'),
+    ('practice test series (35 questions)', 20, 12, 3, 1, 2, 4, 56, '2.5 hours'),
+    # CBSE Secondary (9-10) - Official 80 marks theory + 20 internal
+    ('board pattern paper - theory (25 mcq + 10 short + 5 long)', 25, 10, 5, 1, 3, 5, 80, '3 hours'),
+    ('sample paper format - full syllabus (40 mixed questions)', 16, 16, 8, 1, 2, 6, 80, '3 hours'),
+    ('pre-board examination paper (35 questions)', 15, 15, 5, 1, 3, 8, 80, '3 hours'),
+    ('mock board test (30 mcq + 15 short answers)', 30, 15, 0, 1, 3.33, 5, 80, '3 hours'),
+    ('chapter-wise practice test (25 questions)', 10, 12, 3, 1, 3, 7, 67, '2.5 hours'),
+    ('competency-based question paper (20 mcq + 15 application)', 20, 15, 0, 1, 4, 5, 80, '3 hours'),
+    ('aisse pattern mock test (full 80 marks format)', 20, 10, 6, 1, 3, 5, 80, '3 hours'),
+    # CBSE Senior Secondary (11-12) - Official 70-80 marks theory + 20-30 internal
+    ('board examination pattern (30 mixed questions)', 12, 12, 6, 1, 3, 6, 80, '3 hours'),
+    ('aissce sample paper format (35 questions)', 15, 15, 5, 1, 3, 8, 80, '3 hours'),
+    ('pre-board mock test (40 questions)', 16, 16, 8, 1, 2, 6, 80, '3 hours'),
+    ('term-end examination (45 questions)', 20, 20, 5, 1, 2, 8, 80, '3 hours'),
+    ('practice test series (30 mcq + 10 long)', 30, 0, 10, 1, 3, 5, 80, '3 hours'),
+    ('chapter-wise assessment (25 questions)', 10, 10, 5, 1, 3, 7, 75, '2.5 hours'),
+    ('competency-based paper (20 mcq + 15 application + 5 case study)', 20, 15, 5, 1, 2, 6, 80, '3 hours'),
+    # ========== ICSE PATTERNS (Research-based from official ICSE data) ==========
+    # ICSE Primary Classes (1-5) - 40-60 marks total
+    ('foundation assessment test (20 mixed questions)', 12, 8, 0, 1, 3, 5, 36, '2 hours'),
+    ('progress evaluation test (30 questions)', 15, 12, 3, 1, 2, 4, 51, '2.5 hours'),
+    ('skills assessment format (15 activity-based)', 0, 15, 0, 1, 3, 5, 45, '2 hours'),
+    ('continuous assessment paper (20 questions)', 10, 8, 2, 1, 2, 4, 34, '2 hours'),
+    ('unit test format (18 questions)', 10, 6, 2, 1, 2, 3, 28, '1.5 hours'),
+    ('oral assessment test (12 questions)', 0, 12, 0, 1, 2, 5, 24, '30 minutes'),
+    # ICSE Middle Classes (6-8) - 50-80 marks total
+    ('class test format (30 questions)', 15, 12, 3, 1, 2, 5, 54, '2.5 hours'),
+    ('half-yearly assessment (40 questions)', 20, 15, 5, 1, 2, 6, 80, '3 hours'),
+    ('annual examination format (45 questions)', 25, 15, 5, 1, 2, 7, 90, '3 hours'),
+    ('internal assessment test (25 questions)', 15, 8, 2, 1, 2, 4, 39, '2 hours'),
+    ('chapter-wise practice (20 questions)', 10, 8, 2, 1, 2, 4, 34, '2 hours'),
+    ('skills evaluation paper (30 mixed questions)', 15, 12, 3, 1, 2, 5, 54, '2.5 hours'),
+    # ICSE Grade 10 - Official 80 marks theory + 20 internal
+    ('icse board pattern paper 1 - theory (25 mcq + 15 short)', 25, 15, 0, 1, 3.67, 5, 80, '2.5 hours'),
+    ('icse board pattern paper 2 - descriptive (20 long answers)', 0, 0, 20, 1, 3, 4, 80, '2.5 hours'),
+    ('mock icse examination (full 80 marks format)', 15, 10, 8, 1, 3, 5, 80, '2.5 hours'),
+    ('sample paper - group i subjects (35 questions)', 15, 15, 5, 1, 3, 8, 80, '2.5 hours'),
+    ('sample paper - group ii subjects (30 questions)', 15, 12, 3, 1, 3, 9, 80, '2.5 hours'),
+    ('sample paper - group iii subjects (25 questions)', 0, 15, 10, 1, 2, 5, 80, '2.5 hours'),
+    ('pre-board mock test (40 mixed questions)', 20, 15, 5, 1, 2, 8, 80, '2.5 hours'),
+    ('chapter-wise practice test (30 questions)', 15, 12, 3, 1, 3, 8, 75, '2.5 hours'),
+    # ISC (11-12) - Official 70-100 marks theory + 20-30 internal
+    ('isc board pattern paper 1 - theory (30 questions)', 15, 10, 5, 1, 3, 8, 85, '3 hours'),
+    ('isc board pattern paper 2 - application (25 questions)', 10, 10, 5, 1, 3, 8, 80, '3 hours'),
+    ('mock isc examination (full 100 marks format)', 20, 15, 8, 1, 3, 6, 100, '3 hours'),
+    ('sample paper format (35 mixed questions)', 15, 15, 5, 1, 3, 8, 85, '3 hours'),
+    ('pre-board assessment (40 questions)', 20, 15, 5, 1, 2, 8, 90, '3 hours'),
+    ('project work assessment (20 research questions)', 0, 20, 0, 1, 4, 5, 80, '3 hours'),
+    # ========== IB PATTERNS (Research-based from official IB data) ==========
+    # IB PYP (Primary Years Programme) - 30-50 marks total
+    ('formative assessment tasks (15 inquiry questions)', 0, 15, 0, 1, 2.5, 5, 37.5, '2 hours'),
+    ('unit of inquiry assessment (20 mixed questions)', 10, 8, 2, 1, 2, 5, 36, '2 hours'),
+    ('transdisciplinary skills test (18 questions)', 8, 8, 2, 1, 2, 4, 32, '1.5 hours'),
+    ('exhibition preparation practice (12 research tasks)', 0, 12, 0, 1, 3, 5, 36, '2 hours'),
+    ('concept-based assessment (20 questions)', 10, 8, 2, 1, 2, 5, 36, '2 hours'),
+    ('student-led conference prep (15 reflection questions)', 0, 15, 0, 1, 3, 5, 45, '2 hours'),
+    ('action-focused evaluation (18 application tasks)', 0, 18, 0, 1, 2.5, 5, 45, '2 hours'),
+    # IB MYP (Middle Years Programme) - 50-80 marks total
+    ('myp criterion-based assessment (25 questions)', 10, 12, 3, 1, 2, 6, 52, '2.5 hours'),
+    ('eassessment practice paper (30 on-screen questions)', 20, 8, 2, 1, 3, 8, 60, '2 hours'),
+    ('personal project preparation (15 research questions)', 0, 15, 0, 1, 4, 5, 60, '3 hours'),
+    ('interdisciplinary unit test (20 questions)', 8, 10, 2, 1, 3, 6, 50, '2 hours'),
+    ('community project assessment (18 service questions)', 0, 18, 0, 1, 3, 5, 54, '2.5 hours'),
+    ('atl skills evaluation (25 questions)', 15, 8, 2, 1, 2, 6, 43, '2 hours'),
+    ('global context exploration (20 questions)', 8, 10, 2, 1, 3, 6, 50, '2 hours'),
+    ('subject-specific assessment (30 questions)', 15, 12, 3, 1, 2, 7, 60, '2.5 hours'),
+    # IB DP (Diploma Programme) - Official IB marking schemes
+    ('paper 1 - multiple choice (40 mcqs)', 40, 0, 0, 1, 3, 5, 40, '1 hour'),
+    ('paper 2 - structured questions (15 short + 10 long)', 0, 15, 10, 1, 3, 6, 105, '2.25 hours'),
+    ('paper 3 - extension/options (20 mixed questions)', 8, 8, 4, 1, 4, 8, 72, '1.25 hours'),
+    ('internal assessment practice (25 questions)', 0, 25, 0, 1, 1.6, 5, 40, '2 hours'),
+    ('extended essay preparation (10 research questions)', 0, 0, 10, 1, 3, 3.6, 36, '3 hours'),
+    ('tok assessment practice (15 critical thinking questions)', 0, 15, 0, 1, 2.67, 5, 40, '2.5 hours'),
+    ('mock ib examination (full dp format)', 20, 15, 8, 1, 3, 6, 108, '3 hours'),
+    ('higher level practice paper (35 questions)', 15, 15, 5, 1, 4, 8, 115, '3 hours'),
+    ('standard level practice paper (30 questions)', 15, 12, 3, 1, 3, 6, 69, '2.5 hours'),
+    # ========== CAMBRIDGE IGCSE PATTERNS (Research-based) ==========
+    # Cambridge Lower Secondary (Grades 6-8) - 40-70 marks
+    ('cambridge primary test (20 questions)', 12, 6, 2, 1, 2, 4, 32, '1.5 hours'),
+    ('lower secondary assessment (25 questions)', 15, 8, 2, 1, 2, 5, 41, '2 hours'),
+    ('checkpoint practice paper (30 questions)', 15, 12, 3, 1, 2, 5, 54, '2 hours'),
+    ('stage assessment test (22 questions)', 12, 8, 2, 1, 2, 4, 36, '1.5 hours'),
+    ('progress test format (28 questions)', 15, 10, 3, 1, 2, 5, 50, '2 hours'),
+    ('skills development assessment (20 questions)', 10, 8, 2, 1, 2, 4, 34, '1.5 hours'),
+    # Cambridge IGCSE Level (Grades 9-10) - 70-90 marks
+    ('paper 1 - core level (30 mcqs + 10 short)', 30, 10, 0, 1, 4, 5, 70, '1.75 hours'),
+    ('paper 2 - extended level (25 mixed questions)', 10, 12, 3, 1, 3, 8, 70, '2.25 hours'),
+    ('paper 3 - practical/coursework assessment (20 questions)', 0, 20, 0, 1, 3, 5, 60, '2 hours'),
+    ('paper 4 - alternative to practical (25 questions)', 15, 8, 2, 1, 3, 5, 49, '2 hours'),
+    ('mock igcse examination (full format)', 20, 15, 5, 1, 3, 6, 95, '2.5 hours'),
+    ('sample paper - foundation tier (35 questions)', 20, 12, 3, 1, 2, 6, 62, '2 hours'),
+    ('sample paper - higher tier (40 questions)', 20, 15, 5, 1, 3, 7, 90, '2.5 hours'),
+    ('pre-examination practice (30 questions)', 15, 12, 3, 1, 3, 6, 69, '2 hours'),
+    # Cambridge AS/A Level (Grades 11-12) - 60-100 marks
+    ('as level paper 1 (35 questions)', 15, 15, 5, 1, 2, 5, 60, '1.5 hours'),
+    ('as level paper 2 (30 questions)', 10, 15, 5, 1, 2, 6, 70, '2 hours'),
+    ('a level paper 1 (40 questions)', 20, 15, 5, 1, 3, 7, 90, '3 hours'),
+    ('a level paper 2 (35 questions)', 15, 15, 5, 1, 3, 8, 85, '3 hours'),
+    ('a level paper 3 - synoptic (25 questions)', 10, 10, 5, 2, 4, 10, 110, '3 hours'),
+    ('cambridge advanced practice (45 questions)', 25, 15, 5, 1, 3, 8, 110, '3 hours'),
+    ('mock as/a level examination (full format)', 20, 15, 8, 1, 3, 6, 103, '3 hours'),
+    ('practical assessment paper (20 questions)', 0, 20, 0, 1, 4, 5, 80, '2 hours'),
+    # ========== STATE BOARD PATTERNS (Research-based) ==========
+    # State Board Primary Classes (1-5) - 30-50 marks
+    ('state pattern primary test (20 questions)', 10, 8, 2, 1, 2, 3, 32, '2 hours'),
+    ('monthly assessment paper (15 questions)', 8, 5, 2, 1, 2, 3, 24, '1.5 hours'),
+    ('quarterly examination (25 questions)', 15, 8, 2, 1, 2, 4, 39, '2 hours'),
+    ('half-yearly assessment (30 questions)', 15, 12, 3, 1, 2, 5, 54, '2.5 hours'),
+    ('annual examination format (35 questions)', 20, 12, 3, 1, 2, 6, 62, '3 hours'),
+    ('unit test paper (18 questions)', 10, 6, 2, 1, 2, 3, 28, '1.5 hours'),
+    ('progress evaluation test (22 questions)', 12, 8, 2, 1, 2, 4, 36, '2 hours'),
+    # State Board Middle Classes (6-8) - 50-80 marks
+    ('state board format test (30 questions)', 15, 12, 3, 1, 2, 5, 54, '2.5 hours'),
+    ('quarterly assessment paper (25 mcq + 15 short)', 25, 15, 0, 1, 3, 5, 70, '3 hours'),
+    # State Board SSC/SSLC (Grade 10) - Official 80 marks theory + 20 internal
+    ('ssc board pattern paper 1 (25 mcq + 15 short + 5 long)', 25, 15, 5, 1, 2, 5, 80, '3 hours'),
+    ('ssc board pattern paper 2 (20 long answer questions)', 0, 0, 20, 1, 3, 4, 80, '3 hours'),
+    ('state board mock examination (full format)', 20, 15, 5, 1, 2, 6, 80, '3 hours'),
+    ('pre-board practice test (35 questions)', 15, 15, 5, 1, 3, 6, 75, '3 hours'),
+    ('sample paper - theory format (40 questions)', 20, 15, 5, 1, 2, 6, 80, '3 hours'),
+    ('chapter-wise board practice (30 questions)', 15, 12, 3, 1, 3, 6, 69, '2.5 hours'),
+    ('annual board exam pattern (full 80 marks)', 20, 12, 6, 1, 2, 6, 80, '3 hours'),
+    ('model question paper (35 mixed questions)', 15, 15, 5, 1, 3, 6, 75, '3 hours'),
+    # State Board HSC/PUC (11-12) - Official 70-100 marks theory + 20-30 internal
+    ('hsc board pattern paper (35 mixed questions)', 15, 15, 5, 1, 3, 8, 85, '3 hours'),
+    ('state higher secondary format (40 questions)', 20, 15, 5, 1, 3, 8, 95, '3 hours'),
+    ('pre-university examination (45 questions)', 25, 15, 5, 1, 3, 8, 105, '3 hours'),
+    ('board exam mock test (full format)', 20, 15, 8, 1, 3, 6, 103, '3 hours'),
+    ('sample paper - theory + practical (35 + 15)', 15, 20, 15, 1, 2, 4, 115, '3 hours'),
+    ('term-end assessment (40 questions)', 20, 15, 5, 1, 3, 7, 90, '3 hours'),
+    ('chapter-wise hsc practice (30 questions)', 15, 12, 3, 1, 3, 8, 75, '2.5 hours'),
+    ('model hsc question paper (full 100 marks)', 25, 15, 8, 1, 3, 6, 100, '3 hours')
+)
+
+# Paper types matching no row fall back on the question total they mention
+# (number, mcq, short, long, total_marks); marks and duration keep their defaults
+FALLBACK_BY_TOTAL = (
+    ("50", 30, 15, 5, 90),
+    ("45", 25, 15, 5, 85),
+    ("40", 20, 15, 5, 80),
+    ("35", 15, 15, 5, 75),
+    ("30", 15, 12, 3, 60),
+    ("25", 15, 8, 2, 50),
+    ("20", 10, 8, 2, 40),
+    ("15", 8, 5, 2, 30)
+)
+
+DEFAULT_PAPER_FORMAT = (20, 10, 5, 1, 3, 5, 80, "3 hours")
+
+# (patterns, description) shown next to the paper type selector
+PAPER_DESCRIPTION_TABLE = (
+    (("40 MCQs",), "40 Multiple Choice Questions"),
+    (("30 MCQs",), "30 Multiple Choice Questions"),
+    (("25 MCQs", "25 MCQ"), "25 Multiple Choice Questions"),
+    (("20 Mixed",), "20 Mixed Questions (MCQ + Short)"),
+    (("15 Short + 15 Long",), "15 Short + 15 Long Answer Questions"),
+    (("15 Activity", "Skills Practice"), "15 Hands-on Activity Tasks"),
+    (("25 Exploration", "Inquiry Tasks"), "25 Inquiry-based Questions"),
+    (("Primary Assessment", "Foundation Test"), "20 Age-appropriate Mixed Questions"),
+    (("Board Pattern Paper 1",), "25 MCQs + 15 Short Answers"),
+    (("Board Pattern Paper 2",), "10 Short + 10 Long Answer Questions"),
+    (("Sample Paper Format", "Mock"), "Full Board Exam Pattern"),
+    (("ICSE Board Format Paper 1",), "40 Multiple Choice Questions"),
+    (("ICSE Board Format Paper 2",), "Descriptive Answer Questions"),
+    (("Theory",), "Theory Questions (Mixed Format)"),
+    (("Practical",), "Practical-based Questions"),
+    (("A-Level",), "Advanced Level Questions"),
+    (("HSC Board Pattern",), "40 Higher Secondary Questions"),
+    (("State Board",), "State Board Exam Pattern"),
+    (("Criterion-Based",), "25 Criterion-based Questions"),
+    (("Personal Project",), "15 Research Questions"),
+    (("Certificate Practice",), "40 Certificate Exam Questions"),
+    (("Data Analysis",), "Data Analysis & Application"),
+    (("Cambridge Primary",), "20 Primary Level Questions"),
+    (("Checkpoint",), "30 Checkpoint Assessment Questions"),
+    (("Oral Assessment",), "10 Oral Questions")
+)
+
+DEFAULT_DESCRIPTION = "Custom Question Format"
+
+
+class OrderedSubstringMatcher:
+    """First-match-wins substring lookup over an ordered list of (pattern, row_index)
+
+    One lookahead alternation finds every pattern in a single pass over the text.
+    Literals matching at the same position are prefixes of the longest one, so each
+    pattern carries the row indexes of its registered prefixes as well.
+    """
+
+    def __init__(self, alternatives):
+        pattern_rows = {}
+        for pattern, row in alternatives:
+            pattern_rows.setdefault(pattern, row)
+        self._implied = {
+            pattern: frozenset(row for other, row in pattern_rows.items() if pattern.startswith(other))
+            for pattern in pattern_rows
+        }
+        self._matcher = re.compile("|".join(
+            f"(?=({re.escape(pattern)}))" for pattern in sorted(pattern_rows, key=len, reverse=True)
+        ))
+
+    def first(self, text):
+        """Index of the earliest row with a pattern inside text, or None"""
+        rows = set()
+        for match in self._matcher.finditer(text):
+            for pattern in match.groups():
+                if pattern is not None:
+                    rows.update(self._implied[pattern])
+        return min(rows) if rows else None
+
+
+class PaperFormatRegistry:
+    """Compiled paper-format tables with every resolved paper type memoised"""
+
+    def __init__(self, table, descriptions, fallback=FALLBACK_BY_TOTAL, default=DEFAULT_PAPER_FORMAT):
+        self._rows = [row[1:] for row in table]
+        self._counts = OrderedSubstringMatcher((row[0], index) for index, row in enumerate(table))
+        self._descriptions = [description for _, description in descriptions]
+        self._description_matcher = OrderedSubstringMatcher(
+            (pattern, index) for index, (patterns, _) in enumerate(descriptions) for pattern in patterns
+        )
+        self._fallback = fallback
+        self._default = default
+        self._resolved = {}
+        self._lock = threading.Lock()
+
+    def _format_values(self, paper_type_lower):
+        """Counts, marks, total and duration for a lower-cased paper type"""
+        index = self._counts.first(paper_type_lower)
+        if index is not None:
+            return self._rows[index]
+
+        mcq_marks, short_marks, long_marks = self._default[3:6]
+        duration = self._default[7]
+        for number, mcq, short, long_, total_marks in self._fallback:
+            if number in paper_type_lower:
+                return (mcq, short, long_, mcq_marks, short_marks, long_marks, total_marks, duration)
+        return self._default
+
+    def _match(self, paper_type):
+        values = self._format_values(paper_type.lower())
+        index = self._description_matcher.first(paper_type)
+        description = DEFAULT_DESCRIPTION if index is None else self._descriptions[index]
+        return PaperFormat(*values, values[0] + values[1] + values[2], description)
+
+    def resolve(self, paper_type):
+        """Resolve a paper type string to its PaperFormat"""
+        paper_type = paper_type or ""
+        paper_format = self._resolved.get(paper_type)
+        if paper_format is None:
+            paper_format = self._match(paper_type)
+            with self._lock:
+                self._resolved[paper_type] = paper_format
+        return paper_format
+
+
+PAPER_FORMATS = PaperFormatRegistry(PAPER_FORMAT_TABLE, PAPER_DESCRIPTION_TABLE)
+
+
+def resolve_paper_format(paper_type):
+    """Resolve a paper type string to counts, marks, duration and description"""
+    return PAPER_FORMATS.resolve(paper_type)
+
+
+def get_paper_format_counts(paper_type):
+    """Same dict as get_enhanced_question_counts_from_paper_type, from the registry"""
+    paper_format = resolve_paper_format(paper_type)._asdict()
+    del paper_format["description"]
+    return paper_format
@@ -0,0 +1,193 @@
+import hashlib
+import io
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+
+from src.components.tracing import traced
+
+try:
+    from reportlab.lib.pagesizes import A4
+    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+    from reportlab.lib import colors
+    PDF_AVAILABLE = True
+except ImportError:
+    PDF_AVAILABLE = False
+
+# ========================================
+# IN-MEMORY PDF EXPORT
+# ========================================
+# Question and answer PDFs are built into BytesIO buffers and returned as bytes,
+# so concurrent sessions never share a file on disk. They take the NormalizedTest
+# the caller normalised once when the test was produced. Rendered documents are
+# kept in a small LRU keyed by a hash of the test content, so repeated download
+# clicks for the same test reuse the bytes instead of rebuilding the document.
+
+PDF_RENDER_CACHE_MAX_BYTES = int(os.getenv("PDF_RENDER_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+# Bump when the layout changes so stale renders are not served
+PDF_LAYOUT_VERSION = 2
+
+logger = logging.getLogger(__name__)
+
+
+def _questions_story(test, styles):
+    """Flowables for the questions-only paper"""
+    story = []
+
+    # II Tuition Title style
+    tuitions_title_style = ParagraphStyle(
+        'TuitionsTitle',
+        parent=styles['Heading1'],
+        fontSize=20,
+        spaceAfter=10,
+        alignment=1,  # Center
+        textColor=colors.darkblue
+    )
+
+    info = test.info
+
+    # II Tuition Header
+    story.append(Paragraph("🎓 II Tuition Mock Test Generated", tuitions_title_style))
+    story.append(Paragraph(f"{info.subject} Mock Test", tuitions_title_style))
+    story.append(Paragraph(f"Board: {info.board} | Grade: {info.grade} | Topic: {info.topic}", styles['Normal']))
+    story.append(Spacer(1, 20))
+
+    # Instructions
+    story.append(Paragraph("Instructions:", styles['Heading2']))
+    story.append(Paragraph("• Read all questions carefully", styles['Normal']))
+    story.append(Paragraph("• Choose the best answer for multiple choice questions", styles['Normal']))
+    story.append(Paragraph("• Write clearly for descriptive answers", styles['Normal']))
+    story.append(Paragraph("• Manage your time effectively", styles['Normal']))
+    story.append(Spacer(1, 20))
+
+    # Questions; options are empty for everything but MCQs
+    for i, question in enumerate(test.questions, 1):
+        story.append(Paragraph(f"<b>Question {i}:</b> {question.text}", styles['Normal']))
+        for option_key, option_text in question.options:
+            story.append(Paragraph(f"&nbsp;&nbsp;&nbsp;&nbsp;<b>{option_key})</b> {option_text}", styles['Normal']))
+        story.append(Spacer(1, 15))
+
+    return story
+
+
+def _answers_story(test, styles):
+    """Flowables for the answer key"""
+    story = []
+
+    # Header
+    story.append(Paragraph("🎓 II Tuition Mock Test - Answer Key", styles['Heading1']))
+    story.append(Paragraph(f"{test.info.subject} Mock Test Answers", styles['Heading2']))
+    story.append(Spacer(1, 20))
+
+    # Answers
+    for i, question in enumerate(test.questions, 1):
+        story.append(Paragraph(f"<b>Question {i}:</b> {question.text}", styles['Normal']))
+
+        # Show the correct answer
+        if question.correct_answer:
+            story.append(Paragraph(f"<b>Correct Answer:</b> {question.correct_answer}", styles['Normal']))
+        elif question.sample_answer:
+            story.append(Paragraph(f"<b>Sample Answer:</b> {question.sample_answer}", styles['Normal']))
+
+        # Show explanation if available
+        if question.explanation:
+            story.append(Paragraph(f"<b>Explanation:</b> {question.explanation}", styles['Normal']))
+
+        story.append(Spacer(1, 15))
+
+    return story
+
+
+_STORY_BUILDERS = {
+    "questions": _questions_story,
+    "answers": _answers_story
+}
+
+
+@traced("pdf/render_pdf")
+def render_pdf(test, kind):
+    """Build the "questions" or "answers" PDF for a NormalizedTest and return its bytes"""
+    buffer = io.BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=A4)
+    doc.build(_STORY_BUILDERS[kind](test, getSampleStyleSheet()))
+    return buffer.getvalue()
+
+
+def content_hash(test, kind):
+    """Key identifying one rendered document: the test content, the PDF kind and the layout version"""
+    # show_answers_on_screen only affects the on-screen view, not either PDF
+    info = test.info._replace(show_answers_on_screen=False)
+    content = json.dumps(
+        [kind, PDF_LAYOUT_VERSION, info, test.questions],
+        ensure_ascii=False, default=str
+    )
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+class PdfRenderCache:
+    """Thread-safe LRU of rendered PDF bytes bounded by total size"""
+
+    def __init__(self, max_bytes=PDF_RENDER_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_render(self, test, kind):
+        """Cached bytes for this NormalizedTest and kind, rendering them on a miss"""
+        key = content_hash(test, kind)
+        with self._lock:
+            pdf_bytes = self._entries.get(key)
+            if pdf_bytes is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return pdf_bytes
+            self.misses += 1
+
+        pdf_bytes = render_pdf(test, kind)
+
+        with self._lock:
+            if key not in self._entries and len(pdf_bytes) <= self.max_bytes:
+                self._entries[key] = pdf_bytes
+                self._bytes += len(pdf_bytes)
+                while self._bytes > self.max_bytes:
+                    _, evicted = self._entries.popitem(last=False)
+                    self._bytes -= len(evicted)
+        return pdf_bytes
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries), "bytes": self._bytes}
+
+
+_render_cache = PdfRenderCache()
+
+
+def get_pdf_render_cache():
+    """Process-wide render cache shared by every session"""
+    return _render_cache
+
+
+def get_questions_pdf(test):
+    """Questions-only PDF of a NormalizedTest as bytes, or None when it cannot be built"""
+    return _get_pdf(test, "questions")
+
+
+def get_answers_pdf(test):
+    """Answer key PDF of a NormalizedTest as bytes, or None when it cannot be built"""
+    return _get_pdf(test, "answers")
+
+
+def _get_pdf(test, kind):
+    if not PDF_AVAILABLE:
+        return None
+    try:
+        return _render_cache.get_or_render(test, kind)
+    except Exception:
+        logger.exception("failed to render %s PDF", kind)
+        return None
@@ -0,0 +1,99 @@
+import json
+from collections import namedtuple
+
+from src.components.curriculum_store import get_curriculum_topics
+from src.components.paper_formats import resolve_paper_format
+
+# ========================================
+# GENERATION PROMPT BUILDER
+# ========================================
+# Static text comes first so the API can cache it as a prompt prefix: the
+# instructions and JSON schema are shared by every request, the board guidelines
+# and curriculum topics by every topic of a board/grade/subject. The topic,
+# paper type and counts go last, in the user message. The API only caches a
+# prefix above the model's minimum length (1024 tokens for Sonnet), so subjects
+# with short guidelines may still be billed uncached.
+
+GenerationPrompt = namedtuple("GenerationPrompt", ["system", "user"])
+# Stands in for the topic inside the board guidelines, which the task names instead
+GUIDELINE_TOPIC_PLACEHOLDER = "the topic named in the task"
+
+QUESTION_SCHEMA_EXAMPLE = {
+    "test_info": {
+        "board": "CBSE", "grade": 10, "subject": "Science", "topic": "Light",
+        "paper_type": "Board Pattern Paper 1", "total_questions": 3,
+        "curriculum_standard": "CBSE Grade 10 Science"
+    },
+    "questions": [
+        {
+            "id": 1, "type": "mcq", "marks": 1,
+            "question": "Which mirror always forms a virtual, erect and diminished image?",
+            "options": {"A": "Concave mirror", "B": "Convex mirror", "C": "Plane mirror", "D": "None of these"},
+            "correct_answer": "B",
+            "explanation": "A convex mirror always forms a virtual, erect and diminished image."
+        },
+        {
+            "id": 2, "type": "short", "marks": 3,
+            "question": "State the laws of reflection of light.",
+            "sample_answer": "The angle of incidence equals the angle of reflection, and the incident ray, reflected ray and normal lie in the same plane."
+        },
+        {
+            "id": 3, "type": "long", "marks": 5,
+            "question": "Explain refraction of light through a glass slab with a labelled diagram description.",
+            "sample_answer": "A ray entering the slab bends towards the normal, travels through the glass and bends away from the normal on leaving, emerging parallel to the incident ray with a lateral shift."
+        }
+    ]
+}
+
+
+def _cached_block(text):
+    """System block ending a cacheable prefix"""
+    return {"type": "text", "text": text, "cache_control": {"type": "ephemeral"}}
+
+
+STATIC_INSTRUCTIONS = f"""You are an expert school examiner creating curriculum-aligned mock tests.
+
+Every MCQ needs options A-D, correct_answer and explanation. Every short and long question needs a sample_answer.
+Questions must match the board's examination standards and the grade's cognitive level.
+
+Return ONLY valid JSON in exactly this structure, with questions in order MCQ, short, long:
+{json.dumps(QUESTION_SCHEMA_EXAMPLE, indent=2)}"""
+
+
+def build_subject_context(board, grade, subject):
+    """Board guidelines and curriculum topics, identical for every topic of a subject"""
+    from src.components.mock_test_creator import get_board_specific_guidelines
+
+    curriculum_topics = get_curriculum_topics(board, grade, subject)
+    return f"""You are an expert {board} examiner creating a mock test for Grade {grade} {subject}.
+
+BOARD GUIDELINES:
+{get_board_specific_guidelines(board, grade, subject, GUIDELINE_TOPIC_PLACEHOLDER)}
+
+CURRICULUM TOPICS FOR {board} GRADE {grade} {subject.upper()}:
+{', '.join(curriculum_topics[:40]) if curriculum_topics else 'Use the official syllabus'}"""
+
+
+def build_generation_prompt(board, grade, subject, topic, paper_type, mcq_count=None, short_count=None, long_count=None):
+    """Prompt asking Claude for a curriculum-aligned test as JSON, as a GenerationPrompt
+
+    The system blocks are a cacheable prefix: instructions and schema shared by
+    every request, then the board/grade/subject context. Only the user message
+    varies per request. Counts default to the resolved paper format; pass them
+    explicitly to request one section of a larger paper.
+    """
+    paper_format = resolve_paper_format(paper_type)
+    mcq_count = paper_format.mcq_count if mcq_count is None else mcq_count
+    short_count = paper_format.short_count if short_count is None else short_count
+    long_count = paper_format.long_count if long_count is None else long_count
+
+    user = f"""TASK:
+Topic: {topic}
+All questions must be specifically about "{topic}" as taught in {board} Grade {grade} {subject}.
+Paper type: {paper_type}
+Generate exactly {mcq_count} MCQ questions, {short_count} short answer questions and {long_count} long answer questions.
+MCQs carry {paper_format.mcq_marks_each} mark(s), short answers {paper_format.short_marks_each} marks, long answers {paper_format.long_marks_each} marks."""
+    return GenerationPrompt(
+        system=[_cached_block(STATIC_INSTRUCTIONS), _cached_block(build_subject_context(board, grade, subject))],
+        user=user
+    )
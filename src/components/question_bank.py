@@ -0,0 +1,191 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+
+from src.components.curriculum_store import normalise_grade
+from src.components.generation_cache import CACHE_DIR
+from src.components.paper_assembler import assemble_paper
+from src.components.paper_formats import resolve_paper_format
+from src.components.topic_index import get_topic_index
+
+# ========================================
+# LOCAL QUESTION BANK
+# ========================================
+# Every generated question is kept in SQLite, indexed by board, grade, subject,
+# curriculum topic, type and marks. A new paper for a combination the bank
+# already covers is assembled locally by the paper assembler, and only the
+# shortfall is requested from Claude. Least-used questions are fetched first so
+# repeat papers vary.
+
+QUESTION_BANK_PATH = os.path.join(CACHE_DIR, "question_bank.sqlite3")
+# Suggestion score above which a user's topic is filed under the curriculum topic it matches
+BANK_TOPIC_MATCH_SCORE = 0.75
+# Candidates fetched per wanted question, giving the assembler room to hit the marks total
+BANK_POOL_FACTOR = int(os.getenv("QUESTION_BANK_POOL_FACTOR", "4"))
+QUESTION_TYPES = ("mcq", "short", "long")
+DEFAULT_MARKS = {"mcq": 1, "short": 3, "long": 5}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS questions (
+    id INTEGER PRIMARY KEY,
+    text_key TEXT NOT NULL UNIQUE,
+    board TEXT NOT NULL,
+    grade TEXT NOT NULL,
+    subject TEXT NOT NULL,
+    topic TEXT NOT NULL,
+    type TEXT NOT NULL,
+    marks REAL NOT NULL,
+    payload TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    use_count INTEGER NOT NULL DEFAULT 0,
+    last_used REAL
+);
+CREATE INDEX IF NOT EXISTS questions_lookup ON questions (board, grade, subject, topic, type, marks);
+"""
+
+
+def _normalise(value):
+    return re.sub(r'\s+', ' ', str(value)).strip().casefold()
+
+
+def normalise_question_type(question_type):
+    """Map "short_answer" / "Long" / ... onto mcq, short or long"""
+    question_type = _normalise(question_type).replace("_answer", "").replace(" answer", "")
+    return question_type if question_type in QUESTION_TYPES else "mcq"
+
+
+def curriculum_topic_key(board, grade, subject, topic):
+    """Bank key for a topic: the curriculum topic it clearly names, else the topic as typed"""
+    try:
+        suggestions = get_topic_index(board, grade, subject).suggest(topic, k=1)
+    except Exception:
+        suggestions = []
+    if suggestions and suggestions[0][1] >= BANK_TOPIC_MATCH_SCORE:
+        return _normalise(suggestions[0][0])
+    return _normalise(topic)
+
+
+def _question_marks(question, question_type):
+    try:
+        return float(question.get('marks'))
+    except (TypeError, ValueError):
+        return float(DEFAULT_MARKS[question_type])
+
+
+class QuestionBank:
+    """SQLite store of generated questions with indexed retrieval"""
+
+    def __init__(self, path=QUESTION_BANK_PATH):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def add_questions(self, board, grade, subject, topic, questions):
+        """Store questions for a request; returns how many were new to the bank"""
+        key = (_normalise(board), normalise_grade(grade), _normalise(subject), curriculum_topic_key(board, grade, subject, topic))
+        rows = []
+        now = time.time()
+        for question in questions:
+            text = _normalise(question.get('question', ''))
+            if not text:
+                continue
+            question_type = normalise_question_type(question.get('type', 'mcq'))
+            stored = {name: value for name, value in question.items() if name not in ('id', 'bank_id')}
+            text_key = hashlib.sha256("\x1f".join(key[:3] + (text,)).encode("utf-8")).hexdigest()
+            rows.append((
+                text_key, *key, question_type, _question_marks(question, question_type),
+                json.dumps(stored, ensure_ascii=False, separators=(",", ":")), now
+            ))
+        with self._connect() as conn:
+            before = conn.total_changes
+            conn.executemany(
+                "INSERT OR IGNORE INTO questions (text_key, board, grade, subject, topic, type, marks, payload, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                rows
+            )
+            return conn.total_changes - before
+
+    def add_test(self, test_data):
+        """Store every question of a generated test under its test_info"""
+        test_info = test_data.get('test_info', {})
+        return self.add_questions(
+            test_info.get('board', ''), test_info.get('grade', ''), test_info.get('subject', ''),
+            test_info.get('topic', ''), test_data.get('questions', [])
+        )
+
+    def fetch(self, board, grade, subject, topic, question_type, limit, marks=None, exclude_ids=()):
+        """Up to limit questions of one type, closest marks first, least used first"""
+        if limit <= 0:
+            return []
+        key = (_normalise(board), normalise_grade(grade), _normalise(subject), curriculum_topic_key(board, grade, subject, topic))
+        exclude_ids = list(exclude_ids)
+        query = (
+            "SELECT id, payload FROM questions WHERE board = ? AND grade = ? AND subject = ? AND topic = ? AND type = ?"
+            + (f" AND id NOT IN ({','.join('?' * len(exclude_ids))})" if exclude_ids else "")
+            + " ORDER BY ABS(marks - ?), use_count, RANDOM() LIMIT ?"
+        )
+        params = (*key, question_type, *exclude_ids, marks if marks is not None else DEFAULT_MARKS[question_type], limit)
+        with self._connect() as conn:
+            rows = conn.execute(query, params).fetchall()
+        return [dict(json.loads(payload), bank_id=bank_id) for bank_id, payload in rows]
+
+    def mark_used(self, bank_ids):
+        """Record that questions went into a paper so the next one prefers others"""
+        if not bank_ids:
+            return
+        with self._connect() as conn:
+            conn.executemany(
+                "UPDATE questions SET use_count = use_count + 1, last_used = ? WHERE id = ?",
+                [(time.time(), bank_id) for bank_id in bank_ids]
+            )
+
+    def assemble(self, board, grade, subject, topic, paper_type):
+        """Pick a paper's questions from the bank; returns (questions, {type: shortfall})
+
+        A pool several times the paper's size is fetched and handed to the
+        paper assembler, which fixes the per-type counts and gets the marks
+        total as close to the format's total_marks as the pool allows.
+        """
+        paper_format = resolve_paper_format(paper_type)
+        wanted = {"mcq": paper_format.mcq_count, "short": paper_format.short_count, "long": paper_format.long_count}
+        marks = {"mcq": paper_format.mcq_marks_each, "short": paper_format.short_marks_each, "long": paper_format.long_marks_each}
+
+        pool = []
+        for question_type in QUESTION_TYPES:
+            pool.extend(self.fetch(board, grade, subject, topic, question_type,
+                                   wanted[question_type] * BANK_POOL_FACTOR, marks[question_type]))
+        result = assemble_paper(paper_format, pool)
+        self.mark_used([question['bank_id'] for question in result.questions])
+        return result.questions, result.shortfall
+
+    def stats(self):
+        """Question counts by type"""
+        with self._connect() as conn:
+            counts = dict(conn.execute("SELECT type, COUNT(*) FROM questions GROUP BY type").fetchall())
+        return {"total": sum(counts.values()), **{question_type: counts.get(question_type, 0) for question_type in QUESTION_TYPES}}
+
+
+_bank = None
+_bank_lock = threading.Lock()
+
+
+def get_question_bank():
+    """Return the process-wide question bank"""
+    global _bank
+    if _bank is None:
+        with _bank_lock:
+            if _bank is None:
+                _bank = QuestionBank()
+    return _bank
@@ -0,0 +1,213 @@
+import os
+import threading
+import time
+from collections import Counter
+
+# ========================================
+# RATE LIMITING AND CIRCUIT BREAKING
+# ========================================
+# One token-bucket limiter per process, sized to the account's requests and
+# tokens per minute, paces every Claude call from every session and worker. A
+# 429 drains it for the retry-after period so all callers back off together.
+# The circuit breaker opens after consecutive upstream failures and fails calls
+# fast until a single probe call succeeds again.
+
+CLAUDE_REQUESTS_PER_MINUTE = float(os.getenv("CLAUDE_REQUESTS_PER_MINUTE", "50"))
+# Estimated input plus max_tokens output; 0 disables either limit
+CLAUDE_TOKENS_PER_MINUTE = float(os.getenv("CLAUDE_TOKENS_PER_MINUTE", "100000"))
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("CLAUDE_BREAKER_FAILURES", "5"))
+BREAKER_RESET_SECONDS = float(os.getenv("CLAUDE_BREAKER_RESET_SECONDS", "30"))
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling Claude while the circuit breaker is open"""
+
+
+class TokenBucket:
+    """Continuously refilling bucket; reserve() may go negative so waiters queue in order"""
+
+    def __init__(self, per_minute):
+        self.capacity = per_minute
+        self.rate = per_minute / 60.0
+        self.tokens = per_minute
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, amount, now):
+        """Take amount and return how long to wait before it is covered"""
+        self._refill(now)
+        self.tokens -= min(amount, self.capacity)
+        return -self.tokens / self.rate if self.tokens < 0 else 0.0
+
+    def refund(self, amount, now):
+        self._refill(now)
+        self.tokens = min(self.capacity, self.tokens + amount)
+
+    def drain(self, seconds, now):
+        """Empty the bucket so it only covers new calls after seconds"""
+        self._refill(now)
+        self.tokens = min(self.tokens, -seconds * self.rate)
+
+
+class RateLimiter:
+    """Requests-per-minute and tokens-per-minute buckets shared by every caller"""
+
+    def __init__(self, requests_per_minute=CLAUDE_REQUESTS_PER_MINUTE, tokens_per_minute=CLAUDE_TOKENS_PER_MINUTE):
+        self._requests = TokenBucket(requests_per_minute) if requests_per_minute > 0 else None
+        self._tokens = TokenBucket(tokens_per_minute) if tokens_per_minute > 0 else None
+        self._lock = threading.Lock()
+        self.waits = 0
+        self.waited_seconds = 0.0
+
+    def acquire(self, tokens):
+        """Block until one request of about tokens tokens fits both limits"""
+        with self._lock:
+            now = time.monotonic()
+            wait = max(
+                self._requests.reserve(1, now) if self._requests else 0.0,
+                self._tokens.reserve(tokens, now) if self._tokens else 0.0
+            )
+            if wait > 0:
+                self.waits += 1
+                self.waited_seconds += wait
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def refund(self, tokens):
+        """Return tokens reserved for a call that used fewer than estimated"""
+        if self._tokens and tokens > 0:
+            with self._lock:
+                self._tokens.refund(tokens, time.monotonic())
+
+    def penalise(self, seconds):
+        """After a 429, hold every caller back for the retry-after period"""
+        if self._requests:
+            with self._lock:
+                self._requests.drain(seconds, time.monotonic())
+
+    def stats(self):
+        return {"waits": self.waits, "waited_seconds": round(self.waited_seconds, 2)}
+
+
+class CircuitBreaker:
+    """Closed -> open after consecutive failures -> half-open probe after a cool-down"""
+
+    def __init__(self, failure_threshold=BREAKER_FAILURE_THRESHOLD, reset_seconds=BREAKER_RESET_SECONDS):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.opens = 0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """True when a call may go upstream; in half-open state only one probe is let through"""
+        with self._lock:
+            if self.state == OPEN and time.monotonic() - self.opened_at >= self.reset_seconds:
+                self.state = HALF_OPEN
+                self._probe_in_flight = False
+            if self.state == CLOSED:
+                return True
+            if self.state == HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = CLOSED
+            self.failures = 0
+            self._probe_in_flight = False
+
+    def release_probe(self):
+        """End a half-open probe that gave no verdict (a 4xx, or a 429 about to be retried)
+
+        The breaker stays half-open and the next call becomes the probe.
+        """
+        with self._lock:
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != OPEN:
+                    self.opens += 1
+                self.state = OPEN
+                self.opened_at = time.monotonic()
+                self._probe_in_flight = False
+
+    def retry_in(self):
+        """Seconds until an open breaker lets a probe through"""
+        with self._lock:
+            if self.state != OPEN:
+                return 0.0
+            return max(0.0, self.reset_seconds - (time.monotonic() - self.opened_at))
+
+    def stats(self):
+        return {"state": self.state, "consecutive_failures": self.failures, "opens": self.opens}
+
+
+class ResilienceCounters:
+    """Thread-safe named counters for retries, rate limits, short-circuits and fallbacks"""
+
+    def __init__(self):
+        self._counts = Counter()
+        self._lock = threading.Lock()
+
+    def bump(self, name, amount=1):
+        with self._lock:
+            self._counts[name] += amount
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self._counts)
+
+
+_limiter = None
+_breaker = None
+_counters = ResilienceCounters()
+_singleton_lock = threading.Lock()
+
+
+def get_rate_limiter():
+    """Return the process-wide Claude rate limiter"""
+    global _limiter
+    if _limiter is None:
+        with _singleton_lock:
+            if _limiter is None:
+                _limiter = RateLimiter()
+    return _limiter
+
+
+def get_circuit_breaker():
+    """Return the process-wide Claude circuit breaker"""
+    global _breaker
+    if _breaker is None:
+        with _singleton_lock:
+            if _breaker is None:
+                _breaker = CircuitBreaker()
+    return _breaker
+
+
+def get_resilience_counters():
+    return _counters
+
+
+def get_resilience_stats():
+    """Counters plus limiter and breaker state for the statistics panel"""
+    return {
+        "counters": _counters.snapshot(),
+        "rate_limiter": get_rate_limiter().stats(),
+        "circuit_breaker": get_circuit_breaker().stats()
+    }
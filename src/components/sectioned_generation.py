@@ -0,0 +1,147 @@
+import logging
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import requests
+
+from src.components.claude_client import build_prompt_payload, post_message, response_text
+from src.components.incremental_json import IncrementalQuestionParser, log_lost_questions
+from src.components.paper_formats import resolve_paper_format
+from src.components.prompt_builder import build_generation_prompt
+from src.components.resilience import CircuitOpenError
+from src.components.token_budget import get_token_budget
+
+# ========================================
+# PARALLEL SECTIONED GENERATION
+# ========================================
+# Large papers are split into single-type sections of at most
+# SECTION_MAX_QUESTIONS questions, and fewer when the token budget says a
+# section of that type would not fit one call. Sections are generated
+# concurrently, each with max_tokens sized to its counts, and merged back into
+# the usual test_info / questions schema.
+
+SECTION_MAX_QUESTIONS = int(os.getenv("SECTION_MAX_QUESTIONS", "10"))
+SECTION_CONCURRENCY = int(os.getenv("SECTION_CONCURRENCY", "4"))
+QUESTION_TYPES = ("mcq", "short", "long")
+
+logger = logging.getLogger(__name__)
+
+
+def build_test_info(board, grade, subject, topic, paper_type, include_answers, questions):
+    """test_info block for a test assembled outside generate_questions"""
+    paper_format = resolve_paper_format(paper_type)
+    return {
+        'board': board,
+        'grade': grade,
+        'subject': subject,
+        'topic': topic,
+        'paper_type': paper_type,
+        'total_questions': len(questions),
+        'mcq_count': sum(1 for q in questions if q.get('type') == 'mcq'),
+        'short_count': sum(1 for q in questions if q.get('type') in ('short', 'short_answer')),
+        'long_count': sum(1 for q in questions if q.get('type') in ('long', 'long_answer')),
+        'total_marks': paper_format.total_marks,
+        'paper_duration': paper_format.paper_duration,
+        'curriculum_standard': f"{board} Grade {grade} {subject}",
+        'show_answers_on_screen': include_answers
+    }
+
+
+def section_limits(max_questions=SECTION_MAX_QUESTIONS):
+    """Per-type section size: max_questions, capped by what fits the token budget of one call"""
+    fits = get_token_budget().section_max_questions()
+    return {question_type: min(max_questions, fits[question_type]) for question_type in QUESTION_TYPES}
+
+
+def plan_sections(counts, max_questions=SECTION_MAX_QUESTIONS):
+    """Split {type: count} into balanced single-type sections, each a {type: count} dict
+
+    max_questions is a number or a {type: number} dict.
+    """
+    sections = []
+    for question_type in QUESTION_TYPES:
+        count = counts.get(question_type, 0)
+        if count <= 0:
+            continue
+        limit = max_questions[question_type] if isinstance(max_questions, dict) else max_questions
+        chunks = -(-count // limit)
+        base, extra = divmod(count, chunks)
+        sections.extend({question_type: base + (1 if i < extra else 0)} for i in range(chunks))
+    return sections
+
+
+def _normalise_question_text(question):
+    """Key used to drop duplicate questions across sections"""
+    return re.sub(r'[^a-z0-9]+', ' ', str(question.get('question', '')).lower()).strip()
+
+
+def merge_sections(section_results):
+    """Merge per-section question lists in paper order, de-duplicate and renumber"""
+    seen = set()
+    merged = []
+    for questions in section_results:
+        for question in questions:
+            key = _normalise_question_text(question)
+            if not key or key in seen:
+                continue
+            seen.add(key)
+            merged.append(dict(question))
+
+    order = {question_type: rank for rank, question_type in enumerate(QUESTION_TYPES)}
+    merged.sort(key=lambda q: order.get(str(q.get('type', '')).replace('_answer', ''), len(order)))
+    for number, question in enumerate(merged, 1):
+        question['id'] = number
+    return merged
+
+
+def generate_section(board, grade, subject, topic, paper_type, counts):
+    """Generate one section ({type: count}) and return its questions"""
+    prompt = build_generation_prompt(
+        board, grade, subject, topic, paper_type,
+        mcq_count=counts.get("mcq", 0), short_count=counts.get("short", 0), long_count=counts.get("long", 0)
+    )
+    budget = get_token_budget()
+    predicted = budget.predict(counts)
+    body = post_message(build_prompt_payload(prompt, max_tokens=budget.max_tokens(counts)))
+    budget.record(counts, predicted, body.get("usage", {}).get("output_tokens"), body.get("stop_reason"))
+    parser = IncrementalQuestionParser()
+    parser.feed(response_text(body))
+    log_lost_questions(parser, counts)
+    return parser.questions
+
+
+def iter_sections(board, grade, subject, topic, paper_type, max_questions=None,
+                  concurrency=SECTION_CONCURRENCY, counts=None):
+    """Generate a paper's sections concurrently, yielding (index, questions) as each finishes
+
+    counts ({type: count}) defaults to the whole paper format, and max_questions
+    to section_limits().
+    """
+    if counts is None:
+        paper_format = resolve_paper_format(paper_type)
+        counts = {"mcq": paper_format.mcq_count, "short": paper_format.short_count, "long": paper_format.long_count}
+    sections = plan_sections(counts, section_limits() if max_questions is None else max_questions)
+    if not sections:
+        return
+
+    def run(section):
+        try:
+            return generate_section(board, grade, subject, topic, paper_type, section)
+        except (CircuitOpenError, requests.RequestException):
+            # Claude is failing: the caller serves the last good paper rather than a short one
+            raise
+        except Exception:
+            logger.exception("section %s failed", section)
+            return []
+
+    with ThreadPoolExecutor(max_workers=max(1, min(concurrency, len(sections)))) as executor:
+        futures = {executor.submit(run, section): index for index, section in enumerate(sections)}
+        try:
+            for future in as_completed(futures):
+                yield futures[future], future.result()
+        finally:
+            # Sections not started yet are not sent once one has failed or the caller stopped reading
+            for future in futures:
+                future.cancel()
+
@@ -0,0 +1,118 @@
+import threading
+
+# ========================================
+# SINGLE-FLIGHT REQUEST COALESCING
+# ========================================
+# Concurrent identical generation requests share one upstream call. The first
+# caller for a key becomes the leader and does the work; callers arriving while
+# it is in flight follow it, receiving each question it publishes and then its
+# final result (or its exception).
+
+
+class Flight:
+    """One in-flight call that any number of followers can wait on"""
+
+    def __init__(self):
+        self.items = []
+        self.done = False
+        self.result = None
+        self.error = None
+        self.followers = 0
+        self._condition = threading.Condition()
+
+    def publish(self, item):
+        """Leader: hand a partial result (one question) to every follower"""
+        with self._condition:
+            self.items.append(item)
+            self._condition.notify_all()
+
+    def finish(self, result):
+        with self._condition:
+            self.result = result
+            self.done = True
+            self._condition.notify_all()
+
+    def fail(self, error):
+        with self._condition:
+            self.error = error
+            self.done = True
+            self._condition.notify_all()
+
+    def follow(self):
+        """Follower: yield published items as they arrive until the leader finishes"""
+        index = 0
+        while True:
+            with self._condition:
+                while index >= len(self.items) and not self.done:
+                    self._condition.wait()
+                items = self.items[index:]
+                done = self.done
+            for item in items:
+                yield item
+            index += len(items)
+            if done and index >= len(self.items):
+                return
+
+    def wait(self):
+        """Follower: block until the leader finishes, returning its result or raising its error"""
+        with self._condition:
+            while not self.done:
+                self._condition.wait()
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+class SingleFlight:
+    """Registry of in-flight calls keyed by request fingerprint"""
+
+    def __init__(self):
+        self._flights = {}
+        self._lock = threading.Lock()
+        self._leaders = 0
+        self._coalesced = 0
+        self._max_followers = 0
+
+    def begin(self, key):
+        """Return (flight, is_leader); the leader must call end() when it is done"""
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is not None:
+                flight.followers += 1
+                self._coalesced += 1
+                self._max_followers = max(self._max_followers, flight.followers)
+                return flight, False
+            flight = Flight()
+            self._flights[key] = flight
+            self._leaders += 1
+            return flight, True
+
+    def end(self, key, flight):
+        """Leader: stop accepting followers for this key"""
+        with self._lock:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+
+    def stats(self):
+        """Requests that led a flight vs. requests that joined one already in flight"""
+        with self._lock:
+            return {
+                "leaders": self._leaders,
+                "coalesced_calls": self._coalesced,
+                "in_flight": len(self._flights),
+                "max_followers": self._max_followers
+            }
+
+
+_single_flight = None
+_single_flight_lock = threading.Lock()
+
+
+def get_single_flight():
+    """Process-wide single-flight registry for generation requests"""
+    global _single_flight
+    if _single_flight is None:
+        with _single_flight_lock:
+            if _single_flight is None:
+                _single_flight = SingleFlight()
+    return _single_flight
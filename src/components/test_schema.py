@@ -0,0 +1,166 @@
+import logging
+import re
+from collections import namedtuple
+from enum import Enum
+
+# ========================================
+# GENERATED TEST SCHEMA
+# ========================================
+# Parsed responses are validated and normalised here once, into compact
+# records: a QuestionType enum instead of "short" / "short_answer" / "Short",
+# options as ordered (key, text) pairs whatever shape the model used, marks as
+# numbers and every text field as a string. Renderers read the records without
+# .get() chains or type aliasing, and malformed questions are rejected before
+# they reach the bank, the cache or the screen.
+
+
+class QuestionType(str, Enum):
+    MCQ = "mcq"
+    SHORT = "short"
+    LONG = "long"
+
+
+# Every spelling of a type seen in responses, lower-cased
+_TYPE_ALIASES = {
+    "mcq": QuestionType.MCQ, "mcqs": QuestionType.MCQ, "multiple_choice": QuestionType.MCQ,
+    "multiple choice": QuestionType.MCQ, "objective": QuestionType.MCQ,
+    "short": QuestionType.SHORT, "short_answer": QuestionType.SHORT, "short answer": QuestionType.SHORT,
+    "long": QuestionType.LONG, "long_answer": QuestionType.LONG, "long answer": QuestionType.LONG,
+    "descriptive": QuestionType.LONG
+}
+DEFAULT_MARKS = {QuestionType.MCQ: 1, QuestionType.SHORT: 3, QuestionType.LONG: 5}
+OPTION_KEYS = "ABCDEFGH"
+MIN_MCQ_OPTIONS = 2
+# "A) text", "(b) text", "C. text" in list-shaped options
+_OPTION_PREFIX = re.compile(r'^\(?([A-Ha-h])[).:]\s*')
+
+Question = namedtuple("Question", [
+    "type", "text", "options", "correct_answer", "sample_answer", "explanation", "marks"
+])
+TestInfo = namedtuple("TestInfo", [
+    "board", "grade", "subject", "topic", "paper_type", "curriculum_standard",
+    "total_questions", "show_answers_on_screen", "served_from_fallback", "repeated_questions"
+])
+# rejected holds (position, reason) for questions left out of questions
+NormalizedTest = namedtuple("NormalizedTest", ["info", "questions", "rejected"])
+
+logger = logging.getLogger(__name__)
+
+
+class QuestionSchemaError(ValueError):
+    """A generated question that cannot be rendered"""
+
+
+def _text(value):
+    return "" if value is None else str(value).strip()
+
+
+def question_type(raw_type, has_options=False):
+    """QuestionType for a type as written; untyped questions with options are MCQs"""
+    found = _TYPE_ALIASES.get(_text(raw_type).lower())
+    if found is not None:
+        return found
+    if has_options:
+        return QuestionType.MCQ
+    if raw_type is None:
+        return QuestionType.SHORT
+    raise QuestionSchemaError(f"unknown question type {raw_type!r}")
+
+
+def _options(raw_options):
+    """Options as ((key, text), ...), from a {key: text} dict or a list of strings"""
+    if isinstance(raw_options, dict):
+        return tuple((_text(key), _text(text)) for key, text in raw_options.items() if _text(text))
+    if isinstance(raw_options, (list, tuple)):
+        options = []
+        for key, text in zip(OPTION_KEYS, raw_options):
+            text = _text(text)
+            match = _OPTION_PREFIX.match(text)
+            if match:
+                key, text = match.group(1).upper(), text[match.end():]
+            if text:
+                options.append((key, text))
+        return tuple(options)
+    return ()
+
+
+def _marks(raw_marks, question_type):
+    try:
+        marks = float(raw_marks)
+    except (TypeError, ValueError):
+        return DEFAULT_MARKS[question_type]
+    if marks <= 0:
+        return DEFAULT_MARKS[question_type]
+    return int(marks) if marks.is_integer() else marks
+
+
+def to_question(raw):
+    """Validate one parsed question and return its Question record"""
+    if not isinstance(raw, dict):
+        raise QuestionSchemaError("question is not an object")
+    text = _text(raw.get('question'))
+    if not text:
+        raise QuestionSchemaError("no question text")
+    options = _options(raw.get('options'))
+    kind = question_type(raw.get('type'), has_options=bool(options))
+    if kind is QuestionType.MCQ and len(options) < MIN_MCQ_OPTIONS:
+        raise QuestionSchemaError(f"multiple choice question with {len(options)} options")
+    return Question(
+        kind, text, options if kind is QuestionType.MCQ else (),
+        _text(raw.get('correct_answer')), _text(raw.get('sample_answer')), _text(raw.get('explanation')),
+        _marks(raw.get('marks'), kind)
+    )
+
+
+def question_dict(question, raw=None):
+    """JSON form of a record for the cache and bank; keys of raw the schema does not cover are kept"""
+    data = dict(raw) if raw else {}
+    data.update({
+        'type': question.type.value,
+        'question': question.text,
+        'marks': question.marks
+    })
+    if question.options:
+        data['options'] = dict(question.options)
+    for field in ('correct_answer', 'sample_answer', 'explanation'):
+        value = getattr(question, field)
+        if value:
+            data[field] = value
+        else:
+            data.pop(field, None)
+    return data
+
+
+def normalise_question(raw):
+    """Canonical dict for a parsed question, or None (logged) when it is malformed"""
+    try:
+        return question_dict(to_question(raw), raw)
+    except QuestionSchemaError as e:
+        logger.warning("rejected generated question: %s", e)
+        return None
+
+
+def normalise_test(test_data):
+    """NormalizedTest for a test dict; malformed questions are left out and listed in rejected"""
+    test_data = test_data or {}
+    raw_info = test_data.get('test_info') or {}
+    questions = []
+    rejected = []
+    for position, raw in enumerate(test_data.get('questions') or [], 1):
+        try:
+            questions.append(to_question(raw))
+        except QuestionSchemaError as e:
+            rejected.append((position, str(e)))
+    info = TestInfo(
+        _text(raw_info.get('board')) or "N/A",
+        _text(raw_info.get('grade')) or "N/A",
+        _text(raw_info.get('subject')) or "Subject",
+        _text(raw_info.get('topic')) or "N/A",
+        _text(raw_info.get('paper_type')) or "N/A",
+        _text(raw_info.get('curriculum_standard')) or "N/A",
+        len(questions),
+        bool(raw_info.get('show_answers_on_screen')),
+        bool(raw_info.get('served_from_fallback')),
+        int(raw_info.get('repeated_questions') or 0)
+    )
+    return NormalizedTest(info, tuple(questions), tuple(rejected))
@@ -0,0 +1,197 @@
+import math
+import os
+import sqlite3
+import threading
+import time
+
+from src.components.generation_cache import CACHE_DIR
+
+# ========================================
+# OUTPUT TOKEN BUDGET
+# ========================================
+# Predicts a call's output tokens from its mcq/short/long counts with a linear
+# model (fixed JSON overhead plus tokens per question of each type). The model
+# starts from measured defaults and is recalibrated from the output_tokens
+# logged for every call, by least squares pulled towards the defaults so a
+# handful of observations cannot swing it. max_tokens is the prediction plus a
+# safety margin; papers whose budget exceeds one call are generated as sections.
+
+TOKEN_BUDGET_DB_PATH = os.path.join(CACHE_DIR, "token_budget.sqlite3")
+QUESTION_TYPES = ("mcq", "short", "long")
+# Starting model: JSON framing and test_info, then tokens per question of each type
+DEFAULT_OVERHEAD_TOKENS = 150
+DEFAULT_TOKENS_PER_QUESTION = {"mcq": 130, "short": 110, "long": 260}
+TOKEN_BUDGET_SAFETY_MARGIN = float(os.getenv("TOKEN_BUDGET_SAFETY_MARGIN", "1.25"))
+# Largest max_tokens requested from one call; bigger papers become parallel sections
+SINGLE_CALL_MAX_TOKENS = int(os.getenv("TOKEN_BUDGET_SINGLE_CALL_MAX", "4000"))
+MODEL_MAX_OUTPUT_TOKENS = int(os.getenv("CLAUDE_MAX_OUTPUT_TOKENS", "8192"))
+MIN_MAX_TOKENS = 256
+# Observations used for calibration, newest first
+CALIBRATION_WINDOW = 200
+# Weight of the defaults, in observations' worth
+CALIBRATION_PRIOR_WEIGHT = 5.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS observations (
+    id INTEGER PRIMARY KEY,
+    mcq INTEGER NOT NULL,
+    short INTEGER NOT NULL,
+    long INTEGER NOT NULL,
+    predicted INTEGER NOT NULL,
+    actual INTEGER NOT NULL,
+    truncated INTEGER NOT NULL,
+    created_at REAL NOT NULL
+);
+"""
+
+
+def _features(counts):
+    return [1.0] + [float(counts.get(question_type, 0)) for question_type in QUESTION_TYPES]
+
+
+def _solve(matrix, vector):
+    """Solve a small dense linear system by Gaussian elimination with partial pivoting"""
+    size = len(vector)
+    rows = [list(matrix[i]) + [vector[i]] for i in range(size)]
+    for col in range(size):
+        pivot = max(range(col, size), key=lambda r: abs(rows[r][col]))
+        if abs(rows[pivot][col]) < 1e-12:
+            return None
+        rows[col], rows[pivot] = rows[pivot], rows[col]
+        for r in range(col + 1, size):
+            factor = rows[r][col] / rows[col][col]
+            for c in range(col, size + 1):
+                rows[r][c] -= factor * rows[col][c]
+    solution = [0.0] * size
+    for r in range(size - 1, -1, -1):
+        solution[r] = (rows[r][size] - sum(rows[r][c] * solution[c] for c in range(r + 1, size))) / rows[r][r]
+    return solution
+
+
+def calibrate(observations, prior=None, prior_weight=CALIBRATION_PRIOR_WEIGHT):
+    """Fit [overhead, mcq, short, long] to (counts, actual) pairs, shrunk towards prior
+
+    Ridge regression around the prior, scaled per feature, so types that rarely
+    appear keep their default cost.
+    """
+    prior = prior or [DEFAULT_OVERHEAD_TOKENS] + [DEFAULT_TOKENS_PER_QUESTION[t] for t in QUESTION_TYPES]
+    if not observations:
+        return list(prior)
+    size = len(prior)
+    xtx = [[0.0] * size for _ in range(size)]
+    xty = [0.0] * size
+    for counts, actual in observations:
+        x = _features(counts)
+        for i in range(size):
+            xty[i] += x[i] * actual
+            for j in range(size):
+                xtx[i][j] += x[i] * x[j]
+    for i in range(size):
+        penalty = prior_weight * max(xtx[i][i] / len(observations), 1.0)
+        xtx[i][i] += penalty
+        xty[i] += penalty * prior[i]
+    solution = _solve(xtx, xty)
+    if solution is None:
+        return list(prior)
+    # A coefficient driven below a tenth of its default is noise, not a cheaper question type
+    return [max(value, 0.1 * default) for value, default in zip(solution, prior)]
+
+
+class TokenBudgetModel:
+    """Calibrated output-token predictor backed by a SQLite log of observed calls"""
+
+    def __init__(self, path=TOKEN_BUDGET_DB_PATH):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+        self._coefficients = None
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def coefficients(self):
+        """[overhead, mcq, short, long] tokens, recalibrated after new observations"""
+        with self._lock:
+            if self._coefficients is None:
+                with self._connect() as conn:
+                    rows = conn.execute(
+                        "SELECT mcq, short, long, actual FROM observations WHERE truncated = 0 ORDER BY id DESC LIMIT ?",
+                        (CALIBRATION_WINDOW,)
+                    ).fetchall()
+                self._coefficients = calibrate([({"mcq": m, "short": s, "long": l}, actual) for m, s, l, actual in rows])
+            return self._coefficients
+
+    def predict(self, counts):
+        """Expected output tokens for a call generating counts ({type: n})"""
+        return int(round(sum(c * x for c, x in zip(self.coefficients(), _features(counts)))))
+
+    def max_tokens(self, counts):
+        """max_tokens to request: prediction plus safety margin, within the model's output limit"""
+        budget = math.ceil(self.predict(counts) * TOKEN_BUDGET_SAFETY_MARGIN)
+        return max(MIN_MAX_TOKENS, min(MODEL_MAX_OUTPUT_TOKENS, budget))
+
+    def fits_single_call(self, counts):
+        return math.ceil(self.predict(counts) * TOKEN_BUDGET_SAFETY_MARGIN) <= SINGLE_CALL_MAX_TOKENS
+
+    def section_max_questions(self):
+        """Most questions of each type one section can hold within SINGLE_CALL_MAX_TOKENS"""
+        overhead, *per_question = self.coefficients()
+        room = SINGLE_CALL_MAX_TOKENS / TOKEN_BUDGET_SAFETY_MARGIN - overhead
+        return {question_type: max(1, int(room // cost)) for question_type, cost in zip(QUESTION_TYPES, per_question)}
+
+    def record(self, counts, predicted, actual, stop_reason=None):
+        """Log a finished call; truncated calls are reported but not calibrated on"""
+        if not actual:
+            return
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO observations (mcq, short, long, predicted, actual, truncated, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (*(int(counts.get(question_type, 0)) for question_type in QUESTION_TYPES), int(predicted), int(actual),
+                 int(stop_reason == "max_tokens"), time.time())
+            )
+        with self._lock:
+            self._coefficients = None
+
+    def report(self):
+        """Predicted vs. actual output tokens over the calibration window"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT predicted, actual, truncated FROM observations ORDER BY id DESC LIMIT ?", (CALIBRATION_WINDOW,)
+            ).fetchall()
+        overhead, *per_question = self.coefficients()
+        report = {
+            "observations": len(rows),
+            "truncated": sum(truncated for _, _, truncated in rows),
+            "coefficients": {"overhead": round(overhead), **{t: round(c) for t, c in zip(QUESTION_TYPES, per_question)}}
+        }
+        if rows:
+            report["mean_predicted"] = sum(predicted for predicted, _, _ in rows) / len(rows)
+            report["mean_actual"] = sum(actual for _, actual, _ in rows) / len(rows)
+            report["mean_abs_error_pct"] = 100 * sum(abs(predicted - actual) / actual for predicted, actual, _ in rows) / len(rows)
+        return report
+
+
+_model = None
+_model_lock = threading.Lock()
+
+
+def get_token_budget():
+    """Return the process-wide token budget model"""
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                _model = TokenBudgetModel()
+    return _model
+
+
+if __name__ == "__main__":
+    for name, value in get_token_budget().report().items():
+        print(f"{name}: {value}")
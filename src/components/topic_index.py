@@ -0,0 +1,207 @@
+import re
+import threading
+
+from src.components.curriculum_store import get_curriculum_store, normalise_grade
+
+# ========================================
+# INVERTED-INDEX TOPIC VALIDATOR
+# ========================================
+# One token + trigram inverted index per (board, subject, grade), built on first
+# use from the curriculum store. Validation and ranked suggestions only touch the
+# postings of the typed topic instead of rescanning every curriculum topic.
+
+STOP_WORDS = frozenset({
+    "a", "an", "and", "the", "of", "in", "on", "to", "for", "with", "by", "from",
+    "at", "as", "is", "are", "its", "their", "into", "chapter", "unit", "topic"
+})
+
+# Stop words of validate_topic_against_curriculum, whose acceptance rules validate() keeps
+LEGACY_STOP_WORDS = frozenset({"and", "or", "of", "in", "on", "the", "a", "an", "to", "for", "with"})
+# Words longer than this are accepted when they appear anywhere in a curriculum topic
+PARTIAL_WORD_MIN_LENGTH = 4
+# Share of the shorter word list two topics must have in common to match
+WORD_OVERLAP_VALID = 0.6
+# A typed topic whose trigram similarity reaches this is accepted even without a shared keyword
+FUZZY_VALID_SCORE = 0.6
+TOKEN_WEIGHT = 0.6
+TRIGRAM_WEIGHT = 0.4
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def _stem(token):
+    """Fold simple plurals so 'acid' matches 'Acids'"""
+    if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+        return token[:-1]
+    return token
+
+
+def tokenize(text):
+    """Lowercase, plural-folded word tokens without stop words"""
+    return [_stem(token) for token in re.findall(r'[a-z0-9]+', text.lower()) if token not in STOP_WORDS]
+
+
+def substring_trigrams(text):
+    """Every raw three-character slice of text, punctuation and spaces included"""
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def trigrams(text):
+    """Character trigrams of the normalised text, padded at word boundaries"""
+    padded = f"  {' '.join(re.findall(r'[a-z0-9]+', text.lower()))} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class TopicIndex:
+    """Token and trigram postings for one board/subject/grade topic list"""
+
+    def __init__(self, topics):
+        self.topics = topics
+        self._lowered = tuple(str(topic).lower().strip() for topic in topics)
+        # Raw trigram postings answer substring tests: a string of three or more characters
+        # only occurs in topics posted under every one of its trigrams, so its rarest trigram's
+        # posting holds every candidate. A topic inside a string has all of its trigrams there,
+        # so topics are also filed under their own rarest trigram alone.
+        self._substring_postings = {}
+        self._rarest_trigram_topics = {}
+        # Substring tests for shorter strings: every 1-2 character slice, and the topics that short
+        self._short_substrings = set()
+        self._short_topics = []
+        self._words = []
+        self._word_postings = {}
+        self._trigrams = []
+        self._token_postings = {}
+        self._trigram_postings = {}
+
+        for topic_id, topic in enumerate(topics):
+            topic_words = frozenset(self._lowered[topic_id].split()) - LEGACY_STOP_WORDS
+            self._words.append(topic_words)
+            lowered = self._lowered[topic_id]
+            for gram in substring_trigrams(lowered):
+                self._substring_postings.setdefault(gram, []).append(topic_id)
+            self._short_substrings.update(lowered[i:i + size] for size in (1, 2) for i in range(len(lowered) - size + 1))
+            if len(lowered) < 3:
+                self._short_topics.append(topic_id)
+            for word in topic_words:
+                self._word_postings.setdefault(word, []).append(topic_id)
+            topic_tokens = frozenset(tokenize(topic))
+            topic_trigrams = frozenset(trigrams(topic))
+            self._trigrams.append(topic_trigrams)
+            for token in topic_tokens:
+                self._token_postings.setdefault(token, []).append(topic_id)
+            for gram in topic_trigrams:
+                self._trigram_postings.setdefault(gram, []).append(topic_id)
+
+        for topic_id, lowered in enumerate(self._lowered):
+            topic_substrings = substring_trigrams(lowered)
+            if topic_substrings:
+                rarest = min(topic_substrings, key=lambda gram: (len(self._substring_postings[gram]), gram))
+                self._rarest_trigram_topics.setdefault(rarest, []).append(topic_id)
+
+    def _score_candidates(self, query):
+        """Score every topic sharing a token or trigram with the query"""
+        query_lower = query.lower().strip()
+        query_tokens = set(tokenize(query))
+        query_trigrams = trigrams(query)
+
+        token_hits = {}
+        for token in query_tokens:
+            for topic_id in self._token_postings.get(token, ()):
+                token_hits[topic_id] = token_hits.get(topic_id, 0) + 1
+
+        trigram_hits = {}
+        for gram in query_trigrams:
+            for topic_id in self._trigram_postings.get(gram, ()):
+                trigram_hits[topic_id] = trigram_hits.get(topic_id, 0) + 1
+
+        scores = {}
+        best_trigram_score = 0.0
+        for topic_id, common in trigram_hits.items():
+            trigram_score = 2 * common / (len(query_trigrams) + len(self._trigrams[topic_id]))
+            best_trigram_score = max(best_trigram_score, trigram_score)
+            lowered = self._lowered[topic_id]
+            if query_lower and (query_lower in lowered or lowered in query_lower):
+                scores[topic_id] = 1.0
+                continue
+            token_score = token_hits.get(topic_id, 0) / len(query_tokens) if query_tokens else 0.0
+            scores[topic_id] = TOKEN_WEIGHT * token_score + TRIGRAM_WEIGHT * trigram_score
+        return scores, bool(token_hits) or best_trigram_score >= FUZZY_VALID_SCORE
+
+    def _in_some_topic(self, text):
+        """True when text occurs inside a curriculum topic"""
+        if len(text) < 3:
+            return text in self._short_substrings
+        candidates = min((self._substring_postings.get(gram, ()) for gram in substring_trigrams(text)), key=len)
+        return any(text in self._lowered[topic_id] for topic_id in candidates)
+
+    def _contains_some_topic(self, text):
+        """True when a curriculum topic occurs inside text"""
+        if any(self._lowered[topic_id] in text for topic_id in self._short_topics):
+            return True
+        return any(self._lowered[topic_id] in text
+                   for gram in substring_trigrams(text)
+                   for topic_id in self._rarest_trigram_topics.get(gram, ()))
+
+    def _matches_legacy_rules(self, query_lower):
+        """validate_topic_against_curriculum's rules, answered from the postings"""
+        if self._in_some_topic(query_lower):
+            return True
+        query_words = set(query_lower.split()) - LEGACY_STOP_WORDS
+        if any(self._in_some_topic(word) for word in query_words if len(word) >= PARTIAL_WORD_MIN_LENGTH):
+            return True
+
+        overlaps = {}
+        for word in query_words:
+            for topic_id in self._word_postings.get(word, ()):
+                overlaps[topic_id] = overlaps.get(topic_id, 0) + 1
+        for topic_id, overlap in overlaps.items():
+            if overlap / min(len(query_words), len(self._words[topic_id])) >= WORD_OVERLAP_VALID:
+                return True
+        return self._contains_some_topic(query_lower)
+
+    def validate(self, query):
+        """Return True when the query names, shares a keyword with, or closely spells a curriculum topic
+
+        Everything validate_topic_against_curriculum accepted still passes,
+        including any topic for a combination without curriculum data;
+        plural-folded keywords and close misspellings are accepted on top.
+        """
+        query_lower = query.lower().strip()
+        if not query_lower:
+            return False
+        if not self.topics or self._matches_legacy_rules(query_lower):
+            return True
+        _, is_valid = self._score_candidates(query)
+        return is_valid
+
+    def suggest(self, query, k=5):
+        """Return the k closest curriculum topics as (topic, score) pairs"""
+        scores, _ = self._score_candidates(query)
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:k]
+        return [(self.topics[topic_id], round(score, 3)) for topic_id, score in ranked]
+
+
+def get_topic_index(board, grade, subject):
+    """Return the cached topic index for a board/grade/subject"""
+    key = (board, subject, normalise_grade(grade))
+    index = _indexes.get(key)
+    if index is None:
+        topics = get_curriculum_store().get_topics(board, grade, subject)
+        with _indexes_lock:
+            index = _indexes.get(key)
+            if index is None:
+                index = TopicIndex(topics)
+                _indexes[key] = index
+    return index
+
+
+def validate_topic(board, grade, subject, topic):
+    """Index-backed replacement for validate_topic_against_curriculum"""
+    index = get_topic_index(board, grade, subject)
+    return index.validate(topic), index.topics
+
+
+def suggest_topics(board, grade, subject, topic, k=5):
+    """Return the k closest curriculum topics with their match scores"""
+    return get_topic_index(board, grade, subject).suggest(topic, k)
@@ -0,0 +1,303 @@
+import cProfile
+import io
+import logging
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter, deque, namedtuple
+from contextlib import contextmanager
+from functools import wraps
+
+# ========================================
+# PER-RERUN TRACING AND PROFILING
+# ========================================
+# Every interaction reruns main.py from the top. A RerunTrace times the phases
+# of one run (page config, CSS, session init, the page body) and the spans
+# nested in them (selectors, curriculum lookups, PDF builds, statistics). The
+# trace lives on the script thread; spans opened on other threads, such as the
+# job-queue workers generating questions, only feed the per-name totals.
+# Finished traces are logged and kept per session for the debug panel, and a
+# single rerun can be run under cProfile or a stack sampler on request.
+
+# Reruns slower than this are logged at INFO, the rest at DEBUG
+TRACE_LOG_MS = float(os.getenv("TRACE_LOG_MS", "500"))
+# Finished traces kept per session for the debug panel
+TRACE_HISTORY = int(os.getenv("TRACE_HISTORY", "20"))
+# Show the rerun timings panel at the bottom of every page
+TRACE_PANEL = os.getenv("TRACE_PANEL", "0") == "1"
+PROFILE_SAMPLE_SECONDS = float(os.getenv("PROFILE_SAMPLE_SECONDS", "0.005"))
+PROFILE_TOP = 25
+
+CPROFILE = "cprofile"
+SAMPLE = "sample"
+PROFILERS = (CPROFILE, SAMPLE)
+
+Span = namedtuple("Span", ["name", "depth", "start_ms", "duration_ms"])
+
+logger = logging.getLogger(__name__)
+_local = threading.local()
+
+
+class CProfileRun:
+    """Deterministic profile of the thread that starts it"""
+
+    def __init__(self):
+        self._profile = cProfile.Profile()
+
+    def start(self):
+        self._profile.enable()
+
+    def stop(self):
+        """Stop and return the top functions by cumulative time as text"""
+        self._profile.disable()
+        out = io.StringIO()
+        pstats.Stats(self._profile, stream=out).sort_stats("cumulative").print_stats(PROFILE_TOP)
+        return out.getvalue()
+
+
+class StackSampler:
+    """Samples one thread's Python stack from a timer thread
+
+    Much cheaper than cProfile on deep call trees, at the cost of resolution:
+    functions are ranked by the share of samples they appear in (total) and
+    are executing in (own).
+    """
+
+    def __init__(self, thread_id=None, interval=PROFILE_SAMPLE_SECONDS):
+        self.thread_id = threading.get_ident() if thread_id is None else thread_id
+        self.interval = interval
+        self.samples = 0
+        self._own = Counter()
+        self._total = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                return
+            self.samples += 1
+            self._own[_frame_label(frame)] += 1
+            seen = set()
+            while frame is not None:
+                label = _frame_label(frame)
+                if label not in seen:
+                    seen.add(label)
+                    self._total[label] += 1
+                frame = frame.f_back
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        """Stop and return the most frequently sampled functions as text"""
+        self._stop.set()
+        self._thread.join()
+        if not self.samples:
+            return "no samples taken"
+        lines = [f"{self.samples} samples every {self.interval * 1000:.0f} ms", f"{'total':>7} {'own':>7}  function"]
+        for label, count in self._total.most_common(PROFILE_TOP):
+            lines.append(f"{count / self.samples:>7.1%} {self._own[label] / self.samples:>7.1%}  {label}")
+        return "\n".join(lines)
+
+
+def _frame_label(frame):
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+_PROFILER_CLASSES = {CPROFILE: CProfileRun, SAMPLE: StackSampler}
+
+
+class SpanTotals:
+    """Calls, total and slowest time per span name across every thread"""
+
+    def __init__(self):
+        self._totals = {}
+        self._lock = threading.Lock()
+
+    def record(self, name, duration_ms):
+        with self._lock:
+            totals = self._totals.get(name)
+            if totals is None:
+                self._totals[name] = [1, duration_ms, duration_ms]
+            else:
+                totals[0] += 1
+                totals[1] += duration_ms
+                totals[2] = max(totals[2], duration_ms)
+
+    def snapshot(self):
+        with self._lock:
+            return {name: {"calls": calls, "total_ms": total, "mean_ms": total / calls, "max_ms": slowest}
+                    for name, (calls, total, slowest) in self._totals.items()}
+
+
+_totals = SpanTotals()
+
+
+class RerunTrace:
+    """Timed spans of one script run; top-level phases are opened with phase()"""
+
+    def __init__(self, label, profiler=None):
+        self.label = label
+        self.profiler = profiler
+        self.profile = None
+        self.interrupted = False
+        self.finished = False
+        self.total_ms = 0.0
+        self.started_at = time.time()
+        self._start = time.perf_counter()
+        self._spans = []
+        self._open = []
+        self._phase = None
+        # Offset of the last span boundary: where a rerun cut short stopped
+        self._last_ms = 0.0
+        self._profiler = _PROFILER_CLASSES[profiler]() if profiler else None
+        if self._profiler:
+            self._profiler.start()
+
+    def open(self, name):
+        """Start a span nested in whatever is open; returns its handle for close()"""
+        index = len(self._spans)
+        self._last_ms = (time.perf_counter() - self._start) * 1000
+        self._spans.append([name, len(self._open), self._last_ms, None])
+        self._open.append(index)
+        return index
+
+    def close(self, index, now_ms=None):
+        """End a span (and any left open inside it); returns its duration in ms"""
+        if index not in self._open:
+            return self._spans[index][3]
+        if now_ms is None:
+            now_ms = self._last_ms = (time.perf_counter() - self._start) * 1000
+        while self._open:
+            inner = self._open.pop()
+            self._spans[inner][3] = now_ms - self._spans[inner][2]
+            if inner == index:
+                break
+        return self._spans[index][3]
+
+    def phase(self, name):
+        """End the current top-level phase and start the next"""
+        if self._phase is not None:
+            _totals.record(self._spans[self._phase][0], self.close(self._phase))
+        self._phase = self.open(name)
+
+    def finish(self, interrupted=False):
+        """Close what is still open, stop the profiler and log the trace"""
+        if self.finished:
+            return
+        # A run cut short is closed from the next one; idle time in between is not part of it
+        end_ms = self._last_ms if interrupted else (time.perf_counter() - self._start) * 1000
+        if self._phase is not None:
+            _totals.record(self._spans[self._phase][0], self.close(self._phase, end_ms))
+        if self._open:
+            self.close(self._open[0], end_ms)
+        self.total_ms = end_ms
+        self.interrupted = interrupted
+        self.finished = True
+        if self._profiler:
+            self.profile = self._profiler.stop()
+            self._profiler = None
+        if getattr(_local, "trace", None) is self:
+            _local.trace = None
+
+        level = logging.INFO if self.total_ms >= TRACE_LOG_MS or self.profile else logging.DEBUG
+        if logger.isEnabledFor(level):
+            logger.log(level, "%s", self.summary())
+            if self.profile:
+                logger.info("%s profile of %s rerun:\n%s", self.profiler, self.label, self.profile)
+
+    @property
+    def spans(self):
+        return [Span(name, depth, start_ms, duration_ms or 0.0) for name, depth, start_ms, duration_ms in self._spans]
+
+    def summary(self):
+        """One line: the rerun's total and its top-level phases"""
+        phases = ", ".join(f"{span.name} {span.duration_ms:.1f}" for span in self.spans if span.depth == 0)
+        state = " (cut short by a rerun)" if self.interrupted else ""
+        return f"{self.label} rerun {self.total_ms:.1f} ms{state}: {phases}"
+
+    def format(self):
+        """Every span, indented by nesting, with start offset and duration"""
+        lines = [self.summary()]
+        for span in self.spans:
+            lines.append(f"{span.start_ms:>9.1f} {span.duration_ms:>9.1f}  {'  ' * span.depth}{span.name}")
+        return "\n".join(lines)
+
+
+class SessionTraces:
+    """One session's recent reruns; kept in session state between runs"""
+
+    def __init__(self, maxlen=TRACE_HISTORY):
+        self.history = deque(maxlen=maxlen)
+        self.current = None
+        # Profiler (one of PROFILERS) to run for the next rerun only
+        self.profile_next = None
+
+    def start(self, label):
+        """Begin tracing this rerun on the calling thread
+
+        A previous rerun that never reached finish() was cut short by
+        st.rerun() or a stop; it is closed and kept as interrupted.
+        """
+        if self.current is not None and not self.current.finished:
+            self.current.finish(interrupted=True)
+            self.history.append(self.current)
+        self.current = RerunTrace(label, self.profile_next)
+        self.profile_next = None
+        _local.trace = self.current
+        return self.current
+
+    def finish(self):
+        if self.current is not None and not self.current.finished:
+            self.current.finish()
+            self.history.append(self.current)
+
+
+def current_trace():
+    """The trace of the rerun running on this thread, or None"""
+    return getattr(_local, "trace", None)
+
+
+def phase(name):
+    """Start the next top-level phase of this thread's rerun, if it is traced"""
+    trace = current_trace()
+    if trace is not None:
+        trace.phase(name)
+
+
+@contextmanager
+def span(name):
+    """Time a block as a span of this thread's rerun, and in the per-name totals"""
+    trace = current_trace()
+    start = time.perf_counter()
+    index = trace.open(name) if trace is not None else None
+    try:
+        yield
+    finally:
+        if trace is not None and not trace.finished:
+            duration_ms = trace.close(index)
+        else:
+            duration_ms = (time.perf_counter() - start) * 1000
+        _totals.record(name, duration_ms)
+
+
+def traced(name):
+    """Decorator timing every call of a function as span(name)"""
+    def decorate(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def get_trace_stats():
+    """Per-span-name calls and timings across all sessions and workers, slowest total first"""
+    totals = _totals.snapshot()
+    return dict(sorted(totals.items(), key=lambda item: item[1]["total_ms"], reverse=True))
@@ -0,0 +1,61 @@
+"""Generate a class set of papers and zip their question and answer PDFs
+
+Rows come from a CSV with board,grade,subject,topic,paper_type columns, or from
+every curriculum topic of one board/grade/subject:
+
+    python -m tools.batch_generate --csv class_set.csv --out class_set.zip
+    python -m tools.batch_generate --board CBSE --grade 10 --subject Science \\
+        --paper-type "Unit Test (25 marks)" --out cbse10_science.zip
+
+Re-running the same command resumes from the batch checkpoint, so rows that
+already finished are not generated again. --message-batches submits the rows as
+one asynchronous Message Batch, suited to overnight runs.
+"""
+import argparse
+import sys
+
+from src.components.batch_generation import BATCH_BACKEND, BATCH_CONCURRENCY, BatchRunner, curriculum_rows, read_batch_csv
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--csv", help="CSV file of rows to generate")
+    parser.add_argument("--board")
+    parser.add_argument("--grade")
+    parser.add_argument("--subject")
+    parser.add_argument("--paper-type")
+    parser.add_argument("--concurrency", type=int, default=BATCH_CONCURRENCY)
+    parser.add_argument("--message-batches", action="store_true",
+                        help="submit one Message Batch and poll it instead of calling the API per row")
+    parser.add_argument("--out", default="batch.zip", help="zip file to write")
+    args = parser.parse_args()
+
+    if args.csv:
+        with open(args.csv, encoding="utf-8") as f:
+            rows = read_batch_csv(f.read())
+    elif args.board and args.grade and args.subject and args.paper_type:
+        grade = int(args.grade) if args.grade.isdigit() else args.grade
+        rows = curriculum_rows(args.board, grade, args.subject, args.paper_type)
+    else:
+        parser.error("give --csv, or --board, --grade, --subject and --paper-type")
+    if not rows:
+        sys.exit("No rows to generate")
+
+    backend = "message_batches" if args.message_batches else BATCH_BACKEND
+    runner = BatchRunner(rows, concurrency=args.concurrency, backend=backend)
+    skipped = len(rows) - len(runner.pending())
+    print(f"Batch {runner.id}: {len(rows)} rows, {skipped} already done")
+
+    def report(index, entry):
+        detail = f"{entry.get('questions')} questions" if entry["status"] == "done" else entry.get("error")
+        print(f"[{index + 1:>3}/{len(rows)}] {entry['status']:<6} {rows[index].topic} ({detail})")
+
+    summary = runner.run(on_row=report)
+    with open(args.out, "wb") as f:
+        f.write(runner.build_zip())
+    print(f"{summary['done']} done, {summary['failed']} failed; wrote {args.out}")
+    sys.exit(1 if summary["failed"] else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,366 @@
+"""Local stand-in for the Anthropic Messages API
+
+Answers POST /v1/messages with a schema-valid mock test built from the counts in
+the prompt, either as one JSON body or as server-sent events when the request
+sets "stream": true. System blocks marked with cache_control are tracked like the
+API's prompt cache, so usage reports cache reads and writes. The Message Batches endpoints (create, retrieve, results,
+cancel under /v1/messages/batches) are served too; a batch ends batch_latency
+seconds after it was created. Latency can vary by +/- latency_jitter seconds,
+and error_rate of message requests fail with one of error_statuses (429 with a
+retry-after) so retries and the circuit breaker can be load-tested. Point the
+app at it with
+
+    python -m tools.mock_anthropic_server --port 8765
+    LLM_BACKEND=mock MOCK_LLM_URL=http://127.0.0.1:8765/v1/messages streamlit run main.py
+
+or let the mock backend start one in-process (LLM_BACKEND=mock alone).
+"""
+import argparse
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+_BATCH_PATH = re.compile(r'^/v1/messages/batches(?:/(msgbatch_\w+))?(?:/(results|cancel))?/?$')
+_COUNTS = re.compile(r'Generate exactly (\d+) MCQ questions, (\d+) short answer questions and (\d+) long answer questions')
+_TOPIC = re.compile(r'^Topic: (.+)$', re.MULTILINE)
+DEFAULT_ERROR_STATUSES = (429, 500, 529)
+# Random wording per question keeps mock questions apart for near-duplicate detection
+_VOCABULARY = (
+    "angle", "balance", "carbon", "density", "energy", "force", "gravity", "heat", "ion", "joule", "kinetic",
+    "lens", "mass", "neutron", "orbit", "pressure", "quantum", "radius", "speed", "tension", "unit", "vector",
+    "wave", "xylem", "yield", "zinc", "acid", "base", "cell", "diagram", "element", "friction", "graph",
+    "hydrogen", "image", "junction", "kidney", "light", "magnet", "nucleus", "oxygen", "prism", "ratio",
+    "salt", "tissue", "voltage", "weight", "circuit", "enzyme", "fossil", "glucose", "habitat", "isotope"
+)
+
+
+def _phrase(words=6):
+    return " ".join(random.sample(_VOCABULARY, words))
+
+
+def prompt_text(payload):
+    """Flatten the text of every message and system block in a request"""
+    parts = []
+    system = payload.get("system", "")
+    blocks = system if isinstance(system, list) else [{"text": system}]
+    parts.extend(block.get("text", "") for block in blocks)
+    for message in payload.get("messages", []):
+        content = message.get("content", "")
+        if isinstance(content, str):
+            parts.append(content)
+        else:
+            parts.extend(block.get("text", "") for block in content if isinstance(block, dict))
+    return "\n".join(parts)
+
+
+def build_mock_test(prompt):
+    """Schema-valid test JSON matching the counts requested in the prompt"""
+    counts = _COUNTS.search(prompt)
+    mcq, short, long_ = (int(value) for value in counts.groups()) if counts else (5, 3, 2)
+    topic_match = _TOPIC.search(prompt)
+    topic = topic_match.group(1).strip() if topic_match else "General"
+
+    questions = []
+    for i in range(mcq):
+        questions.append({
+            "id": len(questions) + 1, "type": "mcq", "marks": 1,
+            "question": f"Mock MCQ {i + 1} on {topic}: which statement about {_phrase()} is correct?",
+            "options": {"A": f"Statement A{i}", "B": f"Statement B{i}", "C": f"Statement C{i}", "D": f"Statement D{i}"},
+            "correct_answer": "ABCD"[i % 4],
+            "explanation": f"Statement {'ABCD'[i % 4]}{i} follows from the definition used in {topic}."
+        })
+    for i in range(short):
+        questions.append({
+            "id": len(questions) + 1, "type": "short", "marks": 3,
+            "question": f"Mock short question {i + 1}: briefly explain how {_phrase()} relate in {topic}.",
+            "sample_answer": f"A concise three-point explanation of idea {i + 1} from {topic}."
+        })
+    for i in range(long_):
+        questions.append({
+            "id": len(questions) + 1, "type": "long", "marks": 5,
+            "question": f"Mock long question {i + 1}: discuss {_phrase()} in {topic} in detail with examples.",
+            "sample_answer": f"A structured answer covering definition, working and two examples for part {i + 1} of {topic}."
+        })
+
+    return {
+        "test_info": {"topic": topic, "total_questions": len(questions), "curriculum_standard": "Mock curriculum"},
+        "questions": questions
+    }
+
+
+def cache_usage(payload, prompt_cache):
+    """Split prompt tokens into cache reads, cache writes and uncached input like the API does
+
+    prompt_cache is the set of prefix hashes seen so far; it is updated in place.
+    """
+    system = payload.get("system", "")
+    prefix, breakpoints = payload.get("model", ""), []
+    for block in system if isinstance(system, list) else []:
+        prefix += block.get("text", "")
+        if block.get("cache_control"):
+            breakpoints.append((hashlib.sha256(prefix.encode("utf-8")).hexdigest(), len(prefix) // 4))
+    read = max((tokens for key, tokens in breakpoints if key in prompt_cache), default=0)
+    written = max((tokens for _, tokens in breakpoints), default=0) - read
+    prompt_cache.update(key for key, _ in breakpoints)
+    total = len(prompt_text(payload)) // 4
+    return {"input_tokens": max(0, total - read - written), "cache_read_input_tokens": read,
+            "cache_creation_input_tokens": written}
+
+
+def build_message(payload, prompt_cache=None):
+    """Non-streaming Messages API response body for a request"""
+    text = json.dumps(build_mock_test(prompt_text(payload)), indent=2)
+    stop_reason = "end_turn"
+    # Output past max_tokens is cut off, as the API does
+    max_chars = payload.get("max_tokens", 4096) * 4
+    if len(text) > max_chars:
+        text, stop_reason = text[:max_chars], "max_tokens"
+    usage = cache_usage(payload, set() if prompt_cache is None else prompt_cache)
+    usage["output_tokens"] = len(text) // 4
+    return {
+        "id": f"msg_mock_{uuid.uuid4().hex[:16]}", "type": "message", "role": "assistant", "model": payload.get("model"),
+        "content": [{"type": "text", "text": text}],
+        "stop_reason": stop_reason,
+        "usage": usage
+    }
+
+
+class MockBatchStore:
+    """In-memory Message Batches; results are built when a batch is first seen ended"""
+
+    def __init__(self, prompt_cache=None):
+        self.prompt_cache = set() if prompt_cache is None else prompt_cache
+        self._batches = {}
+        self._lock = threading.Lock()
+
+    def create(self, requests, latency):
+        batch_id = f"msgbatch_mock_{uuid.uuid4().hex[:16]}"
+        now = time.time()
+        with self._lock:
+            self._batches[batch_id] = {"requests": requests, "created_at": now, "ends_at": now + latency,
+                                       "results": None, "canceled": False}
+        return batch_id
+
+    def _settle(self, batch):
+        if batch["results"] is None and (batch["canceled"] or time.time() >= batch["ends_at"]):
+            batch["ended_at"] = time.time()
+            batch["results"] = [
+                {"custom_id": request["custom_id"], "result": {"type": "canceled"}} if batch["canceled"] else
+                {"custom_id": request["custom_id"], "result": {"type": "succeeded", "message": build_message(request["params"], self.prompt_cache)}}
+                for request in batch["requests"]
+            ]
+
+    def describe(self, batch_id, base_url):
+        """Message Batch object, or None for an unknown id"""
+        with self._lock:
+            batch = self._batches.get(batch_id)
+            if batch is None:
+                return None
+            self._settle(batch)
+            ended = batch["results"] is not None
+            counts = {"processing": 0, "succeeded": 0, "errored": 0, "canceled": 0, "expired": 0}
+            if ended:
+                for entry in batch["results"]:
+                    counts[entry["result"]["type"]] += 1
+            else:
+                counts["processing"] = len(batch["requests"])
+            return {
+                "id": batch_id, "type": "message_batch",
+                "processing_status": "ended" if ended else ("canceling" if batch["canceled"] else "in_progress"),
+                "request_counts": counts,
+                "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(batch["created_at"])),
+                "ended_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(batch["ended_at"])) if ended else None,
+                "results_url": f"{base_url}/v1/messages/batches/{batch_id}/results" if ended else None
+            }
+
+    def results(self, batch_id):
+        with self._lock:
+            batch = self._batches.get(batch_id)
+            return None if batch is None else batch["results"]
+
+    def cancel(self, batch_id):
+        with self._lock:
+            batch = self._batches.get(batch_id)
+            if batch is not None and batch["results"] is None:
+                batch["canceled"] = True
+            return batch is not None
+
+
+class MockAnthropicHandler(BaseHTTPRequestHandler):
+    """Request handler; behaviour comes from the server's config dict"""
+
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        if self.server.config.get("verbose"):
+            super().log_message(format, *args)
+
+    def _read_json(self):
+        length = int(self.headers.get("content-length", 0))
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def _send_json(self, status, body, headers=None):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("content-type", "application/json")
+        self.send_header("content-length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_event(self, event, data):
+        chunk = f"event: {event}\ndata: {json.dumps(data)}\n\n".encode("utf-8")
+        self.wfile.write(f"{len(chunk):x}\r\n".encode("ascii") + chunk + b"\r\n")
+        self.wfile.flush()
+
+    def _base_url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _send_error(self, status):
+        """An injected API error; 429s carry retry-after like the real rate limiter's"""
+        error_type = {429: "rate_limit_error", 529: "overloaded_error"}.get(status, "api_error")
+        headers = {"retry-after": "1"} if status == 429 else None
+        self._send_json(status, {"type": "error", "error": {"type": error_type, "message": f"injected {status}"}}, headers)
+
+    def _not_found(self):
+        self._send_json(404, {"type": "error", "error": {"type": "not_found_error", "message": self.path}})
+
+    def do_GET(self):
+        match = _BATCH_PATH.match(self.path)
+        if not match or not match.group(1) or match.group(2) == "cancel":
+            self._not_found()
+            return
+        batch_id, action = match.groups()
+        store = self.server.batches
+        if action == "results":
+            results = store.results(batch_id)
+            if results is None:
+                self._not_found()
+                return
+            data = "".join(json.dumps(entry) + "\n" for entry in results).encode("utf-8")
+            self.send_response(200)
+            self.send_header("content-type", "application/x-jsonl")
+            self.send_header("content-length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+            return
+        batch = store.describe(batch_id, self._base_url())
+        if batch is None:
+            self._not_found()
+        else:
+            self._send_json(200, batch)
+
+    def _post_batch(self, match):
+        batch_id, action = match.groups()
+        store = self.server.batches
+        if batch_id is None and action is None:
+            requests = self._read_json().get("requests", [])
+            batch_id = store.create(requests, self.server.config.get("batch_latency", 1.0))
+        elif action != "cancel" or not store.cancel(batch_id):
+            self._not_found()
+            return
+        self._send_json(200, store.describe(batch_id, self._base_url()))
+
+    def do_POST(self):
+        match = _BATCH_PATH.match(self.path)
+        if match:
+            self._post_batch(match)
+            return
+        if self.path.rstrip("/") != "/v1/messages":
+            self._not_found()
+            return
+
+        payload = self._read_json()
+        config = self.server.config
+        jitter = config.get("latency_jitter", 0.0)
+        time.sleep(max(0.0, config.get("latency", 0.0) + random.uniform(-jitter, jitter)))
+        if random.random() < config.get("error_rate", 0.0):
+            self._send_error(random.choice(config.get("error_statuses") or DEFAULT_ERROR_STATUSES))
+            return
+
+        body = build_message(payload, self.server.prompt_cache)
+        if not payload.get("stream"):
+            self._send_json(200, body)
+            return
+
+        text = body["content"][0]["text"]
+        usage = body["usage"]
+        message_id = body["id"]
+
+        self.send_response(200)
+        self.send_header("content-type", "text/event-stream")
+        self.send_header("cache-control", "no-cache")
+        self.send_header("transfer-encoding", "chunked")
+        self.end_headers()
+
+        self._send_event("message_start", {"type": "message_start", "message": {
+            "id": message_id, "type": "message", "role": "assistant", "model": payload.get("model"),
+            "content": [], "usage": dict(usage, output_tokens=0)
+        }})
+        self._send_event("content_block_start", {"type": "content_block_start", "index": 0, "content_block": {"type": "text", "text": ""}})
+        chunk_size = config.get("chunk_size", 64)
+        for start in range(0, len(text), chunk_size):
+            time.sleep(config.get("chunk_delay", 0.0))
+            self._send_event("content_block_delta", {"type": "content_block_delta", "index": 0,
+                                                     "delta": {"type": "text_delta", "text": text[start:start + chunk_size]}})
+        self._send_event("content_block_stop", {"type": "content_block_stop", "index": 0})
+        self._send_event("message_delta", {"type": "message_delta", "delta": {"stop_reason": body["stop_reason"]},
+                                           "usage": {"output_tokens": usage["output_tokens"]}})
+        self._send_event("message_stop", {"type": "message_stop"})
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+
+def make_server(host, port, config):
+    server = ThreadingHTTPServer((host, port), MockAnthropicHandler)
+    server.daemon_threads = True
+    server.config = config
+    server.prompt_cache = set()
+    server.batches = MockBatchStore(server.prompt_cache)
+    return server
+
+
+def start_server(host="127.0.0.1", port=0, **config):
+    """Start the stand-in on a background thread and return (server, base_url)"""
+    server = make_server(host, port, config)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds before the first byte")
+    parser.add_argument("--latency-jitter", type=float, default=0.0, help="latency varies by +/- this many seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of message requests that fail")
+    parser.add_argument("--error-status", type=int, action="append", dest="error_statuses",
+                        help=f"status of injected failures (repeatable, default {DEFAULT_ERROR_STATUSES})")
+    parser.add_argument("--chunk-delay", type=float, default=0.02, help="seconds between streamed chunks")
+    parser.add_argument("--chunk-size", type=int, default=64, help="characters per streamed chunk")
+    parser.add_argument("--batch-latency", type=float, default=1.0, help="seconds until a message batch ends")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    server = make_server(args.host, args.port, {
+        "latency": args.latency, "latency_jitter": args.latency_jitter, "error_rate": args.error_rate,
+        "error_statuses": args.error_statuses, "chunk_delay": args.chunk_delay, "chunk_size": args.chunk_size,
+        "batch_latency": args.batch_latency, "verbose": args.verbose
+    })
+    print(f"Mock Messages API on http://{args.host}:{args.port}/v1/messages")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()